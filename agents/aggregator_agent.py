@@ -1,5 +1,7 @@
 from typing import Dict, Any, List
 
+from agents.decision_rules import get_rules
+
 def generate_investment_decision(sentiment: str, impact_level: str, risks: List[str], tickers: List[str]) -> str:
     """
     Generate investment decision based on analysis results
@@ -11,46 +13,84 @@ def generate_investment_decision(sentiment: str, impact_level: str, risks: List[
         tickers: List of identified tickers
         
     Returns:
-        Investment decision string
+        Investment decision string from the first matching decision rule
+    """
+    return get_rules().decide(sentiment, impact_level, risks, tickers)
+
+def build_topic_consensus(analyses: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combine the final analyses of several articles on one topic
+    
+    Sentiment and impact are averaged with each article weighted by its
+    confidence score, and the consensus decision is derived from them with
+    the same rules as a single article. Articles the relevance filter
+    rejected are counted but do not vote.
+    
+    Args:
+        analyses: final_analysis dictionaries of the topic's articles
+        
+    Returns:
+        Topic-level consensus summary
     """
-    # Calculate risk score
-    high_risk_categories = {'regulatory', 'geopolitical', 'financial', 'legal'}
-    risk_score = len([risk for risk in risks if risk in high_risk_categories])
-    has_significant_risk = risk_score > 0 and 'none' not in risks
+    sentiment_scores = {"positive": 1.0, "neutral": 0.0, "negative": -1.0}
+    impact_weights = {"high": 3.0, "medium": 2.0, "low": 1.0}
+    
+    analyses = [analysis for analysis in analyses if analysis]
+    filtered = sum(analysis.get("route") == "not_relevant" for analysis in analyses)
+    analyses = [analysis for analysis in analyses if analysis.get("route") != "not_relevant"]
+    if not analyses:
+        return {"articles": 0, "filtered_articles": filtered}
+    
+    # Articles with zero confidence still count a little
+    weights = [max(analysis.get("confidence_score", 0.0), 0.1) for analysis in analyses]
+    total_weight = sum(weights)
+    
+    sentiment_score = sum(
+        weight * sentiment_scores.get(analysis.get("sentiment"), 0.0) for weight, analysis in zip(weights, analyses)
+    ) / total_weight
+    if sentiment_score > 0.2:
+        sentiment = "positive"
+    elif sentiment_score < -0.2:
+        sentiment = "negative"
+    else:
+        sentiment = "neutral"
     
-    # Decision logic
-    if sentiment == "positive":
-        if impact_level == "high":
-            if not has_significant_risk:
-                return "Strong Buy Signal - Positive sentiment with high market impact and manageable risks"
-            else:
-                return "Cautious Buy Signal - Positive sentiment but monitor identified risks"
-        elif impact_level == "medium":
-            if not has_significant_risk:
-                return "Moderate Buy Signal - Positive sentiment with medium impact"
-            else:
-                return "Hold/Monitor - Positive sentiment offset by medium risks"
-        else:  # low impact
-            return "Weak Buy Signal - Positive sentiment but limited market impact expected"
+    impact_score = sum(
+        weight * impact_weights.get(analysis.get("impact_level"), 1.0) for weight, analysis in zip(weights, analyses)
+    ) / total_weight
+    impact_level = "high" if impact_score >= 2.5 else "medium" if impact_score >= 1.5 else "low"
     
-    elif sentiment == "negative":
-        if impact_level == "high":
-            return "Strong Sell Signal - Negative sentiment with high market impact"
-        elif impact_level == "medium":
-            return "Moderate Sell/Avoid Signal - Negative sentiment with medium impact"
-        else:  # low impact
-            return "Monitor/Hold - Negative sentiment but limited market impact expected"
+    sentiment_distribution = {label: 0 for label in sentiment_scores}
+    risk_counts: Dict[str, int] = {}
+    tickers: List[str] = []
+    for analysis in analyses:
+        if analysis.get("sentiment") in sentiment_distribution:
+            sentiment_distribution[analysis["sentiment"]] += 1
+        for risk in analysis.get("risks", []):
+            if risk != "none":
+                risk_counts[risk] = risk_counts.get(risk, 0) + 1
+        for ticker in analysis.get("tickers", []):
+            if ticker not in tickers:
+                tickers.append(ticker)
+    # Most frequently cited risks first
+    risks = sorted(risk_counts, key=lambda risk: -risk_counts[risk]) or ["none"]
+    agreement = sentiment_distribution[sentiment] / len(analyses)
     
-    else:  # neutral sentiment
-        if impact_level == "high":
-            if has_significant_risk:
-                return "Cautious Hold - Neutral sentiment but high impact and significant risks"
-            else:
-                return "Monitor - Neutral sentiment with high potential impact"
-        elif impact_level == "medium":
-            return "Hold - Neutral sentiment with medium impact"
-        else:  # low impact
-            return "No Action - Neutral sentiment with low market impact"
+    return {
+        "articles": len(analyses),
+        "sentiment": sentiment,
+        "sentiment_score": sentiment_score,
+        "sentiment_distribution": sentiment_distribution,
+        "agreement": agreement,
+        "impact_level": impact_level,
+        "risks": risks,
+        "risk_counts": risk_counts,
+        "tickers": tickers,
+        "decision": generate_investment_decision(sentiment, impact_level, risks, tickers),
+        "confidence_score": agreement * total_weight / len(analyses),
+        "degraded_articles": sum(analysis.get("analysis_quality") == "degraded" for analysis in analyses),
+        "filtered_articles": filtered,
+    }
 
 def run(state):
     """
@@ -81,7 +121,10 @@ def run(state):
             "decision": decision,
             "risk_score": len([risk for risk in risks if risk != "none"]),
             "has_tickers": len(tickers) > 0,
-            "analysis_quality": "complete"
+            # Degraded when any agent fell back to a local estimate
+            "analysis_quality": "degraded" if state.degraded_agents else "complete",
+            "degraded_agents": list(state.degraded_agents),
+            "degraded_reasons": dict(state.degraded_reasons)
         }
         
         # Add confidence metrics
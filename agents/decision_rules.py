@@ -0,0 +1,190 @@
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import config
+
+# Risk categories that count as a significant risk when identified
+HIGH_RISK_CATEGORIES = ["regulatory", "geopolitical", "financial", "legal"]
+
+# Conditions a rule may set; a condition left out (or None) matches anything.
+# sentiment / impact_level take a label or a list of labels, the others a bool.
+RULE_CONDITIONS = ["sentiment", "impact_level", "significant_risk", "has_tickers"]
+
+# Checked top to bottom, first match wins
+DEFAULT_DECISION_RULES: List[Dict[str, Any]] = [
+    {"sentiment": "positive", "impact_level": "high", "significant_risk": False,
+     "decision": "Strong Buy Signal - Positive sentiment with high market impact and manageable risks"},
+    {"sentiment": "positive", "impact_level": "high",
+     "decision": "Cautious Buy Signal - Positive sentiment but monitor identified risks"},
+    {"sentiment": "positive", "impact_level": "medium", "significant_risk": False,
+     "decision": "Moderate Buy Signal - Positive sentiment with medium impact"},
+    {"sentiment": "positive", "impact_level": "medium",
+     "decision": "Hold/Monitor - Positive sentiment offset by medium risks"},
+    {"sentiment": "positive",
+     "decision": "Weak Buy Signal - Positive sentiment but limited market impact expected"},
+    {"sentiment": "negative", "impact_level": "high",
+     "decision": "Strong Sell Signal - Negative sentiment with high market impact"},
+    {"sentiment": "negative", "impact_level": "medium",
+     "decision": "Moderate Sell/Avoid Signal - Negative sentiment with medium impact"},
+    {"sentiment": "negative",
+     "decision": "Monitor/Hold - Negative sentiment but limited market impact expected"},
+    {"impact_level": "high", "significant_risk": True,
+     "decision": "Cautious Hold - Neutral sentiment but high impact and significant risks"},
+    {"impact_level": "high",
+     "decision": "Monitor - Neutral sentiment with high potential impact"},
+    {"impact_level": "medium",
+     "decision": "Hold - Neutral sentiment with medium impact"},
+    {"decision": "No Action - Neutral sentiment with low market impact"},
+]
+
+def decision_label(decision: str) -> str:
+    """Short label of a decision string, e.g. "Strong Buy Signal\""""
+    return decision.split(" - ")[0].strip()
+
+class DecisionRuleTable:
+    """
+    Investment decision rules as data
+
+    A table is an ordered list of rules, each a set of conditions on an
+    analysis plus the decision it yields; the first matching rule wins.
+    `decide` evaluates one analysis, `evaluate` a whole frame of analyses
+    with one boolean mask per rule, so stored results can be re-scored
+    under new rules without calling the agents again.
+    """
+
+    def __init__(
+        self,
+        rules: Optional[List[Dict[str, Any]]] = None,
+        high_risk_categories: Optional[Iterable[str]] = None,
+        default_decision: str = "No Action - No decision rule matched",
+    ):
+        self.rules = [dict(rule) for rule in (rules if rules is not None else DEFAULT_DECISION_RULES)]
+        self.high_risk_categories = list(high_risk_categories if high_risk_categories is not None
+                                         else HIGH_RISK_CATEGORIES)
+        self.default_decision = default_decision
+        for index, rule in enumerate(self.rules):
+            unknown = set(rule) - set(RULE_CONDITIONS) - {"decision"}
+            if unknown or "decision" not in rule:
+                raise ValueError(f"Decision rule {index} needs a decision and may only set {RULE_CONDITIONS}; "
+                                 f"got {sorted(rule)}")
+
+    @classmethod
+    def from_file(cls, path: str) -> "DecisionRuleTable":
+        """Load a table saved by to_file (JSON with rules, high_risk_categories and default_decision)"""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["rules"], data.get("high_risk_categories"),
+                   data.get("default_decision", "No Action - No decision rule matched"))
+
+    def to_file(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "high_risk_categories": self.high_risk_categories,
+                    "rules": self.rules,
+                    "default_decision": self.default_decision,
+                },
+                f,
+                indent=2,
+            )
+
+    # ------------------------------------------------------------- one article
+
+    def has_significant_risk(self, risks: List[str]) -> bool:
+        return "none" not in risks and any(risk in self.high_risk_categories for risk in risks)
+
+    def decide(self, sentiment: str, impact_level: str, risks: List[str], tickers: List[str]) -> str:
+        """Decision of the first rule matching one analysis"""
+        values = {
+            "sentiment": sentiment,
+            "impact_level": impact_level,
+            "significant_risk": self.has_significant_risk(risks),
+            "has_tickers": len(tickers) > 0,
+        }
+        for rule in self.rules:
+            if all(_accepts(rule.get(name), values[name]) for name in RULE_CONDITIONS):
+                return rule["decision"]
+        return self.default_decision
+
+    # ------------------------------------------------------------- many articles
+
+    def features(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Rule inputs of stored analyses
+
+        Args:
+            frame: sentiment and impact_level columns, plus either risks and
+                tickers list columns or precomputed significant_risk and
+                has_tickers bool columns
+
+        Returns:
+            Frame with one column per RULE_CONDITIONS entry, same index
+        """
+        features = pd.DataFrame({"sentiment": frame["sentiment"], "impact_level": frame["impact_level"]})
+        if "significant_risk" in frame:
+            features["significant_risk"] = frame["significant_risk"].to_numpy(dtype=bool)
+        else:
+            risks = frame["risks"].reset_index(drop=True).explode()
+            high = risks.isin(self.high_risk_categories).groupby(level=0).any()
+            none = risks.eq("none").groupby(level=0).any()
+            features["significant_risk"] = (high & ~none).to_numpy()
+        if "has_tickers" in frame:
+            features["has_tickers"] = frame["has_tickers"].to_numpy(dtype=bool)
+        else:
+            features["has_tickers"] = frame["tickers"].str.len().fillna(0).to_numpy() > 0
+        return features
+
+    def evaluate(self, features: pd.DataFrame) -> pd.Series:
+        """
+        Decisions for many analyses at once
+
+        Each rule becomes a boolean mask over the frame; rules are applied
+        last to first so earlier rules overwrite later ones, which gives
+        first-match semantics without a per-row loop.
+
+        Args:
+            features: Frame from features() (or any frame with its columns)
+
+        Returns:
+            Categorical decisions aligned with features
+        """
+        decisions = list(dict.fromkeys([rule["decision"] for rule in self.rules] + [self.default_decision]))
+        rule_codes = np.array([decisions.index(rule["decision"]) for rule in self.rules], dtype=np.int32)
+        codes = np.full(len(features), decisions.index(self.default_decision), dtype=np.int32)
+        for index in reversed(range(len(self.rules))):
+            rule = self.rules[index]
+            mask = np.ones(len(features), dtype=bool)
+            for name in RULE_CONDITIONS:
+                if rule.get(name) is not None:
+                    mask &= _matches(features[name], rule[name])
+            codes[mask] = rule_codes[index]
+        return pd.Series(pd.Categorical.from_codes(codes, decisions), index=features.index, name="decision")
+
+def _accepts(expected: Any, value: Any) -> bool:
+    if expected is None:
+        return True
+    if isinstance(expected, list):
+        return value in expected
+    return value == expected
+
+def _matches(column: pd.Series, expected: Any) -> np.ndarray:
+    """Rows of a feature column satisfying one condition"""
+    allowed = expected if isinstance(expected, list) else [expected]
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # Test each category once, then look the answer up by code (-1, missing, maps to False)
+        hits = np.append(column.cat.categories.isin(allowed), False)
+        return hits[column.cat.codes.to_numpy()]
+    return column.isin(allowed).to_numpy()
+
+_rules: Optional[DecisionRuleTable] = None
+
+def get_rules() -> DecisionRuleTable:
+    """Shared table: loaded from config.DECISION_RULES_PATH if set, else DEFAULT_DECISION_RULES"""
+    global _rules
+    if _rules is None:
+        path = config.DECISION_RULES_PATH
+        _rules = DecisionRuleTable.from_file(path) if path else DecisionRuleTable()
+    return _rules
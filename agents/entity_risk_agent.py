@@ -1,8 +1,47 @@
-from utils.llm_client import gemini_prompt
+from utils.llm_client import agent_prompt, CircuitOpenError, LLMError, LLMTimeoutError
+from utils.deadline import has_budget, remaining_seconds
+from utils.metrics import metrics
+from agents.heuristics import heuristic_risks
 from typing import Dict, Any, List
 import json
 import re
 
+RISK_CATEGORIES = ['regulatory', 'geopolitical', 'financial', 'operational', 'market', 'credit', 'liquidity', 'reputation', 'cyber', 'legal']
+
+# Static part of every prompt, sent once as a cached context where possible
+RISK_INSTRUCTIONS = """Identify potential risks mentioned or implied in the financial news content you are given.
+
+Consider these risk categories:
+- regulatory: Government regulations, compliance issues, policy changes
+- geopolitical: International relations, trade wars, sanctions
+- financial: Credit risks, liquidity issues, market volatility
+- operational: Business operations, supply chain, management issues
+- market: Competition, market share, industry trends
+- legal: Lawsuits, litigation, legal disputes
+- reputation: Brand damage, public relations issues
+- cyber: Technology risks, data breaches, security issues
+
+Respond with a comma-separated list of relevant risk categories (e.g., "regulatory, financial, market"). If no specific risks are identified, respond with "none"."""
+
+def build_prompt(content: str, tickers: List[str]) -> str:
+    """
+    Build the per-article part of the risk prompt (follows RISK_INSTRUCTIONS)
+    
+    Args:
+        content: Cleaned article content
+        tickers: Tickers extracted during preprocessing
+        
+    Returns:
+        Prompt text for the LLM
+    """
+    ticker_context = f"The analysis involves: {', '.join(tickers)}.\n\n" if tickers else ""
+    return f"""{ticker_context}Content:
+\"\"\"
+{content}
+\"\"\"
+
+Risks:"""
+
 def parse_risks(risks_text: str) -> List[str]:
     """
     Parse risk categories from LLM response
@@ -41,8 +80,7 @@ def parse_risks(risks_text: str) -> List[str]:
     
     # 3. Look for individual risk categories
     if not risks:
-        risk_categories = ['regulatory', 'geopolitical', 'financial', 'operational', 'market', 'credit', 'liquidity', 'reputation', 'cyber', 'legal']
-        risks = [category for category in risk_categories if category in cleaned]
+        risks = [category for category in RISK_CATEGORIES if category in cleaned]
     
     # Filter out common non-risks
     filtered_risks = []
@@ -73,35 +111,33 @@ def run(state):
             state.risks = ["none"]
             return state
         
-        # Build context-aware prompt
-        ticker_context = f" The analysis involves: {', '.join(tickers)}." if tickers else ""
-        
-        prompt = f"""Identify potential risks mentioned or implied in the following financial news content.{ticker_context}
-
-Consider these risk categories:
-- regulatory: Government regulations, compliance issues, policy changes
-- geopolitical: International relations, trade wars, sanctions
-- financial: Credit risks, liquidity issues, market volatility
-- operational: Business operations, supply chain, management issues
-- market: Competition, market share, industry trends
-- legal: Lawsuits, litigation, legal disputes
-- reputation: Brand damage, public relations issues
-- cyber: Technology risks, data breaches, security issues
-
-Respond with a comma-separated list of relevant risk categories (e.g., "regulatory, financial, market"). If no specific risks are identified, respond with "none".
-
-Content:
-\"\"\"
-{content}
-\"\"\"
-
-Risks:"""
+        prompt = build_prompt(content, tickers)
         
-        # Get risk assessment from Gemini
-        risks_response = gemini_prompt(prompt, temperature=0.3, max_tokens=100)
+        risks = None
+        fallback_reason = "deadline"
+        if has_budget(state.deadline):
+            try:
+                # Get risk assessment from Gemini
+                risks_response = agent_prompt("entity_risk", prompt, timeout=remaining_seconds(state.deadline),
+                                              instructions=RISK_INSTRUCTIONS)
+                
+                # Parse the response
+                risks = parse_risks(risks_response)
+            except LLMTimeoutError as e:
+                print(f"Risk analysis timed out: {str(e)}")
+            except CircuitOpenError as e:
+                print(f"Risk analysis skipped: {str(e)}")
+                fallback_reason = "circuit_open"
+            except LLMError as e:
+                print(f"Risk analysis failed: {str(e)}")
+                fallback_reason = "llm_error"
         
-        # Parse the response
-        risks = parse_risks(risks_response)
+        if risks is None:
+            # Latency budget spent or Gemini unavailable - use a cheap local estimate instead
+            risks = heuristic_risks(content)
+            state.degraded_agents = state.degraded_agents + ["EntityRiskAgent"]
+            state.degraded_reasons = {**state.degraded_reasons, "EntityRiskAgent": fallback_reason}
+            metrics.increment(f"{fallback_reason}_fallbacks", agent="EntityRiskAgent")
         
         state.risks = risks
         print(f"Risk analysis complete: {', '.join(risks)}")
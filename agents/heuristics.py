@@ -0,0 +1,68 @@
+import re
+from typing import Dict, List
+
+# Cheap keyword lexicons used when an LLM answer is unavailable (deadline
+# exhausted, upstream down) and for pre-scoring articles before the LLM
+
+POSITIVE_TERMS = {
+    "beat", "beats", "record", "growth", "grew", "surge", "surges", "soar", "soars", "rally",
+    "profit", "profits", "gain", "gains", "upgrade", "upgraded", "raises", "raised", "expansion",
+    "strong", "outperform", "bullish", "dividend", "buyback", "approval", "approved", "rebound",
+}
+
+NEGATIVE_TERMS = {
+    "miss", "misses", "loss", "losses", "decline", "declines", "drop", "drops", "plunge", "plunges",
+    "fall", "falls", "downgrade", "downgraded", "lawsuit", "probe", "investigation", "fine", "fined",
+    "bankruptcy", "default", "layoffs", "cuts", "weak", "bearish", "recall", "fraud", "charges",
+}
+
+HIGH_IMPACT_TERMS = {
+    "merger", "acquisition", "acquire", "acquires", "takeover", "bankruptcy", "sec", "charges",
+    "fraud", "guidance", "earnings", "ipo", "antitrust", "sanctions", "recall", "default", "ceo",
+}
+
+MEDIUM_IMPACT_TERMS = {
+    "launch", "launches", "partnership", "contract", "upgrade", "downgrade", "dividend",
+    "buyback", "layoffs", "forecast", "revenue", "lawsuit", "investigation",
+}
+
+RISK_TERMS: Dict[str, set] = {
+    "regulatory": {"regulator", "regulators", "regulatory", "sec", "fda", "compliance", "antitrust", "probe"},
+    "geopolitical": {"tariff", "tariffs", "sanctions", "war", "trade", "geopolitical", "china", "export"},
+    "financial": {"debt", "default", "liquidity", "credit", "loss", "losses", "writedown", "volatility"},
+    "operational": {"supply", "shortage", "outage", "recall", "strike", "production", "layoffs"},
+    "market": {"competition", "competitor", "competitors", "demand", "share", "pricing"},
+    "legal": {"lawsuit", "litigation", "court", "sued", "settlement", "charges", "fraud"},
+    "reputation": {"scandal", "backlash", "boycott", "controversy"},
+    "cyber": {"breach", "hack", "hacked", "ransomware", "cyberattack", "outage"},
+}
+
+def tokenize(content: str) -> List[str]:
+    """Lower-case word tokens"""
+    return re.findall(r"[a-z][a-z'-]*", content.lower())
+
+def heuristic_sentiment(content: str) -> str:
+    """Sentiment from positive/negative keyword counts"""
+    tokens = tokenize(content)
+    positive = sum(token in POSITIVE_TERMS for token in tokens)
+    negative = sum(token in NEGATIVE_TERMS for token in tokens)
+    if positive > negative:
+        return "positive"
+    if negative > positive:
+        return "negative"
+    return "neutral"
+
+def heuristic_impact(content: str) -> str:
+    """Market impact from high/medium impact event keywords"""
+    tokens = set(tokenize(content))
+    if tokens & HIGH_IMPACT_TERMS:
+        return "high"
+    if tokens & MEDIUM_IMPACT_TERMS:
+        return "medium"
+    return "low"
+
+def heuristic_risks(content: str) -> List[str]:
+    """Risk categories whose keywords appear in the content"""
+    tokens = set(tokenize(content))
+    risks = [category for category, terms in RISK_TERMS.items() if tokens & terms]
+    return risks if risks else ["none"]
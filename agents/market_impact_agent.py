@@ -1,13 +1,186 @@
-from utils.llm_client import gemini_prompt
-from typing import Dict, Any
+from utils.llm_client import agent_prompt, CircuitOpenError, LLMError, LLMTimeoutError
+from utils.packed_prompt import build_packed_instructions, build_packed_prompt, parse_packed_labels
+from utils.deadline import has_budget, remaining_seconds
+from utils.metrics import metrics
+from agents.heuristics import heuristic_impact
+from config import config
+from typing import Dict, Any, List, Optional
+
+VALID_IMPACTS = ["high", "medium", "low"]
+
+IMPACT_FACTORS = """Consider factors such as:
+- High impact: Major corporate events (earnings surprises, M&A, regulatory changes), market-moving announcements
+- Medium impact: Standard earnings reports, product launches, management changes, industry trends
+- Low impact: Routine announcements, minor updates, general market commentary"""
+
+# Static part of every single-article prompt, sent once as a cached context where possible
+IMPACT_INSTRUCTIONS = f"""Evaluate the potential market impact of the financial news content you are given.
+
+{IMPACT_FACTORS}
+
+Respond with ONLY one word: 'high', 'medium', or 'low'."""
+
+PACKED_IMPACT_INSTRUCTIONS = build_packed_instructions(
+    f"Evaluate the potential market impact of each of the financial news articles you are given.\n\n{IMPACT_FACTORS}",
+    VALID_IMPACTS,
+    "impact",
+)
+
+def build_context(tickers: List[str], sentiment: str) -> str:
+    """
+    Build the ticker/sentiment context sentence for an article
+
+    Args:
+        tickers: Tickers extracted during preprocessing
+        sentiment: Sentiment label from the sentiment agent
+
+    Returns:
+        Context string (leading space included)
+    """
+    ticker_context = f" The analysis involves: {', '.join(tickers)}." if tickers else ""
+    sentiment_context = f" The sentiment is {sentiment}."
+    return f"{ticker_context}{sentiment_context}"
+
+def build_prompt(content: str, tickers: List[str], sentiment: str) -> str:
+    """
+    Build the per-article part of the market impact prompt (follows IMPACT_INSTRUCTIONS)
+
+    Args:
+        content: Cleaned article content
+        tickers: Tickers extracted during preprocessing
+        sentiment: Sentiment label from the sentiment agent
+
+    Returns:
+        Prompt text for the LLM
+    """
+    return f"""Context:{build_context(tickers, sentiment)}
+
+Content:
+\"\"\"
+{content}
+\"\"\"
+
+Market Impact:"""
+
+def normalize_impact(response: str) -> Optional[str]:
+    """
+    Map a raw LLM response onto a valid impact level
+
+    Args:
+        response: Raw response from the LLM
+
+    Returns:
+        Valid impact level, or None if the response contains none
+    """
+    impact = response.lower().strip()
+    if impact in VALID_IMPACTS:
+        return impact
+
+    # Try to extract valid impact from response
+    for valid_impact in VALID_IMPACTS:
+        if valid_impact in impact:
+            return valid_impact
+    return None
+
+def classify(content: str, tickers: List[str], sentiment: str, timeout: Optional[float] = None) -> str:
+    """
+    Classify the market impact of a single article with one LLM call
+
+    Args:
+        content: Cleaned article content
+        tickers: Tickers extracted during preprocessing
+        sentiment: Sentiment label from the sentiment agent
+        timeout: Seconds the LLM call may take (None for no limit)
+
+    Returns:
+        Impact level, defaulting to low
+
+    Raises:
+        LLMTimeoutError: If the call does not finish within timeout
+        CircuitOpenError, LLMError: If Gemini is unavailable or the call failed
+    """
+    if not content:
+        return "low"
+
+    impact_response = agent_prompt(
+        "market_impact", build_prompt(content, tickers, sentiment), timeout=timeout, instructions=IMPACT_INSTRUCTIONS
+    )
+    impact = normalize_impact(impact_response)
+    if impact is None:
+        print(f"Invalid impact response: {impact_response}. Defaulting to low.")
+        impact = "low"
+    return impact
+
+def classify_batch(items: List[Dict[str, Any]], batch_size: Optional[int] = None) -> List[Optional[str]]:
+    """
+    Classify many articles, packing up to batch_size of them into each prompt
+
+    Articles whose label is missing or invalid in a packed response are
+    re-queried individually.
+
+    Args:
+        items: Dicts with "content", "tickers" and "sentiment" keys
+        batch_size: Articles per packed prompt (defaults to config.PACKED_BATCH_SIZE)
+
+    Returns:
+        Impact levels in the same order as items; None for articles left
+        unclassified because Gemini failed or its circuit breaker is open
+    """
+    batch_size = batch_size or config.PACKED_BATCH_SIZE
+    impacts: List[Optional[str]] = [None if item["content"] else "low" for item in items]
+    pending = [i for i, item in enumerate(items) if item["content"]]
+
+    for start in range(0, len(pending), max(batch_size, 1)):
+        chunk = pending[start:start + batch_size]
+        if len(chunk) < 2:
+            continue
+
+        # Each block carries its own ticker/sentiment context
+        blocks = [
+            f"Context:{build_context(items[i].get('tickers', []), items[i].get('sentiment', 'neutral'))}\n{items[i]['content']}"
+            for i in chunk
+        ]
+        prompt = build_packed_prompt(blocks, "impact")
+        try:
+            response = agent_prompt("market_impact", prompt, max_tokens=20 * len(chunk) + 20,
+                                    instructions=PACKED_IMPACT_INSTRUCTIONS)
+        except CircuitOpenError as e:
+            print(f"Packed impact prompts skipped: {str(e)}")
+            return impacts
+        except LLMError as e:
+            print(f"Packed impact prompt failed, re-querying individually: {str(e)}")
+            continue
+        labels = parse_packed_labels(response, len(chunk), VALID_IMPACTS, "impact")
+
+        for position, index in enumerate(chunk):
+            impacts[index] = labels.get(position)
+
+        missing = len(chunk) - len(labels)
+        if missing:
+            print(f"Packed impact response missing {missing} of {len(chunk)} labels, re-querying individually")
+
+    # Anything not settled by a packed prompt falls back to one call per article
+    for index in pending:
+        if impacts[index] is None:
+            item = items[index]
+            try:
+                impacts[index] = classify(item["content"], item.get("tickers", []), item.get("sentiment", "neutral"))
+            except CircuitOpenError as e:
+                print(f"Individual impact calls skipped: {str(e)}")
+                break
+            except LLMError as e:
+                # Left open for the agent, which falls back and marks itself degraded
+                print(f"Individual impact call failed: {str(e)}")
+
+    return impacts
 
 def run(state):
     """
     Market impact analysis agent: Evaluate potential market impact of news
-    
+
     Args:
         state: NewsState object with cleaned_content and sentiment
-        
+
     Returns:
         Updated NewsState object with market impact assessment
     """
@@ -15,55 +188,43 @@ def run(state):
         content = state.cleaned_content
         sentiment = state.sentiment
         tickers = state.tickers
-        
+
+        if state.market_impact:
+            # Already classified upstream (e.g. by packed batch mode)
+            print(f"Market impact analysis skipped: precomputed {state.market_impact}")
+            return state
+
         if not content:
             print("Warning: No cleaned content found for market impact analysis")
             state.market_impact = "low"
             return state
-        
-        # Build context-aware prompt
-        ticker_context = f" The analysis involves: {', '.join(tickers)}." if tickers else ""
-        sentiment_context = f" The sentiment is {sentiment}."
-        
-        prompt = f"""Evaluate the potential market impact of the following financial news content.{ticker_context}{sentiment_context}
-
-Consider factors such as:
-- High impact: Major corporate events (earnings surprises, M&A, regulatory changes), market-moving announcements
-- Medium impact: Standard earnings reports, product launches, management changes, industry trends
-- Low impact: Routine announcements, minor updates, general market commentary
 
-Respond with ONLY one word: 'high', 'medium', or 'low'.
+        impact = None
+        fallback_reason = "deadline"
+        if has_budget(state.deadline):
+            try:
+                impact = classify(content, tickers, sentiment, timeout=remaining_seconds(state.deadline))
+            except LLMTimeoutError as e:
+                print(f"Market impact analysis timed out: {str(e)}")
+            except CircuitOpenError as e:
+                print(f"Market impact analysis skipped: {str(e)}")
+                fallback_reason = "circuit_open"
+            except LLMError as e:
+                print(f"Market impact analysis failed: {str(e)}")
+                fallback_reason = "llm_error"
 
-Content:
-\"\"\"
-{content}
-\"\"\"
+        if impact is None:
+            # Latency budget spent or Gemini unavailable - use a cheap local estimate instead
+            impact = heuristic_impact(content)
+            state.degraded_agents = state.degraded_agents + ["MarketImpactAgent"]
+            state.degraded_reasons = {**state.degraded_reasons, "MarketImpactAgent": fallback_reason}
+            metrics.increment(f"{fallback_reason}_fallbacks", agent="MarketImpactAgent")
 
-Market Impact:"""
-        
-        # Get impact assessment from Gemini
-        impact_response = gemini_prompt(prompt, temperature=0.2, max_tokens=10)
-        
-        # Clean and validate response
-        impact = impact_response.lower().strip()
-        
-        # Ensure valid impact level
-        valid_impacts = ["high", "medium", "low"]
-        if impact not in valid_impacts:
-            # Try to extract valid impact from response
-            for valid_impact in valid_impacts:
-                if valid_impact in impact:
-                    impact = valid_impact
-                    break
-            else:
-                print(f"Invalid impact response: {impact_response}. Defaulting to low.")
-                impact = "low"
-        
         state.market_impact = impact
         print(f"Market impact analysis complete: {impact}")
-        
+
         return state
-        
+
     except Exception as e:
         print(f"Error in market impact agent: {str(e)}")
         state.market_impact = "low"
@@ -1,5 +1,6 @@
 import re
 from typing import List, Dict, Any
+from utils.id_generator import generate_content_fingerprint
 
 def extract_tickers(content: str) -> List[str]:
     """
@@ -90,6 +91,7 @@ def run(state):
         # Update state
         state.tickers = tickers
         state.cleaned_content = cleaned_content
+        state.fingerprint = generate_content_fingerprint(headline, content)
         
         print(f"Preprocessing complete: Found {len(tickers)} tickers, cleaned {len(cleaned_content)} characters")
         
@@ -0,0 +1,197 @@
+import os
+import zlib
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+from agents.heuristics import (
+    HIGH_IMPACT_TERMS,
+    MEDIUM_IMPACT_TERMS,
+    NEGATIVE_TERMS,
+    POSITIVE_TERMS,
+    RISK_TERMS,
+    tokenize,
+)
+from agents.preprocessing_agent import extract_tickers
+from config import config
+
+# Words that mark an article as being about companies, markets or the economy
+FINANCE_TERMS = {
+    "stock", "stocks", "share", "shares", "shareholders", "investor", "investors", "market", "markets",
+    "revenue", "revenues", "profit", "earnings", "quarter", "quarterly", "fiscal", "sales", "margin",
+    "margins", "analyst", "analysts", "valuation", "dividend", "nasdaq", "nyse", "index", "s&p",
+    "dow", "bond", "bonds", "yield", "yields", "inflation", "interest", "rates", "fed", "central",
+    "bank", "banks", "economy", "economic", "gdp", "billion", "million", "trading", "traders",
+    "hedge", "fund", "funds", "etf", "portfolio", "eps", "forecast", "outlook", "guidance",
+    "company", "companies", "corporation", "inc", "corp", "ceo", "cfo", "board", "regulator",
+    "acquisition", "merger", "deal", "ipo", "listing", "securities", "commodities", "oil", "crypto",
+    "unveils", "unveiled", "shipments", "prices", "opec", "tariff", "tariffs",
+}
+FINANCE_TERMS |= POSITIVE_TERMS | NEGATIVE_TERMS | HIGH_IMPACT_TERMS | MEDIUM_IMPACT_TERMS
+FINANCE_TERMS |= set().union(*RISK_TERMS.values())
+
+# Words typical of lifestyle, sports and entertainment pieces that rarely
+# appear in market coverage; ones like "series", "team", "game" or "review"
+# also name funding rounds, products and filings, so they are left out
+OFF_TOPIC_TERMS = {
+    "recipe", "recipes", "cooking", "chef", "restaurant", "fashion", "beauty", "celebrity",
+    "actor", "actress", "movie", "film", "album", "song", "concert", "episode",
+    "coach", "league", "tournament", "championship", "playoff", "playoffs", "touchdown",
+    "hands-on", "unboxing", "specs", "wallpaper", "tips", "how-to",
+    "travel", "vacation", "horoscope", "wedding", "dating", "workout", "diet", "weather",
+}
+
+# Hashed bag-of-words dimensionality; collisions are rare at this size
+N_FEATURES = 2 ** 14
+TERM_WEIGHT = 0.8
+TICKER_WEIGHT = 1.5
+MAX_TICKER_HITS = 3
+# An article with no vocabulary hit scores 0.5, above RELEVANCE_THRESHOLD:
+# only off-topic words outweighing finance words by two or more drop it
+DEFAULT_BIAS = 0.0
+
+def _bucket(token: str) -> int:
+    # crc32 is stable across processes, unlike hash() on str
+    return zlib.crc32(token.encode("utf-8")) % N_FEATURES
+
+class SparseFeatures(NamedTuple):
+    """Token-presence features in coordinate form: text rows[i] contains bucket buckets[i]"""
+    rows: np.ndarray
+    buckets: np.ndarray
+    ticker_hits: np.ndarray
+
+class RelevanceModel:
+    """
+    Hashed bag-of-words logistic model of financial relevance
+
+    Each distinct token sets one of N_FEATURES hashed buckets, and a capped
+    count of ticker hits is an extra feature. The default weights come from
+    the finance and off-topic vocabularies; `fit` refines them from labeled
+    headlines and `save`/`load` keep them in an .npz file.
+    """
+
+    def __init__(self, weights: Optional[np.ndarray] = None, ticker_weight: float = TICKER_WEIGHT,
+                 bias: float = DEFAULT_BIAS):
+        if weights is None:
+            weights = np.zeros(N_FEATURES, dtype=np.float32)
+            for term in FINANCE_TERMS:
+                weights[_bucket(term)] = TERM_WEIGHT
+            for term in OFF_TOPIC_TERMS:
+                weights[_bucket(term)] = -TERM_WEIGHT
+        self.weights = weights.astype(np.float32)
+        self.ticker_weight = float(ticker_weight)
+        self.bias = float(bias)
+
+    @staticmethod
+    def featurize(texts: List[str]) -> SparseFeatures:
+        """Distinct token buckets of each text plus its capped ticker-hit count"""
+        rows: List[int] = []
+        buckets: List[int] = []
+        ticker_hits = np.zeros(len(texts), dtype=np.float32)
+        for row, text in enumerate(texts):
+            text_buckets = {_bucket(token) for token in tokenize(text)}
+            rows.extend([row] * len(text_buckets))
+            buckets.extend(text_buckets)
+            ticker_hits[row] = min(len(extract_tickers(text)), MAX_TICKER_HITS)
+        return SparseFeatures(np.asarray(rows, dtype=np.int64), np.asarray(buckets, dtype=np.int64), ticker_hits)
+
+    def score_features(self, features: SparseFeatures) -> np.ndarray:
+        term_logits = np.bincount(features.rows, weights=self.weights[features.buckets],
+                                  minlength=len(features.ticker_hits))
+        logits = term_logits + features.ticker_hits * self.ticker_weight + self.bias
+        return 1.0 / (1.0 + np.exp(-logits))
+
+    def score(self, texts: List[str]) -> np.ndarray:
+        """Probability that each text is financial news"""
+        if not texts:
+            return np.zeros(0, dtype=np.float32)
+        return self.score_features(self.featurize(texts))
+
+    def fit(self, texts: List[str], labels: Iterable[int], epochs: int = 200, learning_rate: float = 0.5,
+            l2: float = 1e-3) -> "RelevanceModel":
+        """Refine the weights by gradient descent on labeled texts (1 = relevant)"""
+        features = self.featurize(texts)
+        labels = np.asarray(list(labels), dtype=np.float32)
+        for _ in range(epochs):
+            error = self.score_features(features) - labels
+            # Gradient of the term weights: each text's error summed into its buckets
+            gradient = np.bincount(features.buckets, weights=error[features.rows], minlength=N_FEATURES)
+            self.weights -= learning_rate * (gradient / len(labels) + l2 * self.weights).astype(np.float32)
+            self.ticker_weight -= learning_rate * float(features.ticker_hits @ error) / len(labels)
+            self.bias -= learning_rate * float(error.mean())
+        return self
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(path, weights=self.weights, ticker_weight=self.ticker_weight, bias=self.bias)
+
+    @classmethod
+    def load(cls, path: str) -> "RelevanceModel":
+        data = np.load(path)
+        return cls(data["weights"], float(data["ticker_weight"]), float(data["bias"]))
+
+_model: Optional[RelevanceModel] = None
+
+def get_model() -> RelevanceModel:
+    """Shared model: trained weights from config.RELEVANCE_MODEL_PATH if present, else the vocabulary defaults"""
+    global _model
+    if _model is None:
+        path = config.RELEVANCE_MODEL_PATH
+        _model = RelevanceModel.load(path) if path and os.path.exists(path) else RelevanceModel()
+    return _model
+
+def score_batch(texts: List[str]) -> List[float]:
+    """Relevance probabilities for many texts in one vectorized pass"""
+    return [float(score) for score in get_model().score(texts)]
+
+def is_relevant(score: float) -> bool:
+    return not config.RELEVANCE_FILTER_ENABLED or score >= config.RELEVANCE_THRESHOLD
+
+def evaluate_filter(texts: List[str], labels: List[bool]) -> Dict[str, float]:
+    """
+    Precision and recall of the filter's "relevant" decision
+
+    Args:
+        texts: Article texts (headline and content)
+        labels: Whether each article is actually financial news
+
+    Returns:
+        Confusion counts plus precision and recall of kept articles
+    """
+    kept = [is_relevant(score) for score in score_batch(texts)]
+    tp = sum(keep and label for keep, label in zip(kept, labels))
+    fp = sum(keep and not label for keep, label in zip(kept, labels))
+    fn = sum(not keep and label for keep, label in zip(kept, labels))
+    tn = len(labels) - tp - fp - fn
+    return {
+        "threshold": config.RELEVANCE_THRESHOLD,
+        "true_positives": tp,
+        "false_positives": fp,
+        "false_negatives": fn,
+        "true_negatives": tn,
+        "precision": tp / (tp + fp) if tp + fp else 1.0,
+        "recall": tp / (tp + fn) if tp + fn else 1.0,
+    }
+
+def run(state):
+    """
+    Relevance filter: score how likely the article is financial news
+
+    Batch callers may seed state.relevance from score_batch; it is only
+    computed here when missing.
+
+    Args:
+        state: NewsState object with cleaned content
+
+    Returns:
+        Updated NewsState object with a relevance score in [0, 1]
+    """
+    try:
+        if state.relevance is None:
+            state.relevance = score_batch([state.cleaned_content])[0]
+        print(f"Relevance score: {state.relevance:.2f}")
+    except Exception as e:
+        # Never drop an article because the filter itself failed
+        print(f"Error in relevance filter: {str(e)}")
+        state.relevance = 1.0
+    return state
@@ -1,63 +1,201 @@
-from utils.llm_client import gemini_prompt
-from typing import Dict, Any
+from utils.llm_client import agent_prompt, CircuitOpenError, LLMError, LLMTimeoutError
+from utils.packed_prompt import build_packed_instructions, build_packed_prompt, parse_packed_labels
+from utils.deadline import has_budget, remaining_seconds
+from utils.metrics import metrics
+from agents.heuristics import heuristic_sentiment
+from config import config
+from typing import Dict, Any, List, Optional
+
+VALID_SENTIMENTS = ["positive", "negative", "neutral"]
+
+SENTIMENT_FACTORS = """Consider factors such as:
+- Positive indicators: growth, profits, expansion, success, positive outlook
+- Negative indicators: losses, decline, bankruptcy, failure, negative outlook
+- Neutral indicators: routine announcements, mixed signals, uncertainty"""
+
+# Static part of every single-article prompt, sent once as a cached context where possible
+SENTIMENT_INSTRUCTIONS = f"""Analyze the financial sentiment of the news article content you are given.
+
+{SENTIMENT_FACTORS}
+
+Respond with ONLY one word: 'positive', 'negative', or 'neutral'."""
+
+PACKED_SENTIMENT_INSTRUCTIONS = build_packed_instructions(
+    f"Analyze the financial sentiment of each of the news articles you are given.\n\n{SENTIMENT_FACTORS}",
+    VALID_SENTIMENTS,
+    "sentiment",
+)
+
+def build_prompt(content: str) -> str:
+    """
+    Build the per-article part of the sentiment prompt (follows SENTIMENT_INSTRUCTIONS)
+
+    Args:
+        content: Cleaned article content
+
+    Returns:
+        Prompt text for the LLM
+    """
+    return f"""Content:
+\"\"\"
+{content}
+\"\"\"
+
+Sentiment:"""
+
+def normalize_sentiment(response: str) -> Optional[str]:
+    """
+    Map a raw LLM response onto a valid sentiment label
+
+    Args:
+        response: Raw response from the LLM
+
+    Returns:
+        Valid sentiment label, or None if the response contains none
+    """
+    sentiment = response.lower().strip()
+    if sentiment in VALID_SENTIMENTS:
+        return sentiment
+
+    # Try to extract valid sentiment from response
+    for valid_sentiment in VALID_SENTIMENTS:
+        if valid_sentiment in sentiment:
+            return valid_sentiment
+    return None
+
+def classify(content: str, timeout: Optional[float] = None) -> str:
+    """
+    Classify the sentiment of a single article with one LLM call
+
+    Args:
+        content: Cleaned article content
+        timeout: Seconds the LLM call may take (None for no limit)
+
+    Returns:
+        Sentiment label, defaulting to neutral
+
+    Raises:
+        LLMTimeoutError: If the call does not finish within timeout
+        CircuitOpenError, LLMError: If Gemini is unavailable or the call failed
+    """
+    if not content:
+        return "neutral"
+
+    sentiment_response = agent_prompt(
+        "sentiment", build_prompt(content), timeout=timeout, instructions=SENTIMENT_INSTRUCTIONS
+    )
+    sentiment = normalize_sentiment(sentiment_response)
+    if sentiment is None:
+        print(f"Invalid sentiment response: {sentiment_response}. Defaulting to neutral.")
+        sentiment = "neutral"
+    return sentiment
+
+def classify_batch(contents: List[str], batch_size: Optional[int] = None) -> List[Optional[str]]:
+    """
+    Classify many articles, packing up to batch_size of them into each prompt
+
+    Articles whose label is missing or invalid in a packed response are
+    re-queried individually.
+
+    Args:
+        contents: Cleaned article contents
+        batch_size: Articles per packed prompt (defaults to config.PACKED_BATCH_SIZE)
+
+    Returns:
+        Sentiment labels in the same order as contents; None for articles
+        left unclassified because Gemini failed or its circuit breaker is open
+    """
+    batch_size = batch_size or config.PACKED_BATCH_SIZE
+    sentiments: List[Optional[str]] = [None if content else "neutral" for content in contents]
+    pending = [i for i, content in enumerate(contents) if content]
+
+    for start in range(0, len(pending), max(batch_size, 1)):
+        chunk = pending[start:start + batch_size]
+        if len(chunk) < 2:
+            continue
+
+        prompt = build_packed_prompt([contents[i] for i in chunk], "sentiment")
+        try:
+            response = agent_prompt("sentiment", prompt, max_tokens=20 * len(chunk) + 20,
+                                    instructions=PACKED_SENTIMENT_INSTRUCTIONS)
+        except CircuitOpenError as e:
+            print(f"Packed sentiment prompts skipped: {str(e)}")
+            return sentiments
+        except LLMError as e:
+            print(f"Packed sentiment prompt failed, re-querying individually: {str(e)}")
+            continue
+        labels = parse_packed_labels(response, len(chunk), VALID_SENTIMENTS, "sentiment")
+
+        for position, index in enumerate(chunk):
+            sentiments[index] = labels.get(position)
+
+        missing = len(chunk) - len(labels)
+        if missing:
+            print(f"Packed sentiment response missing {missing} of {len(chunk)} labels, re-querying individually")
+
+    # Anything not settled by a packed prompt falls back to one call per article
+    for index in pending:
+        if sentiments[index] is None:
+            try:
+                sentiments[index] = classify(contents[index])
+            except CircuitOpenError as e:
+                print(f"Individual sentiment calls skipped: {str(e)}")
+                break
+            except LLMError as e:
+                # Left open for the agent, which falls back and marks itself degraded
+                print(f"Individual sentiment call failed: {str(e)}")
+
+    return sentiments
 
 def run(state):
     """
     Sentiment analysis agent: Analyze financial sentiment of news content
-    
+
     Args:
         state: NewsState object with cleaned_content
-        
+
     Returns:
         Updated NewsState object with sentiment analysis
     """
     try:
         content = state.cleaned_content
-        
+
+        if state.sentiment:
+            # Already classified upstream (e.g. by packed batch mode)
+            print(f"Sentiment analysis skipped: precomputed {state.sentiment}")
+            return state
+
         if not content:
             print("Warning: No cleaned content found for sentiment analysis")
             state.sentiment = "neutral"
             return state
-        
-        prompt = f"""Analyze the financial sentiment of the following news article content. 
-
-Consider factors such as:
-- Positive indicators: growth, profits, expansion, success, positive outlook
-- Negative indicators: losses, decline, bankruptcy, failure, negative outlook
-- Neutral indicators: routine announcements, mixed signals, uncertainty
 
-Respond with ONLY one word: 'positive', 'negative', or 'neutral'.
+        sentiment = None
+        fallback_reason = "deadline"
+        if has_budget(state.deadline):
+            try:
+                sentiment = classify(content, timeout=remaining_seconds(state.deadline))
+            except LLMTimeoutError as e:
+                print(f"Sentiment analysis timed out: {str(e)}")
+            except CircuitOpenError as e:
+                print(f"Sentiment analysis skipped: {str(e)}")
+                fallback_reason = "circuit_open"
+            except LLMError as e:
+                print(f"Sentiment analysis failed: {str(e)}")
+                fallback_reason = "llm_error"
 
-Content:
-\"\"\"
-{content}
-\"\"\"
+        if sentiment is None:
+            # Latency budget spent or Gemini unavailable - use a cheap local estimate instead
+            sentiment = heuristic_sentiment(content)
+            state.degraded_agents = state.degraded_agents + ["SentimentAnalysisAgent"]
+            state.degraded_reasons = {**state.degraded_reasons, "SentimentAnalysisAgent": fallback_reason}
+            metrics.increment(f"{fallback_reason}_fallbacks", agent="SentimentAnalysisAgent")
 
-Sentiment:"""
-        
-        # Get sentiment from Gemini
-        sentiment_response = gemini_prompt(prompt, temperature=0.2, max_tokens=10)
-        
-        # Clean and validate response
-        sentiment = sentiment_response.lower().strip()
-        
-        # Ensure valid sentiment
-        valid_sentiments = ["positive", "negative", "neutral"]
-        if sentiment not in valid_sentiments:
-            # Try to extract valid sentiment from response
-            for valid_sentiment in valid_sentiments:
-                if valid_sentiment in sentiment:
-                    sentiment = valid_sentiment
-                    break
-            else:
-                print(f"Invalid sentiment response: {sentiment_response}. Defaulting to neutral.")
-                sentiment = "neutral"
-        
         state.sentiment = sentiment
         print(f"Sentiment analysis complete: {sentiment}")
-        
+
         return state
-        
+
     except Exception as e:
         print(f"Error in sentiment agent: {str(e)}")
         state.sentiment = "neutral"
@@ -11,11 +11,187 @@ class Config:
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
     SERPER_API_KEY = os.getenv("SERPER_API_KEY")
     
+    # API Endpoints (overridable, e.g. to point at local stand-ins for load tests)
+    SERPER_API_URL = os.getenv("SERPER_API_URL", "https://google.serper.dev/news")
+    SERPER_TIMEOUT_SECONDS = float(os.getenv("SERPER_TIMEOUT_SECONDS", "10"))
+    # Upper bound on pages requested by one paginated search
+    SERPER_MAX_PAGES = int(os.getenv("SERPER_MAX_PAGES", "10"))
+    # Gemini REST endpoint such as http://127.0.0.1:8081; empty uses Google's API
+    GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "")
+    
     # Model Settings
     GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
     DEFAULT_TEMPERATURE = float(os.getenv("DEFAULT_TEMPERATURE", "0.3"))
     DEFAULT_MAX_TOKENS = int(os.getenv("DEFAULT_MAX_TOKENS", "500"))
     
+    # Per-agent model profiles; the single-word classifiers default to the fastest model
+    GEMINI_FAST_MODEL = os.getenv("GEMINI_FAST_MODEL", "gemini-1.5-flash-8b")
+    AGENT_PROFILES = {
+        "sentiment": {
+            "model": os.getenv("SENTIMENT_MODEL", GEMINI_FAST_MODEL),
+            "temperature": float(os.getenv("SENTIMENT_TEMPERATURE", "0.2")),
+            "max_tokens": int(os.getenv("SENTIMENT_MAX_TOKENS", "10")),
+        },
+        "market_impact": {
+            "model": os.getenv("MARKET_IMPACT_MODEL", GEMINI_FAST_MODEL),
+            "temperature": float(os.getenv("MARKET_IMPACT_TEMPERATURE", "0.2")),
+            "max_tokens": int(os.getenv("MARKET_IMPACT_MAX_TOKENS", "10")),
+        },
+        "entity_risk": {
+            "model": os.getenv("ENTITY_RISK_MODEL", GEMINI_MODEL),
+            "temperature": float(os.getenv("ENTITY_RISK_TEMPERATURE", "0.3")),
+            "max_tokens": int(os.getenv("ENTITY_RISK_MAX_TOKENS", "100")),
+        },
+    }
+    
+    # USD per million tokens, for cost accounting ("default" covers unlisted models);
+    # cache_storage is per million cached tokens per hour
+    MODEL_PRICES = {
+        "gemini-1.5-pro": {"input": 1.25, "cached_input": 0.3125, "output": 5.00, "cache_storage": 4.50},
+        "gemini-1.5-flash": {"input": 0.075, "cached_input": 0.01875, "output": 0.30, "cache_storage": 1.00},
+        "gemini-1.5-flash-8b": {"input": 0.0375, "cached_input": 0.01, "output": 0.15, "cache_storage": 0.25},
+        "default": {"input": 0.075, "cached_input": 0.01875, "output": 0.30, "cache_storage": 1.00},
+    }
+    
+    # Token Budgets (rolling windows; 0 disables a budget)
+    TOKEN_BUDGET_PER_MINUTE = int(os.getenv("TOKEN_BUDGET_PER_MINUTE", "0"))
+    TOKEN_BUDGET_PER_DAY = int(os.getenv("TOKEN_BUDGET_PER_DAY", "0"))
+    TOKEN_BUDGET_PER_USER_PER_DAY = int(os.getenv("TOKEN_BUDGET_PER_USER_PER_DAY", "0"))
+    # Share of a budget after which the pipeline switches to cheaper modes
+    TOKEN_BUDGET_SOFT_RATIO = float(os.getenv("TOKEN_BUDGET_SOFT_RATIO", "0.8"))
+    
+    # Model Tiering (fall back to a faster model while one is slow)
+    MODEL_TIERING_ENABLED = os.getenv("MODEL_TIERING_ENABLED", "false").lower() == "true"
+    # Ordered slowest/strongest to fastest
+    MODEL_TIERS = [m.strip() for m in os.getenv("MODEL_TIERS", "gemini-1.5-pro,gemini-1.5-flash,gemini-1.5-flash-8b").split(",") if m.strip()]
+    MODEL_TIERING_P95_SECONDS = float(os.getenv("MODEL_TIERING_P95_SECONDS", "4.0"))
+    # Share of calls still sent to a demoted model so its latency is re-measured
+    MODEL_TIERING_PROBE_RATE = float(os.getenv("MODEL_TIERING_PROBE_RATE", "0.05"))
+    
+    # Batch Settings
+    # Articles packed into one sentiment/impact prompt (1 disables packing)
+    PACKED_BATCH_SIZE = int(os.getenv("PACKED_BATCH_SIZE", "1"))
+    
+    # LLM Concurrency Settings (adaptive AIMD limit on in-flight Gemini calls)
+    LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+    LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", "4"))
+    LLM_LATENCY_TARGET_SECONDS = float(os.getenv("LLM_LATENCY_TARGET_SECONDS", "5.0"))
+    
+    # Circuit Breakers (per upstream and Gemini model: fail fast while one is failing or slow)
+    CIRCUIT_BREAKER_ENABLED = os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+    # Share of calls in the window that fail, or take CIRCUIT_SLOW_CALL_SECONDS or longer, to open a breaker
+    CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+    CIRCUIT_SLOW_CALL_RATE = float(os.getenv("CIRCUIT_SLOW_CALL_RATE", "0.5"))
+    CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "10"))
+    CIRCUIT_WINDOW_SECONDS = float(os.getenv("CIRCUIT_WINDOW_SECONDS", "30"))
+    CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "10"))
+    # Seconds an open breaker refuses calls before letting trial calls through
+    CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+    CIRCUIT_HALF_OPEN_CALLS = int(os.getenv("CIRCUIT_HALF_OPEN_CALLS", "3"))
+    # Model used while a model's breaker is open (empty: agents fall back to local estimates)
+    CIRCUIT_FALLBACK_MODEL = os.getenv("CIRCUIT_FALLBACK_MODEL", GEMINI_FAST_MODEL)
+    
+    # Context Caching (agent instructions sent as a provider-side cached context, one per model and agent)
+    CONTEXT_CACHE_ENABLED = os.getenv("CONTEXT_CACHE_ENABLED", "true").lower() == "true"
+    # Shorter instructions are sent as a plain system instruction (Gemini 1.5 caches need 32,768 tokens)
+    CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("CONTEXT_CACHE_MIN_TOKENS", "32768"))
+    CONTEXT_CACHE_TTL_SECONDS = float(os.getenv("CONTEXT_CACHE_TTL_SECONDS", "3600"))
+    # A cached context is extended once less than this is left before it expires
+    CONTEXT_CACHE_REFRESH_SECONDS = float(os.getenv("CONTEXT_CACHE_REFRESH_SECONDS", "300"))
+    # After a failed create, the model/agent pair uses plain instructions for this long
+    CONTEXT_CACHE_RETRY_SECONDS = float(os.getenv("CONTEXT_CACHE_RETRY_SECONDS", "600"))
+    
+    # Hedged Requests (send a duplicate Gemini call when the first is unusually slow)
+    LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+    # Percentile of recent latency after which the duplicate is sent
+    LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+    # Maximum share of calls that may be hedged
+    LLM_HEDGE_MAX_RATE = float(os.getenv("LLM_HEDGE_MAX_RATE", "0.05"))
+    LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    
+    # Latency Budget Settings
+    # Per-article deadline; agents fall back to local heuristics once it is spent (0 disables)
+    ANALYSIS_DEADLINE_SECONDS = float(os.getenv("ANALYSIS_DEADLINE_SECONDS", "30"))
+    # Smallest remaining budget worth starting an LLM call with
+    MIN_LLM_CALL_SECONDS = float(os.getenv("MIN_LLM_CALL_SECONDS", "0.5"))
+    
+    # Routing Settings
+    # Articles whose cleaned content is shorter than this skip all LLM agents
+    MIN_CONTENT_CHARS = int(os.getenv("MIN_CONTENT_CHARS", "20"))
+    # "neutral_low" skips risk extraction for neutral, low-impact articles; "never" always runs it
+    SKIP_RISK_POLICY = os.getenv("SKIP_RISK_POLICY", "neutral_low")
+    ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "1000"))
+    # Articles scored below the threshold as financial news skip all LLM agents
+    RELEVANCE_FILTER_ENABLED = os.getenv("RELEVANCE_FILTER_ENABLED", "false").lower() == "true"
+    RELEVANCE_THRESHOLD = float(os.getenv("RELEVANCE_THRESHOLD", "0.3"))
+    # Optional .npz weights saved by RelevanceModel.save; vocabulary defaults otherwise
+    RELEVANCE_MODEL_PATH = os.getenv("RELEVANCE_MODEL_PATH", "")
+    
+    # Decision Rules (JSON table saved by DecisionRuleTable.to_file; empty uses the built-in rules)
+    DECISION_RULES_PATH = os.getenv("DECISION_RULES_PATH", "")
+    
+    # Storage Settings
+    DATA_DIR = os.getenv("FNNA_DATA_DIR", ".fnna_data")
+    
+    # Append each analyzed article (once per article_id) to the columnar corpus store under DATA_DIR/corpus
+    CORPUS_ENABLED = os.getenv("CORPUS_ENABLED", "false").lower() == "true"
+    
+    # Checkpoint Settings (resume interrupted analyses without repeating LLM calls)
+    CHECKPOINT_ENABLED = os.getenv("CHECKPOINT_ENABLED", "false").lower() == "true"
+    CHECKPOINT_BATCH_SIZE = int(os.getenv("CHECKPOINT_BATCH_SIZE", "32"))
+    CHECKPOINT_FLUSH_SECONDS = float(os.getenv("CHECKPOINT_FLUSH_SECONDS", "0.5"))
+    CHECKPOINT_TTL_HOURS = float(os.getenv("CHECKPOINT_TTL_HOURS", "24"))
+    
+    # Profiling Settings
+    PROFILE_ENABLED = os.getenv("FNNA_PROFILE", "false").lower() == "true"
+    # Fraction of analyses profiled when enabled
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "1.0"))
+    # Also capture sampled Python stacks of CPU-bound node work
+    PROFILE_STACKS = os.getenv("PROFILE_STACKS", "false").lower() == "true"
+    PROFILE_SAMPLING_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLING_INTERVAL_MS", "5"))
+    
+    # Article Fetch Settings (full text instead of search snippets)
+    FETCH_FULL_TEXT = os.getenv("FETCH_FULL_TEXT", "false").lower() == "true"
+    FETCH_MAX_WORKERS = int(os.getenv("FETCH_MAX_WORKERS", "8"))
+    FETCH_PER_HOST_CONNECTIONS = int(os.getenv("FETCH_PER_HOST_CONNECTIONS", "2"))
+    FETCH_TIMEOUT_SECONDS = float(os.getenv("FETCH_TIMEOUT_SECONDS", "10"))
+    FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", "2000000"))
+    MAX_ARTICLE_CHARS = int(os.getenv("MAX_ARTICLE_CHARS", "8000"))
+    
+    # Job Queue Settings
+    # Analyses run at once across all UI sessions
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+    # Finished jobs kept so repeat requests for an article reuse the result
+    JOB_RETENTION = int(os.getenv("JOB_RETENTION", "200"))
+    # Other fetched articles analyzed in the background at low priority (0 disables)
+    PREFETCH_MAX_ARTICLES = int(os.getenv("PREFETCH_MAX_ARTICLES", "4"))
+    # Tickers whose news jumps the analysis queue (comma-separated)
+    PRIORITY_WATCHLIST = [t.strip().upper() for t in os.getenv("PRIORITY_WATCHLIST", "").split(",") if t.strip()]
+    # Queued jobs move up one priority class per this many seconds of waiting
+    PRIORITY_AGING_SECONDS = float(os.getenv("PRIORITY_AGING_SECONDS", "30"))
+    
+    # Work Queue Settings (durable queue drained by worker processes on one or more hosts)
+    # Watched articles go to the work queue instead of being analyzed in the app process
+    WORK_QUEUE_ENABLED = os.getenv("WORK_QUEUE_ENABLED", "false").lower() == "true"
+    # redis://host:6379/0 for workers on several hosts; empty uses SQLite at DATA_DIR/work_queue.db
+    WORK_QUEUE_URL = os.getenv("WORK_QUEUE_URL", "")
+    # Worker processes started by `python -m core.work_queue worker`
+    WORK_QUEUE_WORKERS = int(os.getenv("WORK_QUEUE_WORKERS", "4"))
+    # Visibility timeout; workers renew the lease while an analysis runs
+    WORK_QUEUE_LEASE_SECONDS = float(os.getenv("WORK_QUEUE_LEASE_SECONDS", "60"))
+    # Attempts before an article is dead-lettered; retries back off from WORK_QUEUE_RETRY_SECONDS
+    WORK_QUEUE_MAX_ATTEMPTS = int(os.getenv("WORK_QUEUE_MAX_ATTEMPTS", "3"))
+    WORK_QUEUE_RETRY_SECONDS = float(os.getenv("WORK_QUEUE_RETRY_SECONDS", "5"))
+    WORK_QUEUE_RESULT_TTL_HOURS = float(os.getenv("WORK_QUEUE_RESULT_TTL_HOURS", "24"))
+    
+    # Watcher Settings
+    WATCH_INTERVAL_SECONDS = int(os.getenv("WATCH_INTERVAL_SECONDS", "300"))
+    WATCH_NUM_RESULTS = int(os.getenv("WATCH_NUM_RESULTS", "10"))
+    
+    # Ticker Signal Settings
+    TICKER_SIGNAL_HALF_LIFE_HOURS = float(os.getenv("TICKER_SIGNAL_HALF_LIFE_HOURS", "24"))
+    
     # Application Settings
     APP_TITLE = "📰 Financial News Analysis Agent"
     APP_DESCRIPTION = "AI-powered financial news analysis using Google Gemini"
@@ -0,0 +1,48 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from config import config
+
+class AnalysisCache:
+    """
+    Bounded LRU cache of completed agent outputs keyed by article fingerprint
+
+    Only the LLM-derived fields (sentiment, market impact, risks) are stored;
+    the aggregator recomputes the final decision from them on a cache hit.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or config.ANALYSIS_CACHE_SIZE
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        if not fingerprint:
+            return None
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is not None:
+                self._entries.move_to_end(fingerprint)
+            return entry
+
+    def put(self, fingerprint: str, entry: Dict[str, Any]):
+        if not fingerprint:
+            return
+        with self._lock:
+            self._entries[fingerprint] = entry
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, fingerprint: str) -> bool:
+        with self._lock:
+            return fingerprint in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
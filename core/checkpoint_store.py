@@ -0,0 +1,126 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import config
+from utils.metrics import metrics
+
+class CheckpointStore:
+    """
+    Durable per-node outputs keyed by (article fingerprint, node name)
+
+    Writes are buffered and committed to SQLite in batches, either when the
+    buffer fills up or every flush_seconds from a background thread, so a
+    node completion costs a dict append rather than a disk sync. Reads see
+    buffered writes immediately.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        flush_seconds: Optional[float] = None,
+        ttl_hours: Optional[float] = None,
+    ):
+        self.db_path = db_path or os.path.join(config.DATA_DIR, "checkpoints.db")
+        self.batch_size = batch_size or config.CHECKPOINT_BATCH_SIZE
+        self.flush_seconds = flush_seconds or config.CHECKPOINT_FLUSH_SECONDS
+        ttl_hours = config.CHECKPOINT_TTL_HOURS if ttl_hours is None else ttl_hours
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS node_checkpoints ("
+            "fingerprint TEXT NOT NULL, node TEXT NOT NULL, output TEXT NOT NULL, "
+            "updated_at REAL NOT NULL, PRIMARY KEY (fingerprint, node))"
+        )
+        if ttl_hours > 0:
+            # Checkpoints only matter for resuming recent work
+            self._conn.execute(
+                "DELETE FROM node_checkpoints WHERE updated_at < ?", (time.time() - ttl_hours * 3600,)
+            )
+        self._conn.commit()
+
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="checkpoint-flusher", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def get(self, fingerprint: str, node: str) -> Optional[Dict[str, Any]]:
+        """Saved output of a node for an article, or None if it has not completed"""
+        with self._lock:
+            pending = self._pending.get((fingerprint, node))
+            if pending is not None:
+                return json.loads(pending[0])
+            row = self._conn.execute(
+                "SELECT output FROM node_checkpoints WHERE fingerprint = ? AND node = ?",
+                (fingerprint, node),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def completed_nodes(self, fingerprint: str) -> List[str]:
+        """Names of the nodes with a checkpoint for an article"""
+        with self._lock:
+            nodes = {node for fp, node in self._pending if fp == fingerprint}
+            rows = self._conn.execute(
+                "SELECT node FROM node_checkpoints WHERE fingerprint = ?", (fingerprint,)
+            ).fetchall()
+        return sorted(nodes | {row[0] for row in rows})
+
+    def put(self, fingerprint: str, node: str, output: Dict[str, Any]):
+        """Record a node's output; committed with the next batch"""
+        start = time.perf_counter()
+        payload = json.dumps(output)
+        with self._lock:
+            self._pending[(fingerprint, node)] = (payload, time.time())
+            should_flush = len(self._pending) >= self.batch_size
+        if should_flush:
+            self.flush()
+        metrics.observe("checkpoint_put_seconds", time.perf_counter() - start)
+
+    def flush(self):
+        """Commit all buffered checkpoints in one transaction"""
+        with self._lock:
+            if not self._pending:
+                return
+            rows = [
+                (fingerprint, node, payload, updated_at)
+                for (fingerprint, node), (payload, updated_at) in self._pending.items()
+            ]
+            start = time.perf_counter()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO node_checkpoints (fingerprint, node, output, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            self._pending.clear()
+        metrics.observe("checkpoint_flush_seconds", time.perf_counter() - start)
+        metrics.increment("checkpoint_rows_written", len(rows))
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_seconds):
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"Error flushing checkpoints: {str(e)}")
+
+    def close(self):
+        """Flush outstanding checkpoints and close the database"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self.flush()
+        with self._lock:
+            self._conn.close()
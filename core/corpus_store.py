@@ -0,0 +1,438 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config import config
+from core.scheduler import article_age_hours
+from utils.metrics import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within one process
+    fcntl = None
+
+# Fixed-width columns: name -> dtype. Label columns hold dictionary codes.
+COLUMNS = {
+    "published_ts": np.int64,   # epoch seconds, -1 when published_at could not be parsed
+    "analyzed_ts": np.int64,
+    "sentiment": np.uint8,
+    "impact_level": np.uint8,
+    "route": np.uint8,
+    "quality": np.uint8,
+    "decision": np.uint16,
+    "confidence": np.float32,
+    "relevance": np.float32,    # NaN when the article was not scored
+}
+# Single-valued string columns stored as codes into a dictionary
+LABEL_COLUMNS = ["sentiment", "impact_level", "route", "quality", "decision"]
+# final_analysis keys for columns whose name differs
+ANALYSIS_KEYS = {"quality": "analysis_quality"}
+# Variable-length text, one heap and one end-offset column each
+TEXT_FIELDS = ["article_id", "headline", "link", "source", "content"]
+# Multi-valued columns: CSR layout of dictionary codes with per-row end offsets.
+# Risks are free-form LLM labels, so their dictionary is unbounded.
+LIST_FIELDS = ["tickers", "risks"]
+
+class CorpusStore:
+    """
+    Append-only columnar store of articles and their final analyses
+
+    Every column is a flat binary file: fixed-width numeric and label
+    columns, dictionary-encoded tickers and risks in CSR form, and one UTF-8
+    heap plus end offsets per text field. Readers memory-map the
+    files into NumPy arrays, so filters run over whole columns without
+    building a Python object per row.
+
+    meta.json holds the committed row count and is replaced atomically after
+    each append, so a reader never sees a half-written row and a crashed
+    append is truncated away by the next writer. Its version is bumped when
+    a label column is rewritten (rewrite_labels), which makes readers remap.
+    """
+
+    def __init__(self, root_dir: Optional[str] = None):
+        self.root_dir = root_dir or os.path.join(config.DATA_DIR, "corpus")
+        os.makedirs(self.root_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._maps: Dict[str, np.ndarray] = {}
+        self._mapped_rows = -1
+        self._mapped_version = -1
+        self._dictionaries: Dict[str, List[str]] = {}
+        self._article_ids: set = set()
+        self._article_id_rows = 0
+
+    # ------------------------------------------------------------------ files
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root_dir, name)
+
+    def _read_meta(self) -> Dict[str, Any]:
+        try:
+            with open(self._path("meta.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"rows": 0}
+
+    def _write_meta(self, meta: Dict[str, Any]):
+        tmp_path = self._path(f"meta.json.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._path("meta.json"))
+
+    def _dictionary(self, name: str) -> List[str]:
+        """Values of a dictionary, in code order"""
+        try:
+            with open(self._path(f"{name}.dict"), "r", encoding="utf-8") as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except OSError:
+            return []
+
+    @contextmanager
+    def _write_lock(self):
+        with self._lock, open(self._path("write.lock"), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # ----------------------------------------------------------------- writes
+
+    def append(self, records: Iterable[Tuple[Dict[str, Any], Dict[str, Any]]], analyzed_at: Optional[float] = None) -> int:
+        """
+        Append analyzed articles
+
+        An article whose article_id is already stored (or repeated within
+        records) is skipped, so re-analyzing an article does not add a
+        second row for it.
+
+        Args:
+            records: (news_data, final_analysis) pairs
+            analyzed_at: Analysis time in epoch seconds (defaults to now)
+
+        Returns:
+            Number of rows appended
+        """
+        records = list(records)
+        if not records:
+            return 0
+        analyzed_at = analyzed_at or time.time()
+        start = time.perf_counter()
+
+        with self._write_lock():
+            meta = self._read_meta()
+            rows = meta["rows"]
+            self._truncate_to(rows)
+            stored_ids = self._stored_article_ids(rows)
+            new_ids = set()
+            new_records = []
+            for news_data, analysis in records:
+                article_id = str(news_data.get("article_id", "") or "")
+                if article_id and (article_id in stored_ids or article_id in new_ids):
+                    continue
+                new_ids.add(article_id)
+                new_records.append((news_data, analysis))
+            if len(new_records) < len(records):
+                metrics.increment("corpus_duplicates_skipped", len(records) - len(new_records))
+            records = new_records
+            if not records:
+                return 0
+            dictionaries = {name: self._dictionary(name) for name in LABEL_COLUMNS + LIST_FIELDS}
+            codes = {name: {value: code for code, value in enumerate(values)} for name, values in dictionaries.items()}
+
+            def encode(name: str, value: str) -> int:
+                if value not in codes[name]:
+                    codes[name][value] = len(dictionaries[name])
+                    dictionaries[name].append(value)
+                return codes[name][value]
+
+            columns: Dict[str, List[Any]] = {name: [] for name in COLUMNS}
+            texts: Dict[str, List[bytes]] = {name: [] for name in TEXT_FIELDS}
+            lists: Dict[str, List[List[int]]] = {name: [] for name in LIST_FIELDS}
+            for news_data, analysis in records:
+                age = article_age_hours(
+                    news_data.get("published_at", ""), now=datetime.fromtimestamp(analyzed_at, tz=timezone.utc)
+                )
+                columns["published_ts"].append(int(analyzed_at - age * 3600) if age is not None else -1)
+                columns["analyzed_ts"].append(int(analyzed_at))
+                for name in LABEL_COLUMNS:
+                    columns[name].append(encode(name, str(analysis.get(ANALYSIS_KEYS.get(name, name), ""))))
+                columns["confidence"].append(analysis.get("confidence_score", 0.0))
+                columns["relevance"].append(analysis.get("relevance", np.nan))
+                for name in TEXT_FIELDS:
+                    texts[name].append(str(news_data.get(name, "") or "").encode("utf-8"))
+                for name in LIST_FIELDS:
+                    lists[name].append([encode(name, value) for value in analysis.get(name, [])])
+
+            for name, dtype in COLUMNS.items():
+                self._append_array(name, np.asarray(columns[name], dtype=dtype))
+            for name in TEXT_FIELDS:
+                self._append_heap(name, texts[name])
+            for name in LIST_FIELDS:
+                self._append_lists(name, lists[name])
+            for name, values in dictionaries.items():
+                self._write_dictionary(name, values)
+            self._write_meta({**meta, "rows": rows + len(records)})
+            stored_ids.update(new_ids)
+            self._article_id_rows = rows + len(records)
+
+        metrics.observe("corpus_append_seconds", time.perf_counter() - start)
+        return len(records)
+
+    def _stored_article_ids(self, rows: int) -> set:
+        """article_ids of the first `rows` rows, read incrementally from the heap"""
+        if rows < self._article_id_rows:
+            self._article_ids, self._article_id_rows = set(), 0
+        if rows > self._article_id_rows:
+            offsets = np.fromfile(self._path("article_id.offsets"), dtype=np.int64, count=rows)
+            start = int(offsets[self._article_id_rows - 1]) if self._article_id_rows else 0
+            with open(self._path("article_id.heap"), "rb") as f:
+                f.seek(start)
+                heap = f.read(int(offsets[-1]) - start)
+            ends = offsets[self._article_id_rows:] - start
+            begins = np.concatenate(([0], ends[:-1]))
+            self._article_ids.update(heap[begin:end].decode("utf-8") for begin, end in zip(begins, ends))
+            self._article_id_rows = rows
+        return self._article_ids
+
+    def rewrite_labels(self, name: str, codes: np.ndarray, values: List[str]) -> int:
+        """
+        Replace a label column for the first len(codes) rows
+
+        Used to store decisions re-scored under new rules. The new column is
+        written beside the old one and swapped in atomically; rows appended
+        since the codes were computed keep their labels, and readers switch
+        to the new column on their next columns() call.
+
+        Args:
+            name: One of LABEL_COLUMNS
+            codes: Per-row codes into values
+            values: Labels the codes refer to
+
+        Returns:
+            Number of rows whose label changed
+        """
+        if name not in LABEL_COLUMNS:
+            raise ValueError(f"{name} is not a label column")
+        dtype = COLUMNS[name]
+        with self._write_lock():
+            meta = self._read_meta()
+            if len(codes) > meta["rows"]:
+                raise ValueError(f"{len(codes)} labels for a store of {meta['rows']} rows")
+            dictionary = self._dictionary(name)
+            for value in values:
+                if value not in dictionary:
+                    dictionary.append(value)
+            if len(dictionary) > np.iinfo(dtype).max + 1:
+                raise ValueError(f"More than {np.iinfo(dtype).max + 1} distinct {name} labels")
+            translate = np.asarray([dictionary.index(value) for value in values], dtype=dtype)
+
+            column = np.fromfile(self._path(f"{name}.col"), dtype=dtype, count=meta["rows"])
+            new_codes = translate[np.asarray(codes)]
+            changed = int(np.count_nonzero(column[:len(codes)] != new_codes))
+            column[:len(codes)] = new_codes
+            tmp_path = self._path(f"{name}.col.{os.getpid()}.tmp")
+            column.tofile(tmp_path)
+            self._write_dictionary(name, dictionary)
+            os.replace(tmp_path, self._path(f"{name}.col"))
+            self._write_meta({**meta, "version": meta.get("version", 0) + 1})
+        return changed
+
+    def _append_array(self, name: str, values: np.ndarray):
+        with open(self._path(f"{name}.col"), "ab") as f:
+            f.write(values.tobytes())
+
+    def _last_offset(self, name: str) -> int:
+        path = self._path(f"{name}.offsets")
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if not size:
+            return 0
+        with open(path, "rb") as f:
+            f.seek(size - 8)
+            return int(np.frombuffer(f.read(8), dtype=np.int64)[0])
+
+    def _append_heap(self, name: str, values: List[bytes]):
+        end = self._last_offset(name) + np.cumsum([len(value) for value in values], dtype=np.int64)
+        with open(self._path(f"{name}.heap"), "ab") as f:
+            f.write(b"".join(values))
+        self._append_offsets(name, end)
+
+    def _append_lists(self, name: str, values: List[List[int]]):
+        end = self._last_offset(name) + np.cumsum([len(value) for value in values], dtype=np.int64)
+        with open(self._path(f"{name}.values"), "ab") as f:
+            f.write(np.asarray([code for value in values for code in value], dtype=np.int32).tobytes())
+        self._append_offsets(name, end)
+
+    def _append_offsets(self, name: str, end: np.ndarray):
+        with open(self._path(f"{name}.offsets"), "ab") as f:
+            f.write(end.astype(np.int64).tobytes())
+
+    def _write_dictionary(self, name: str, values: List[str]):
+        path = self._path(f"{name}.dict")
+        existing = len(self._dictionary(name))
+        if len(values) > existing:
+            # Dictionaries only grow, so new codes are appended
+            with open(path, "a", encoding="utf-8") as f:
+                for value in values[existing:]:
+                    f.write(json.dumps(value) + "\n")
+
+    def _truncate_to(self, rows: int):
+        """Drop bytes a crashed append left past the committed row count"""
+        def truncate(path: str, size: int):
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+
+        for name, dtype in COLUMNS.items():
+            truncate(self._path(f"{name}.col"), rows * np.dtype(dtype).itemsize)
+        for name, data_suffix, itemsize in (
+            [(name, "heap", 1) for name in TEXT_FIELDS] + [(name, "values", 4) for name in LIST_FIELDS]
+        ):
+            truncate(self._path(f"{name}.offsets"), rows * 8)
+            truncate(self._path(f"{name}.{data_suffix}"), self._last_offset(name) * itemsize)
+
+    # ------------------------------------------------------------------ reads
+
+    def __len__(self) -> int:
+        return self._read_meta()["rows"]
+
+    def _map(self, filename: str, dtype, count: int) -> np.ndarray:
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self._path(filename), dtype=dtype, mode="r", shape=(count,))
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """
+        Memory-mapped views of every column, limited to committed rows
+
+        Label columns hold codes into `dictionary(name)`; "<field>_offsets"
+        are end offsets into "<field>_heap" (text) or "<field>_values"
+        (dictionary codes).
+        """
+        meta = self._read_meta()
+        rows, version = meta["rows"], meta.get("version", 0)
+        if rows != self._mapped_rows or version != self._mapped_version:
+            maps = {name: self._map(f"{name}.col", dtype, rows) for name, dtype in COLUMNS.items()}
+            for name in TEXT_FIELDS + LIST_FIELDS:
+                maps[f"{name}_offsets"] = self._map(f"{name}.offsets", np.int64, rows)
+                total = int(maps[f"{name}_offsets"][-1]) if rows else 0
+                if name in TEXT_FIELDS:
+                    maps[f"{name}_heap"] = self._map(f"{name}.heap", np.uint8, total)
+                else:
+                    maps[f"{name}_values"] = self._map(f"{name}.values", np.int32, total)
+            self._maps = maps
+            self._dictionaries = {name: self._dictionary(name) for name in LABEL_COLUMNS + LIST_FIELDS}
+            self._mapped_rows = rows
+            self._mapped_version = version
+        return self._maps
+
+    def dictionary(self, name: str) -> List[str]:
+        self.columns()
+        return self._dictionaries[name]
+
+    def _code(self, name: str, value: str) -> Optional[int]:
+        values = self.dictionary(name)
+        return values.index(value) if value in values else None
+
+    def query(
+        self,
+        ticker: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        sentiment: Optional[str] = None,
+        impact_level: Optional[str] = None,
+        risk: Optional[str] = None,
+        route: Optional[str] = None,
+        min_confidence: Optional[float] = None,
+    ) -> np.ndarray:
+        """
+        Rows matching every given filter
+
+        Args:
+            ticker: Ticker symbol the analysis identified
+            since / until: Published time range in epoch seconds (rows with an
+                unknown publish date never match a time filter)
+            sentiment / impact_level / route: Exact label
+            risk: Risk category that must be among the row's risks
+            min_confidence: Lowest confidence score to include
+
+        Returns:
+            Sorted row indices
+        """
+        start = time.perf_counter()
+        columns = self.columns()
+        mask = np.ones(self._mapped_rows, dtype=bool)
+
+        for name, value in (("sentiment", sentiment), ("impact_level", impact_level), ("route", route)):
+            if value is not None:
+                code = self._code(name, value)
+                mask &= columns[name] == code if code is not None else False
+        if risk is not None:
+            mask &= self._rows_with("risks", self._code("risks", risk))
+        if since is not None:
+            mask &= columns["published_ts"] >= since
+        if until is not None:
+            mask &= (columns["published_ts"] >= 0) & (columns["published_ts"] < until)
+        if min_confidence is not None:
+            mask &= columns["confidence"] >= min_confidence
+        if ticker is not None:
+            mask &= self._rows_with("tickers", self._code("tickers", ticker.upper()))
+
+        result = np.flatnonzero(mask)
+        metrics.observe("corpus_query_seconds", time.perf_counter() - start)
+        return result
+
+    def _rows_with(self, name: str, code: Optional[int]) -> np.ndarray:
+        """Boolean mask of the rows whose list field `name` contains `code`"""
+        columns = self.columns()
+        rows = np.zeros(self._mapped_rows, dtype=bool)
+        if code is not None:
+            positions = np.flatnonzero(columns[f"{name}_values"] == code)
+            # A value at position p belongs to the first row whose end offset exceeds p
+            rows[np.searchsorted(columns[f"{name}_offsets"], positions, side="right")] = True
+        return rows
+
+    def value_counts(self, name: str, rows: Optional[np.ndarray] = None) -> Dict[str, int]:
+        """Count of each label of a label column, over all rows or the given ones"""
+        codes = self.columns()[name]
+        if rows is not None:
+            codes = codes[rows]
+        counts = np.bincount(codes, minlength=len(self.dictionary(name)))
+        return {value: int(count) for value, count in zip(self.dictionary(name), counts) if count}
+
+    @staticmethod
+    def _span(offsets: np.ndarray, row: int) -> Tuple[int, int]:
+        return (int(offsets[row - 1]) if row else 0), int(offsets[row])
+
+    def rows(self, indices: Iterable[int], include_content: bool = False) -> List[Dict[str, Any]]:
+        """Materialize selected rows as dicts (only call this on filtered results)"""
+        columns = self.columns()
+        dictionaries = self._dictionaries
+        text_fields = [name for name in TEXT_FIELDS if name != "content" or include_content]
+        records = []
+        for row in indices:
+            row = int(row)
+            record = {}
+            for name in text_fields:
+                start, end = self._span(columns[f"{name}_offsets"], row)
+                record[name] = bytes(columns[f"{name}_heap"][start:end]).decode("utf-8")
+            for name in LABEL_COLUMNS:
+                record[name] = dictionaries[name][columns[name][row]]
+            for name in LIST_FIELDS:
+                start, end = self._span(columns[f"{name}_offsets"], row)
+                record[name] = [dictionaries[name][code] for code in columns[f"{name}_values"][start:end]]
+            published_ts = int(columns["published_ts"][row])
+            record["published_ts"] = published_ts if published_ts >= 0 else None
+            record["analyzed_ts"] = int(columns["analyzed_ts"][row])
+            record["confidence_score"] = float(columns["confidence"][row])
+            relevance = float(columns["relevance"][row])
+            record["relevance"] = None if np.isnan(relevance) else relevance
+            records.append(record)
+        return records
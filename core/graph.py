@@ -1,13 +1,24 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
 from langgraph.graph import StateGraph
+from config import config
+from core.analysis_cache import AnalysisCache
+from core.checkpoint_store import CheckpointStore
+from core.corpus_store import CorpusStore
+from utils.deadline import deadline_from_now
+from utils.metrics import metrics
+from utils.profiler import profiler
+from utils.usage import current_attribution, current_user, usage_ledger, usage_scope
 from agents import (
     preprocessing_agent,
+    relevance_filter,
     sentiment_agent,
     market_impact_agent,
     entity_risk_agent,
     aggregator_agent,
 )
 from pydantic import BaseModel
-from typing import Dict, Any, List
+from typing import Callable, Dict, Any, List, Optional
 
 # Define schema to represent the state passed between agents
 class NewsState(BaseModel):
@@ -15,16 +26,198 @@ class NewsState(BaseModel):
     news: Dict[str, Any]
     cleaned_content: str = ""
     tickers: List[str] = []
+    relevance: Optional[float] = None
     sentiment: str = ""
     market_impact: str = ""
     risks: List[str] = []
     final_analysis: Dict[str, Any] = {}
+    fingerprint: str = ""
+    route: str = ""
+    started_at: float = 0.0
+    deadline: float = 0.0
+    degraded_agents: List[str] = []
+    # Why each degraded agent fell back: "deadline", "circuit_open" or "llm_error"
+    degraded_reasons: Dict[str, str] = {}
+
+# Gemini calls each route avoids compared to the full pipeline
+LLM_CALLS_SAVED = {
+    "full": 0,
+    "risk_skipped": 1,
+    "cached": 3,
+    "insufficient_content": 3,
+    "not_relevant": 3,
+}
 
 class NewsAnalysisGraph:
     """Main graph builder for the financial news analysis pipeline"""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[AnalysisCache] = None, checkpoints: Optional[CheckpointStore] = None,
+                 corpus: Optional[CorpusStore] = None):
         self.graph = None
+        self.cache = cache if cache is not None else AnalysisCache()
+        if checkpoints is None and config.CHECKPOINT_ENABLED:
+            checkpoints = CheckpointStore()
+        self.checkpoints = checkpoints
+        if corpus is None and config.CORPUS_ENABLED:
+            corpus = CorpusStore()
+        self.corpus = corpus
+    
+    def checkpointed(self, node_name: str, node_fn, fields: List[str]):
+        """
+        Wrap an LLM node so its output is checkpointed per article fingerprint
+        
+        If a checkpoint holding all of the node's output fields exists, it is
+        applied and the node is not run, so a restarted analysis resumes at
+        the first incomplete node. The full output is saved rather than what
+        the node changed: in packed batch mode the labels are already set
+        before the node runs.
+        """
+        def run_node(state: NewsState) -> NewsState:
+            if self.checkpoints is None or not state.fingerprint:
+                return node_fn(state)
+            
+            saved = self.checkpoints.get(state.fingerprint, node_name)
+            if saved is not None and all(saved.get(field) for field in fields):
+                for field in fields:
+                    setattr(state, field, saved[field])
+                metrics.increment("checkpoint_restores", node=node_name)
+                print(f"{node_name} restored from checkpoint")
+                return state
+            
+            state = node_fn(state)
+            
+            # Nothing is saved once any agent degraded (this node's output may
+            # build on a local estimate), so a resumed run retries the LLM
+            if not state.degraded_agents and all(getattr(state, field) for field in fields):
+                self.checkpoints.put(
+                    state.fingerprint,
+                    node_name,
+                    {field: getattr(state, field) for field in fields},
+                )
+            return state
+        
+        return run_node
+    
+    def route_after_preprocessing(self, state: NewsState) -> str:
+        """Decide whether an article needs the LLM agents at all"""
+        if self.cache.get(state.fingerprint) is not None:
+            return "cached"
+        if len(state.cleaned_content) < config.MIN_CONTENT_CHARS:
+            return "insufficient_content"
+        if state.relevance is not None and not relevance_filter.is_relevant(state.relevance):
+            return "not_relevant"
+        return "full"
+    
+    def route_after_market_impact(self, state: NewsState) -> str:
+        """Decide whether risk extraction is worth an LLM call"""
+        if (config.SKIP_RISK_POLICY == "neutral_low"
+                and state.sentiment == "neutral" and state.market_impact == "low"):
+            return "risk_skipped"
+        if usage_ledger.status(current_user()) != "ok":
+            # Token budget nearly used up: save the most expensive call
+            metrics.increment("budget_downgrades", agent="entity_risk")
+            return "risk_skipped"
+        return "full"
+    
+    def restore_cached(self, state: NewsState) -> NewsState:
+        """Fill agent outputs from the cache instead of calling the LLM"""
+        cached = self.cache.get(state.fingerprint) or {}
+        state.sentiment = cached.get("sentiment", "neutral")
+        state.market_impact = cached.get("market_impact", "low")
+        state.risks = list(cached.get("risks", ["none"]))
+        state.route = "cached"
+        print("Cached analysis found - skipping LLM agents")
+        return state
+    
+    def skip_analysis(self, state: NewsState) -> NewsState:
+        """Write neutral defaults for articles without usable content"""
+        state.sentiment = "neutral"
+        state.market_impact = "low"
+        state.risks = ["none"]
+        state.route = "insufficient_content"
+        print(f"Insufficient content ({len(state.cleaned_content)} characters) - skipping LLM agents")
+        return state
+    
+    def skip_irrelevant(self, state: NewsState) -> NewsState:
+        """Write neutral defaults for articles the relevance filter rejected"""
+        state.sentiment = "neutral"
+        state.market_impact = "low"
+        state.risks = ["none"]
+        state.route = "not_relevant"
+        print(f"Not financial news (relevance {state.relevance:.2f}) - skipping LLM agents")
+        return state
+    
+    def aggregate(self, state: NewsState) -> NewsState:
+        """Run the aggregator, then record the route and cache the agent outputs"""
+        if not state.route:
+            # EntityRiskAgent always writes at least ["none"], so empty risks
+            # mean the risk node was routed around
+            state.route = "risk_skipped" if not state.risks else "full"
+        if not state.risks:
+            state.risks = ["none"]
+        
+        state = aggregator_agent.run(state)
+        state.final_analysis["route"] = state.route
+        if state.relevance is not None:
+            state.final_analysis["relevance"] = round(state.relevance, 3)
+        if state.route == "not_relevant":
+            state.final_analysis["decision"] = "No Action - Not financial news"
+        
+        # Degraded results (local estimates after a timeout, an open circuit
+        # or a failed Gemini call) are not cached so a later run can get the
+        # full analysis
+        if state.route in ("full", "risk_skipped") and not state.degraded_agents:
+            self.cache.put(state.fingerprint, {
+                "sentiment": state.sentiment,
+                "market_impact": state.market_impact,
+                "risks": list(state.risks),
+            })
+        
+        # Cached hits were stored when first analyzed; the store skips re-analyses
+        if self.corpus is not None and state.route != "cached":
+            try:
+                self.corpus.append([(state.news, state.final_analysis)])
+            except (OSError, ValueError) as e:
+                print(f"Error appending to corpus store: {str(e)}")
+        
+        metrics.increment("graph_route", route=state.route)
+        metrics.increment("graph_llm_calls_saved", LLM_CALLS_SAVED[state.route])
+        
+        # Latency SLO accounting
+        now = time.time()
+        metrics.increment("analyses_total")
+        if state.degraded_agents:
+            metrics.increment("analyses_degraded")
+        if state.deadline and now > state.deadline:
+            metrics.increment("deadline_misses")
+        if state.started_at:
+            metrics.observe("analysis_latency_seconds", now - state.started_at)
+        return state
+    
+    def get_slo_stats(self) -> Dict[str, Any]:
+        """Degraded-rate, deadline misses and latency percentiles of analyses"""
+        total = metrics.counter("analyses_total")
+        degraded = metrics.counter("analyses_degraded")
+        misses = metrics.counter("deadline_misses")
+        return {
+            "analyses": int(total),
+            "degraded": int(degraded),
+            "degraded_rate": degraded / total if total else 0.0,
+            "deadline_misses": int(misses),
+            "deadline_miss_rate": misses / total if total else 0.0,
+            "p50_latency": metrics.percentile("analysis_latency_seconds", 50),
+            "p99_latency": metrics.percentile("analysis_latency_seconds", 99),
+            "deadline_seconds": config.ANALYSIS_DEADLINE_SECONDS,
+        }
+    
+    def get_route_stats(self) -> Dict[str, Any]:
+        """Per-route article counts and the Gemini calls the routing avoided"""
+        routes = {route: int(metrics.counter("graph_route", route=route)) for route in LLM_CALLS_SAVED}
+        return {
+            "routes": routes,
+            "articles": sum(routes.values()),
+            "llm_calls_saved": int(metrics.counter("graph_llm_calls_saved")),
+        }
     
     def build_graph(self):
         """Build and compile the LangGraph for news analysis"""
@@ -33,45 +226,188 @@ class NewsAnalysisGraph:
             
         graph = StateGraph(state_schema=NewsState)
 
-        # Add all agent nodes
-        graph.add_node("PreprocessingAgent", preprocessing_agent.run)
-        graph.add_node("SentimentAnalysisAgent", sentiment_agent.run)
-        graph.add_node("MarketImpactAgent", market_impact_agent.run)
-        graph.add_node("EntityRiskAgent", entity_risk_agent.run)
-        graph.add_node("AggregatorAgent", aggregator_agent.run)
+        # Add all agent nodes (each timed by the profiler when enabled)
+        nodes = {
+            "PreprocessingAgent": preprocessing_agent.run,
+            "RelevanceFilter": relevance_filter.run,
+            "SentimentAnalysisAgent": self.checkpointed("SentimentAnalysisAgent", sentiment_agent.run, ["sentiment"]),
+            "MarketImpactAgent": self.checkpointed("MarketImpactAgent", market_impact_agent.run, ["market_impact"]),
+            "EntityRiskAgent": self.checkpointed("EntityRiskAgent", entity_risk_agent.run, ["risks"]),
+            "AggregatorAgent": self.aggregate,
+            "CachedAnalysis": self.restore_cached,
+            "SkipAnalysis": self.skip_analysis,
+            "NotRelevant": self.skip_irrelevant,
+        }
+        for name, node_fn in nodes.items():
+            graph.add_node(name, profiler.wrap(name, node_fn))
 
-        # Define the workflow
+        # Define the workflow, with early exits around the LLM agents
         graph.set_entry_point("PreprocessingAgent")
-        graph.add_edge("PreprocessingAgent", "SentimentAnalysisAgent")
+        graph.add_edge("PreprocessingAgent", "RelevanceFilter")
+        graph.add_conditional_edges("RelevanceFilter", self.route_after_preprocessing, {
+            "full": "SentimentAnalysisAgent",
+            "cached": "CachedAnalysis",
+            "insufficient_content": "SkipAnalysis",
+            "not_relevant": "NotRelevant",
+        })
         graph.add_edge("SentimentAnalysisAgent", "MarketImpactAgent")
-        graph.add_edge("MarketImpactAgent", "EntityRiskAgent")
+        graph.add_conditional_edges("MarketImpactAgent", self.route_after_market_impact, {
+            "full": "EntityRiskAgent",
+            "risk_skipped": "AggregatorAgent",
+        })
         graph.add_edge("EntityRiskAgent", "AggregatorAgent")
+        graph.add_edge("CachedAnalysis", "AggregatorAgent")
+        graph.add_edge("SkipAnalysis", "AggregatorAgent")
+        graph.add_edge("NotRelevant", "AggregatorAgent")
         graph.set_finish_point("AggregatorAgent")
         
         self.graph = graph.compile()
         return self.graph
     
-    def analyze_news(self, news_data: Dict[str, Any]) -> Dict[str, Any]:
+    def analyze_news(
+        self,
+        news_data: Dict[str, Any],
+        deadline_seconds: Optional[float] = None,
+        on_node: Optional[Callable[[str], None]] = None,
+    ) -> Dict[str, Any]:
         """
         Analyze a single news article through the agent pipeline
         
         Args:
             news_data: Dictionary containing news article information
+            deadline_seconds: Latency budget for the whole analysis (defaults to
+                config.ANALYSIS_DEADLINE_SECONDS; 0 disables it)
+            on_node: Called with each node's name as soon as the node finishes
             
         Returns:
             Analysis results including sentiment, impact, risks, and final decision
+            
+        Raises:
+            BudgetExceededError: If a token budget for the current user is used up
         """
+        usage_ledger.check(current_user())
         graph = self.build_graph()
-        result = graph.invoke({"news": news_data})
+        inputs = {
+            "news": news_data,
+            "started_at": time.time(),
+            "deadline": deadline_from_now(deadline_seconds),
+        }
+        with profiler.span("analysis", kind="pipeline"), usage_scope(article=news_data.get("article_id")):
+            if on_node is None:
+                return graph.invoke(inputs)
+            
+            result = None
+            for mode, chunk in graph.stream(inputs, stream_mode=["updates", "values"]):
+                if mode == "updates":
+                    for node_name in chunk:
+                        on_node(node_name)
+                else:
+                    result = chunk
         return result
+    
+    def analyze_news_batch(self, news_list: List[Dict[str, Any]], batch_size: Optional[int] = None,
+                           deadline_seconds: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Analyze several news articles, packing the single-word classifications
+        
+        When batch_size > 1, sentiment and market impact are classified up front
+        with packed prompts (batch_size articles per LLM call) and seeded into
+        each article's state, so the graph only runs the remaining agents.
+        Articles then run through the graph concurrently, each with its own
+        latency budget starting when its graph run starts.
+        
+        Args:
+            news_list: List of news article dictionaries
+            batch_size: Articles per packed prompt (defaults to config.PACKED_BATCH_SIZE)
+            deadline_seconds: Latency budget per article (defaults to
+                config.ANALYSIS_DEADLINE_SECONDS; 0 disables it)
+            
+        Returns:
+            List of analysis results in the same order as news_list
+            
+        Raises:
+            BudgetExceededError: If a token budget is used up; checked before
+                any article starts so a batch is not abandoned half way
+        """
+        usage_ledger.check(current_user())
+        graph = self.build_graph()
+        inputs = [{"news": news_data} for news_data in news_list]
+        
+        batch_size = batch_size or config.PACKED_BATCH_SIZE
+        if batch_size > 1:
+            # Preprocessing is local and cheap; run it first to get cleaned content
+            states = [preprocessing_agent.run(NewsState(news=news_data)) for news_data in news_list]
+            # Score relevance for the whole batch in one vectorized pass
+            relevances = relevance_filter.score_batch([state.cleaned_content for state in states])
+            for state, article_inputs, relevance in zip(states, inputs, relevances):
+                state.relevance = relevance
+                article_inputs["relevance"] = relevance
+            
+            # Articles that will be routed around the LLM agents are not classified
+            needs_llm = [self.route_after_preprocessing(state) == "full" for state in states]
+            contents = [state.cleaned_content if llm else "" for state, llm in zip(states, needs_llm)]
+            
+            sentiments = sentiment_agent.classify_batch(contents, batch_size)
+            impacts = market_impact_agent.classify_batch(
+                [
+                    {"content": content, "tickers": state.tickers, "sentiment": sentiment or "neutral"}
+                    for state, content, sentiment in zip(states, contents, sentiments)
+                ],
+                batch_size,
+            )
+            for article_inputs, llm, sentiment, impact in zip(inputs, needs_llm, sentiments, impacts):
+                # Labels left open while Gemini is unavailable are settled by the agents
+                if llm and sentiment:
+                    article_inputs["sentiment"] = sentiment
+                if llm and impact:
+                    article_inputs["market_impact"] = impact
+        
+        # Run articles concurrently; the adaptive LLM limiter decides how many
+        # Gemini calls are actually in flight
+        workers = max(1, min(len(inputs), config.LLM_MAX_CONCURRENCY))
+        invoke = profiler.wrap("analysis", graph.invoke, kind="pipeline")
+        # Worker threads do not inherit the caller's usage attribution
+        attribution = current_attribution()
+        
+        def invoke_attributed(article_inputs):
+            # Stamped here rather than up front so time spent waiting for a
+            # worker does not eat into the article's budget
+            article_inputs = {
+                **article_inputs,
+                "started_at": time.time(),
+                "deadline": deadline_from_now(deadline_seconds),
+            }
+            with usage_scope(**{**attribution, "article": article_inputs["news"].get("article_id")}):
+                return invoke(article_inputs)
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(invoke_attributed, inputs))
 
 # Global instance for backward compatibility
 _graph_instance = NewsAnalysisGraph()
 
+def get_shared_graph() -> NewsAnalysisGraph:
+    """The process-wide pipeline, whose cache, corpus and checkpoints every caller shares"""
+    return _graph_instance
+
 def build_graph():
     """Legacy function for backward compatibility"""
     return _graph_instance.build_graph()
 
-def analyze_news_article(news_data: Dict[str, Any]) -> Dict[str, Any]:
+def analyze_news_article(news_data: Dict[str, Any], deadline_seconds: Optional[float] = None) -> Dict[str, Any]:
     """Analyze a news article through the agent pipeline"""
-    return _graph_instance.analyze_news(news_data) 
\ No newline at end of file
+    return _graph_instance.analyze_news(news_data, deadline_seconds)
+
+def analyze_news_batch(news_list: List[Dict[str, Any]], batch_size: Optional[int] = None,
+                       deadline_seconds: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Analyze several news articles using packed classification prompts"""
+    return _graph_instance.analyze_news_batch(news_list, batch_size, deadline_seconds)
+
+def get_route_stats() -> Dict[str, Any]:
+    """Per-route counts for the shared pipeline instance"""
+    return _graph_instance.get_route_stats()
+
+def get_slo_stats() -> Dict[str, Any]:
+    """Latency SLO statistics for the shared pipeline instance"""
+    return _graph_instance.get_slo_stats()
+ 
\ No newline at end of file
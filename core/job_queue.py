@@ -0,0 +1,207 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from config import config
+from core.graph import NewsAnalysisGraph, get_shared_graph
+from core.scheduler import PRIORITY_CLASSES, PriorityScheduler, score_priority
+from utils.id_generator import generate_user_id
+from utils.metrics import metrics
+from utils.usage import usage_ledger, usage_scope
+
+class AnalysisJob:
+    """One queued analysis, shared by every session that asked for the article"""
+
+    def __init__(self, job_id: str, news_data: Dict[str, Any], deadline_seconds: Optional[float] = None,
+                 priority: int = PRIORITY_CLASSES.index("normal"), topic: Optional[str] = None,
+                 speculative: bool = False, user: Optional[str] = None):
+        self.job_id = job_id
+        self.news_data = news_data
+        self.deadline_seconds = deadline_seconds
+        self.priority = priority
+        self.topic = topic
+        # Prefetched without anyone asking for it yet; may be cancelled
+        self.speculative = speculative
+        # Session the job's token usage is attributed to
+        self.user = user
+        self.status = "queued"
+        self.completed_nodes: List[str] = []
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._done = threading.Event()
+
+    @property
+    def priority_class(self) -> str:
+        return PRIORITY_CLASSES[self.priority]
+
+    @property
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job finishes; returns False on timeout"""
+        return self._done.wait(timeout)
+
+    def _finish(self, status: str):
+        self.status = status
+        self.finished_at = time.time()
+        self._done.set()
+
+class AnalysisJobQueue:
+    """
+    Process-wide worker pool for article analyses
+
+    Jobs are keyed by article_id: submitting an article that is already
+    queued, running or recently finished returns the existing job, so
+    sessions looking at the same article share one analysis. The number of
+    workers caps how many analyses run at once across all sessions, and a
+    PriorityScheduler decides which queued job runs next.
+    """
+
+    def __init__(self, workers: Optional[int] = None, retention: Optional[int] = None,
+                 analysis_graph: Optional[NewsAnalysisGraph] = None):
+        self.workers = workers or config.JOB_WORKERS
+        self.retention = retention or config.JOB_RETENTION
+        self.analysis_graph = analysis_graph or get_shared_graph()
+
+        self._lock = threading.Lock()
+        self._queue = PriorityScheduler()
+        self._jobs: Dict[str, AnalysisJob] = {}
+        # Finished job ids, oldest first, trimmed to retention
+        self._finished: OrderedDict = OrderedDict()
+        self._running = 0
+
+        self._threads = [
+            threading.Thread(target=self._work, name=f"analysis-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, news_data: Dict[str, Any], deadline_seconds: Optional[float] = None,
+               topic: Optional[str] = None, priority: Optional[int] = None,
+               speculative: bool = False, user: Optional[str] = None) -> AnalysisJob:
+        """
+        Queue an article for analysis, or join the existing job for it
+
+        Args:
+            news_data: Article dict; "article_id" is the deduplication key
+            deadline_seconds: Latency budget, counted from when the job starts
+            topic: Fairness key; topics in the same priority class take turns
+            priority: Index into PRIORITY_CLASSES (defaults to score_priority)
+            speculative: Prefetch that nobody is waiting for yet; it can be
+                cancelled while queued
+            user: Session the token usage is attributed to and budgeted against
+
+        Returns:
+            The job tracking this article's analysis
+
+        Raises:
+            BudgetExceededError: If a new job is needed but the user's or the
+                process's token budget is used up
+        """
+        job_id = news_data.get("article_id") or generate_user_id(news_data.get("headline", ""))
+        if priority is None:
+            priority = score_priority(news_data)
+        with self._lock:
+            job = self._jobs.get(job_id)
+            # Failed jobs are retried on the next request
+            if job is not None and job.status != "failed":
+                metrics.increment("jobs_deduplicated")
+                if job.speculative and not speculative:
+                    # Someone now wants a prefetched article: keep it and let it jump ahead
+                    job.speculative = False
+                    metrics.increment("prefetch_hits", status=job.status)
+                if job.status == "queued" and priority < job.priority and self._queue.remove(job):
+                    job.priority = priority
+                    self._queue.put(job)
+                return job
+
+            # Joining an existing job is free; only new work is refused
+            usage_ledger.check(user)
+            job = AnalysisJob(job_id, news_data, deadline_seconds, priority, topic, speculative, user)
+            self._jobs[job_id] = job
+            self._finished.pop(job_id, None)
+            self._queue.put(job)
+            metrics.set_gauge("job_queue_depth", self._queue.qsize())
+        metrics.increment("jobs_submitted", priority=job.priority_class)
+        return job
+
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Drop a speculative job that has not started yet
+
+        Returns:
+            True if the job was removed from the queue
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or not job.speculative or not self._queue.remove(job):
+                return False
+            del self._jobs[job_id]
+            metrics.set_gauge("job_queue_depth", self._queue.qsize())
+        job._finish("cancelled")
+        metrics.increment("jobs_cancelled")
+        return True
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                self._running += 1
+                metrics.set_gauge("job_queue_depth", self._queue.qsize())
+            job.status = "running"
+            job.started_at = time.time()
+            wait = job.started_at - job.submitted_at
+            metrics.observe("job_queue_wait_seconds", wait)
+            metrics.observe("job_queue_wait_seconds", wait, priority=job.priority_class)
+
+            try:
+                with usage_scope(user=job.user, topic=job.topic):
+                    job.result = self.analysis_graph.analyze_news(
+                        job.news_data, job.deadline_seconds, on_node=job.completed_nodes.append
+                    )
+                status = "done"
+            except Exception as e:
+                print(f"Error in analysis job {job.job_id}: {str(e)}")
+                job.error = str(e)
+                status = "failed"
+
+            with self._lock:
+                self._running -= 1
+                self._finished[job.job_id] = True
+                while len(self._finished) > self.retention:
+                    expired_id, _ = self._finished.popitem(last=False)
+                    self._jobs.pop(expired_id, None)
+            job._finish(status)
+            metrics.increment("jobs_finished", status=status)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, running jobs and lifetime counters"""
+        with self._lock:
+            running = self._running
+        depths = self._queue.depths()
+        return {
+            "workers": self.workers,
+            "queued": sum(depths.values()),
+            "running": running,
+            "submitted": sum(metrics.counter("jobs_submitted", priority=name) for name in PRIORITY_CLASSES),
+            "deduplicated": metrics.counter("jobs_deduplicated"),
+            "p95_wait": metrics.percentile("job_queue_wait_seconds", 95),
+            "by_priority": {
+                name: {
+                    "queued": depths[name],
+                    "submitted": metrics.counter("jobs_submitted", priority=name),
+                    "p95_wait": metrics.percentile("job_queue_wait_seconds", 95, priority=name),
+                }
+                for name in PRIORITY_CLASSES
+            },
+        }
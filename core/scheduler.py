@@ -0,0 +1,179 @@
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from agents.heuristics import HIGH_IMPACT_TERMS, MEDIUM_IMPACT_TERMS, tokenize
+from agents.preprocessing_agent import extract_tickers
+from config import config
+
+# Highest priority first; a job's priority is its index in this list
+PRIORITY_CLASSES = ["urgent", "high", "normal", "low"]
+
+RELATIVE_AGE_UNITS = {"min": 1 / 60, "minute": 1 / 60, "hour": 1, "day": 24, "week": 168, "month": 720}
+ABSOLUTE_DATE_FORMATS = ["%b %d, %Y", "%d %b %Y", "%Y-%m-%d"]
+
+def article_age_hours(published_at: str, now: Optional[datetime] = None) -> Optional[float]:
+    """
+    Age of an article from its published_at string
+
+    Understands Serper's relative dates ("3 hours ago"), ISO timestamps and
+    dates like "Oct 12, 2024".
+
+    Returns:
+        Age in hours, or None if the date could not be parsed
+    """
+    if not published_at:
+        return None
+    text = published_at.strip().lower()
+
+    match = re.match(r"(\d+)\s*(min|minute|hour|day|week|month)s?\s+ago", text)
+    if match:
+        return int(match.group(1)) * RELATIVE_AGE_UNITS[match.group(2)]
+
+    now = now or datetime.now(timezone.utc)
+    try:
+        published = datetime.fromisoformat(published_at.strip().replace("Z", "+00:00"))
+    except ValueError:
+        published = None
+        for date_format in ABSOLUTE_DATE_FORMATS:
+            try:
+                published = datetime.strptime(published_at.strip(), date_format)
+                break
+            except ValueError:
+                continue
+    if published is None:
+        return None
+    if published.tzinfo is None:
+        published = published.replace(tzinfo=timezone.utc)
+    return max((now - published).total_seconds() / 3600, 0.0)
+
+def score_priority(news_data: Dict[str, Any], watchlist: Optional[Iterable[str]] = None) -> int:
+    """
+    Cheap pre-score of how urgently an article should be analyzed
+
+    Uses only local signals: watchlist tickers, high-impact event keywords
+    and recency of published_at.
+
+    Args:
+        news_data: Article dict with headline, content and published_at
+        watchlist: Tickers to prioritize (defaults to config.PRIORITY_WATCHLIST)
+
+    Returns:
+        Index into PRIORITY_CLASSES (0 is most urgent)
+    """
+    watchlist = set(config.PRIORITY_WATCHLIST if watchlist is None else watchlist)
+    text = f"{news_data.get('headline', '')}. {news_data.get('content', '')}"
+    tokens = set(tokenize(text))
+
+    score = 0
+    if tokens & HIGH_IMPACT_TERMS:
+        score += 3
+    elif tokens & MEDIUM_IMPACT_TERMS:
+        score += 1
+    if watchlist and watchlist.intersection(extract_tickers(text)):
+        score += 2
+
+    age = article_age_hours(news_data.get("published_at", ""))
+    if age is not None:
+        if age <= 1:
+            score += 1
+        elif age > 48:
+            score -= 1
+
+    if score >= 4:
+        return PRIORITY_CLASSES.index("urgent")
+    if score >= 3:
+        return PRIORITY_CLASSES.index("high")
+    if score >= 1:
+        return PRIORITY_CLASSES.index("normal")
+    return PRIORITY_CLASSES.index("low")
+
+class PriorityScheduler:
+    """
+    Blocking job queue ordered by priority class, with aging and fairness
+
+    Each class holds one FIFO per topic and serves topics round-robin, so one
+    busy topic cannot crowd out the others in its class. A job competes as
+    if it were one class higher for every aging_seconds it has waited, so
+    low-priority work is delayed but never starved.
+
+    Items need `priority`, `topic` and `submitted_at` attributes.
+    """
+
+    def __init__(self, aging_seconds: Optional[float] = None):
+        self.aging_seconds = aging_seconds or config.PRIORITY_AGING_SECONDS
+        self._cond = threading.Condition()
+        # One ordered topic -> FIFO map per class; dict order is the round-robin order
+        self._classes: List["OrderedDict[str, deque]"] = [OrderedDict() for _ in PRIORITY_CLASSES]
+        self._size = 0
+
+    def put(self, item):
+        with self._cond:
+            topics = self._classes[item.priority]
+            topics.setdefault(item.topic or "", deque()).append(item)
+            self._size += 1
+            self._cond.notify()
+
+    def get(self):
+        """Remove and return the next item, blocking until one is available"""
+        with self._cond:
+            while not self._size:
+                self._cond.wait()
+            class_index, aged_topic = self._next_class()
+            topics = self._classes[class_index]
+
+            # Round-robin: serve the front topic, then move it to the back;
+            # a class served early because of aging serves its oldest job
+            topic = aged_topic if aged_topic is not None else next(iter(topics))
+            items = topics[topic]
+            item = items.popleft()
+            del topics[topic]
+            if items:
+                topics[topic] = items
+            self._size -= 1
+            return item
+
+    def _next_class(self) -> Tuple[int, Optional[str]]:
+        """Class to serve next, plus the topic of its oldest job if it was promoted by aging"""
+        now = time.time()
+        best, best_rank = None, None
+        for class_index, topics in enumerate(self._classes):
+            if not topics:
+                continue
+            oldest_topic = min(topics, key=lambda topic: topics[topic][0].submitted_at)
+            waited = now - topics[oldest_topic][0].submitted_at
+            effective = class_index - int(waited / self.aging_seconds)
+            # Ties go to the class that is natively higher
+            rank = (effective, class_index)
+            if best_rank is None or rank < best_rank:
+                best_rank = rank
+                best = (class_index, oldest_topic if effective < class_index else None)
+        return best
+
+    def remove(self, item) -> bool:
+        """Take a queued item out of the queue; False if it was not queued"""
+        with self._cond:
+            topics = self._classes[item.priority]
+            items = topics.get(item.topic or "")
+            if not items or item not in items:
+                return False
+            items.remove(item)
+            if not items:
+                del topics[item.topic or ""]
+            self._size -= 1
+            return True
+
+    def qsize(self) -> int:
+        with self._cond:
+            return self._size
+
+    def depths(self) -> Dict[str, int]:
+        """Queued items per priority class"""
+        with self._cond:
+            return {
+                name: sum(len(items) for items in topics.values())
+                for name, topics in zip(PRIORITY_CLASSES, self._classes)
+            }
@@ -0,0 +1,199 @@
+import math
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from agents.entity_risk_agent import RISK_CATEGORIES
+from config import config
+
+SENTIMENT_SCORES = {"positive": 1.0, "negative": -1.0, "neutral": 0.0}
+IMPACT_LEVELS = ["high", "medium", "low"]
+IMPACT_WEIGHTS = {"high": 3.0, "medium": 2.0, "low": 1.0}
+
+# Risks outside the known categories are counted under "other"
+RISK_COLUMNS = RISK_CATEGORIES + ["other"]
+
+class TickerSignalStats:
+    """
+    Rolling per-ticker signal statistics with O(1) updates and lookups
+
+    Each ticker gets a row id; all statistics live in NumPy arrays indexed by
+    that id, so recording an analysis touches only the rows of its tickers
+    and querying a ticker reads a single row.
+    """
+
+    def __init__(self, half_life_hours: Optional[float] = None, initial_capacity: int = 64):
+        half_life_hours = half_life_hours or config.TICKER_SIGNAL_HALF_LIFE_HOURS
+        self.decay_rate = math.log(2) / (half_life_hours * 3600.0)
+        self.ticker_ids: Dict[str, int] = {}
+        self.tickers: List[str] = []
+        self._lock = threading.Lock()
+        self._allocate(initial_capacity)
+
+    def _allocate(self, capacity: int):
+        self.decayed_score = np.zeros(capacity, dtype=np.float64)
+        self.decayed_weight = np.zeros(capacity, dtype=np.float64)
+        self.last_update = np.zeros(capacity, dtype=np.float64)
+        self.counts = np.zeros(capacity, dtype=np.int64)
+        self.impact_counts = np.zeros((capacity, len(IMPACT_LEVELS)), dtype=np.int64)
+        self.impact_weighted = np.zeros(capacity, dtype=np.float64)
+        self.risk_counts = np.zeros((capacity, len(RISK_COLUMNS)), dtype=np.int64)
+        self.confidence_sum = np.zeros(capacity, dtype=np.float64)
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "decayed_score": self.decayed_score,
+            "decayed_weight": self.decayed_weight,
+            "last_update": self.last_update,
+            "counts": self.counts,
+            "impact_counts": self.impact_counts,
+            "impact_weighted": self.impact_weighted,
+            "risk_counts": self.risk_counts,
+            "confidence_sum": self.confidence_sum,
+        }
+
+    def _ticker_id(self, ticker: str) -> int:
+        ticker_id = self.ticker_ids.get(ticker)
+        if ticker_id is not None:
+            return ticker_id
+
+        ticker_id = len(self.tickers)
+        if ticker_id >= len(self.counts):
+            # Double capacity so growth is amortized O(1) per new ticker
+            for name, array in self._arrays().items():
+                grown = np.zeros((len(array) * 2,) + array.shape[1:], dtype=array.dtype)
+                grown[:len(array)] = array
+                setattr(self, name, grown)
+
+        self.ticker_ids[ticker] = ticker_id
+        self.tickers.append(ticker)
+        return ticker_id
+
+    def update(self, analysis: Dict[str, Any], timestamp: Optional[float] = None):
+        """
+        Record one final_analysis result against each of its tickers
+
+        Args:
+            analysis: final_analysis dictionary from the aggregator agent
+            timestamp: Epoch seconds of the observation (defaults to now)
+        """
+        tickers = analysis.get("tickers", [])
+        if not tickers:
+            return
+
+        timestamp = time.time() if timestamp is None else timestamp
+        score = SENTIMENT_SCORES.get(analysis.get("sentiment", ""), 0.0)
+        impact = analysis.get("impact_level", "low")
+        impact_idx = IMPACT_LEVELS.index(impact) if impact in IMPACT_LEVELS else IMPACT_LEVELS.index("low")
+        risks = [risk for risk in analysis.get("risks", []) if risk != "none"]
+        risk_idx = [
+            RISK_COLUMNS.index(risk) if risk in RISK_COLUMNS else len(RISK_COLUMNS) - 1
+            for risk in risks
+        ]
+        confidence = float(analysis.get("confidence_score", 0.0))
+
+        with self._lock:
+            for ticker in set(tickers):
+                i = self._ticker_id(ticker)
+
+                # Decay the running sums to this observation; late arrivals are
+                # decayed themselves instead so the state never moves backwards
+                elapsed = timestamp - self.last_update[i]
+                if self.counts[i] == 0 or elapsed >= 0:
+                    factor = math.exp(-self.decay_rate * elapsed) if self.counts[i] else 0.0
+                    self.decayed_score[i] = self.decayed_score[i] * factor + score
+                    self.decayed_weight[i] = self.decayed_weight[i] * factor + 1.0
+                    self.last_update[i] = timestamp
+                else:
+                    factor = math.exp(self.decay_rate * elapsed)
+                    self.decayed_score[i] += score * factor
+                    self.decayed_weight[i] += factor
+
+                self.counts[i] += 1
+                self.impact_counts[i, impact_idx] += 1
+                self.impact_weighted[i] += IMPACT_WEIGHTS[IMPACT_LEVELS[impact_idx]]
+                for j in risk_idx:
+                    self.risk_counts[i, j] += 1
+                self.confidence_sum[i] += confidence
+
+    def get(self, ticker: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Current statistics for one ticker
+
+        Args:
+            ticker: Ticker symbol
+            now: Epoch seconds to decay the sentiment score to (defaults to now)
+
+        Returns:
+            Statistics dictionary, or None if the ticker has not been seen
+        """
+        with self._lock:
+            i = self.ticker_ids.get(ticker)
+            if i is None:
+                return None
+
+            now = time.time() if now is None else now
+            factor = math.exp(-self.decay_rate * max(now - self.last_update[i], 0.0))
+            count = int(self.counts[i])
+
+            return {
+                "ticker": ticker,
+                "count": count,
+                "decayed_sentiment": float(self.decayed_score[i] / self.decayed_weight[i]) if self.decayed_weight[i] else 0.0,
+                "decayed_score": float(self.decayed_score[i] * factor),
+                "effective_count": float(self.decayed_weight[i] * factor),
+                "impact_counts": {level: int(self.impact_counts[i, j]) for j, level in enumerate(IMPACT_LEVELS)},
+                "impact_weighted_count": float(self.impact_weighted[i]),
+                "risk_frequencies": {
+                    risk: float(self.risk_counts[i, j]) / count
+                    for j, risk in enumerate(RISK_COLUMNS) if self.risk_counts[i, j]
+                },
+                "avg_confidence": float(self.confidence_sum[i]) / count,
+                "last_update": float(self.last_update[i]),
+            }
+
+    def known_tickers(self) -> List[str]:
+        """Tickers seen so far, in first-seen order"""
+        with self._lock:
+            return list(self.tickers)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Copy of the full state, suitable for restore() or np.savez"""
+        with self._lock:
+            n = len(self.tickers)
+            state = {name: array[:n].copy() for name, array in self._arrays().items()}
+            state["tickers"] = np.array(self.tickers, dtype=str)
+            state["decay_rate"] = np.array(self.decay_rate)
+            return state
+
+    def restore(self, state: Dict[str, Any]):
+        """Replace the current state with a snapshot"""
+        with self._lock:
+            tickers = [str(ticker) for ticker in state["tickers"]]
+            self._allocate(max(len(tickers) * 2, 64))
+            for name, array in self._arrays().items():
+                array[:len(tickers)] = state[name]
+            self.tickers = tickers
+            self.ticker_ids = {ticker: i for i, ticker in enumerate(tickers)}
+            self.decay_rate = float(state["decay_rate"])
+
+    def save(self, path: str):
+        """Write a snapshot to an .npz file"""
+        np.savez(path, **self.snapshot())
+
+    @classmethod
+    def load(cls, path: str) -> "TickerSignalStats":
+        """Create an instance from an .npz snapshot"""
+        stats = cls()
+        with np.load(path) as data:
+            stats.restore({key: data[key] for key in data.files})
+        return stats
+
+    def reset(self):
+        """Forget all tickers"""
+        with self._lock:
+            self.ticker_ids = {}
+            self.tickers = []
+            self._allocate(64)
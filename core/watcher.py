@@ -0,0 +1,250 @@
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import config
+from core.graph import analyze_news_batch
+from core.work_queue import WorkQueue, open_work_queue
+from utils.article_fetcher import fetch_article_bodies
+from utils.id_generator import generate_link_hash, generate_user_id
+from utils.seen_store import SeenStore
+from utils.serper_client import fetch_financial_news
+from utils.usage import usage_scope
+
+class TopicWatcher:
+    """
+    Polls registered topics for news and analyzes only unseen articles
+
+    Articles are keyed by the hash of their link in a persistent SeenStore,
+    so each poll costs one search per topic plus analysis of new articles only.
+
+    With a work queue, new articles are enqueued for worker processes
+    instead of analyzed here, and their results are picked up by later
+    polls. Articles are only marked seen once their result is collected
+    (or they are dead-lettered), so a restart re-enqueues (and the queue
+    deduplicates) what was pending. Dead-lettered articles are retried only
+    through WorkQueue.requeue_dead.
+    """
+
+    def __init__(
+        self,
+        seen_store: Optional[SeenStore] = None,
+        interval_seconds: Optional[int] = None,
+        num_results: Optional[int] = None,
+        max_results: int = 200,
+        work_queue: Optional[WorkQueue] = None,
+    ):
+        if seen_store is None:
+            seen_store = SeenStore(os.path.join(config.DATA_DIR, "watcher_seen.db"))
+        self.seen_store = seen_store
+        self.interval_seconds = interval_seconds or config.WATCH_INTERVAL_SECONDS
+        self.num_results = num_results or config.WATCH_NUM_RESULTS
+        if work_queue is None and config.WORK_QUEUE_ENABLED:
+            work_queue = open_work_queue()
+        self.work_queue = work_queue
+        # Enqueued articles awaiting a result: job_id -> (topic, link_hash, news_data)
+        self._pending: Dict[str, Tuple[str, str, Dict[str, Any]]] = {}
+        self._pending_lock = threading.Lock()
+
+        self._topics: List[str] = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._callbacks: List[Callable[[Dict[str, Any]], None]] = []
+
+        # Recent results with a monotonically increasing sequence number so
+        # each UI session can pick up what it has not displayed yet
+        self._results: deque = deque(maxlen=max_results)
+        self._sequence = 0
+        self.last_poll_at: Optional[str] = None
+
+    @property
+    def topics(self) -> List[str]:
+        with self._lock:
+            return list(self._topics)
+
+    def register(self, topics):
+        """Register one topic/ticker or a list of them for watching"""
+        if isinstance(topics, str):
+            topics = [topics]
+        with self._lock:
+            for topic in topics:
+                topic = topic.strip()
+                if topic and topic not in self._topics:
+                    self._topics.append(topic)
+
+    def unregister(self, topic: str):
+        """Stop watching a topic"""
+        with self._lock:
+            if topic in self._topics:
+                self._topics.remove(topic)
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        """Call callback(result_entry) for every newly analyzed article"""
+        self._callbacks.append(callback)
+
+    def poll_once(self) -> List[Dict[str, Any]]:
+        """
+        Fetch every registered topic once and analyze the unseen articles
+
+        Returns:
+            Result entries ({"topic", "news_data", "result"}) for new articles;
+            with a work queue, for the articles whose analysis has finished
+        """
+        new_items: List[Tuple[str, str, Dict[str, Any]]] = []
+        with self._pending_lock:
+            batch_hashes = {link_hash for _, link_hash, _ in self._pending.values()}
+
+        for topic in self.topics:
+            articles = fetch_financial_news(topic, num_results=self.num_results)
+            for article in articles:
+                link_hash = generate_link_hash(article.get("link") or article["headline"])
+                # Skip known articles and duplicates returned for several topics
+                if link_hash in batch_hashes or link_hash in self.seen_store:
+                    continue
+                batch_hashes.add(link_hash)
+
+                news_data = {
+                    "article_id": generate_user_id(article["headline"]),
+                    "headline": article["headline"],
+                    "content": article["content"],
+                    "published_at": article["published_at"],
+                    "link": article.get("link", ""),
+                    "source": article.get("source", ""),
+                }
+                new_items.append((topic, link_hash, news_data))
+
+        self.last_poll_at = datetime.now().strftime("%H:%M:%S")
+        if not new_items:
+            return self.collect_finished() if self.work_queue is not None else []
+        
+        if config.FETCH_FULL_TEXT:
+            # Only new articles are downloaded
+            enriched = fetch_article_bodies([news_data for _, _, news_data in new_items])
+            new_items = [(topic, link_hash, news_data) for (topic, link_hash, _), news_data in zip(new_items, enriched)]
+
+        print(f"Watcher found {len(new_items)} new articles across {len(self.topics)} topics")
+
+        if self.work_queue is not None:
+            self._enqueue(new_items)
+            return self.collect_finished()
+
+        try:
+            with usage_scope(user="watcher"):
+                results = analyze_news_batch([news_data for _, _, news_data in new_items])
+        except Exception as e:
+            # Leave the articles unseen so the next poll retries them
+            print(f"Error analyzing watched articles: {str(e)}")
+            return []
+
+        return self._publish([
+            (topic, link_hash, news_data, result) for (topic, link_hash, news_data), result in zip(new_items, results)
+        ])
+
+    def _enqueue(self, new_items: List[Tuple[str, str, Dict[str, Any]]]):
+        """Hand new articles to the work queue, one enqueue per topic"""
+        by_topic: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+        for topic, link_hash, news_data in new_items:
+            by_topic.setdefault(topic, []).append((link_hash, news_data))
+        for topic, items in by_topic.items():
+            try:
+                job_ids = self.work_queue.enqueue([news_data for _, news_data in items], topic=topic, user="watcher")
+            except Exception as e:
+                # Left unseen, so the next poll enqueues them again
+                print(f"Error enqueueing watched articles: {str(e)}")
+                continue
+            with self._pending_lock:
+                for job_id, (link_hash, news_data) in zip(job_ids, items):
+                    self._pending[job_id] = (topic, link_hash, news_data)
+
+    @property
+    def pending_count(self) -> int:
+        with self._pending_lock:
+            return len(self._pending)
+
+    def collect_finished(self) -> List[Dict[str, Any]]:
+        """
+        Publish the enqueued articles whose analysis has finished
+
+        Called by every poll; callers may also call it between polls to pick
+        up results sooner.
+        """
+        if self.work_queue is None:
+            return []
+        finished = []
+        with self._pending_lock:
+            if not self._pending:
+                return []
+            for job_id, job in self.work_queue.results(list(self._pending)).items():
+                if job["status"] == "done":
+                    topic, link_hash, news_data = self._pending.pop(job_id)
+                    finished.append((topic, link_hash, news_data, job["result"]))
+                elif job["status"] == "dead":
+                    # Seen, so later polls do not enqueue a poison article again
+                    topic, link_hash, _ = self._pending.pop(job_id)
+                    self.seen_store.add(link_hash, topic)
+                    print(f"Watched article {job_id} was dead-lettered: {job['error']}")
+        return self._publish(finished)
+
+    def _publish(self, finished: List[Tuple[str, str, Dict[str, Any], Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Mark analyzed articles seen and hand their results to readers and subscribers"""
+        entries = []
+        for topic, link_hash, news_data, result in finished:
+            self.seen_store.add(link_hash, topic)
+            entry = {"topic": topic, "news_data": news_data, "result": result}
+            entries.append(entry)
+
+            with self._lock:
+                self._sequence += 1
+                self._results.append((self._sequence, entry))
+
+            for callback in self._callbacks:
+                try:
+                    callback(entry)
+                except Exception as e:
+                    print(f"Error in watcher callback: {str(e)}")
+
+        return entries
+
+    def results_since(self, sequence: int) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Return results newer than a sequence number
+
+        Args:
+            sequence: Last sequence number the caller has consumed
+
+        Returns:
+            Tuple of (latest sequence number, new result entries)
+        """
+        with self._lock:
+            entries = [entry for seq, entry in self._results if seq > sequence]
+            return self._sequence, entries
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Error in topic watcher: {str(e)}")
+            self._stop_event.wait(self.interval_seconds)
+
+    def start(self):
+        """Start polling in a background thread"""
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="topic-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background polling thread"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
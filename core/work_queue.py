@@ -0,0 +1,790 @@
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+
+from config import config
+from core.graph import NewsAnalysisGraph, get_shared_graph
+from core.scheduler import PRIORITY_CLASSES, score_priority
+from utils.id_generator import generate_user_id
+from utils.metrics import metrics
+from utils.usage import usage_scope
+
+WORK_STATUSES = ("queued", "leased", "done", "dead")
+
+class WorkItem:
+    """One claimed article; lease_id proves the claim when reporting back"""
+
+    def __init__(self, job_id: str, news_data: Dict[str, Any], lease_id: str, attempts: int,
+                 priority: int = PRIORITY_CLASSES.index("normal"), topic: Optional[str] = None,
+                 user: Optional[str] = None):
+        self.job_id = job_id
+        self.news_data = news_data
+        self.lease_id = lease_id
+        self.attempts = attempts
+        self.priority = priority
+        self.topic = topic
+        self.user = user
+
+class WorkQueue:
+    """
+    Durable queue of articles shared by producers and worker processes
+
+    Producers (the watcher, the CLI) enqueue articles; workers claim them
+    with a lease, analyze them and report the result back. A claim whose
+    lease expires (the worker died or hung) becomes visible again, and
+    each claim counts as an attempt: after config.WORK_QUEUE_MAX_ATTEMPTS
+    the article is dead-lettered with its last error instead of retried.
+    Failed attempts are retried after an exponential backoff.
+
+    Jobs are keyed by article_id, so enqueueing an article that is already
+    known is a no-op. That includes dead-lettered articles, so a producer
+    that keeps finding a poison article cannot reset its attempts; only
+    requeue_dead queues them again.
+
+    SQLiteWorkQueue serves worker processes on one host; RedisWorkQueue
+    serves workers on several hosts through any Redis-compatible server.
+    """
+
+    def __init__(self, lease_seconds: Optional[float] = None, max_attempts: Optional[int] = None,
+                 retry_seconds: Optional[float] = None):
+        self.lease_seconds = lease_seconds or config.WORK_QUEUE_LEASE_SECONDS
+        self.max_attempts = max_attempts or config.WORK_QUEUE_MAX_ATTEMPTS
+        self.retry_seconds = config.WORK_QUEUE_RETRY_SECONDS if retry_seconds is None else retry_seconds
+
+    def enqueue(self, news_items: Iterable[Dict[str, Any]], topic: Optional[str] = None,
+                user: Optional[str] = None, priority: Optional[int] = None) -> List[str]:
+        """
+        Add articles to the queue
+
+        Args:
+            news_items: Article dicts; "article_id" is the deduplication key
+            topic: Topic the articles were found for
+            user: Who the token usage is attributed to
+            priority: Index into PRIORITY_CLASSES (defaults to score_priority)
+
+        Returns:
+            Job ids of the articles, in order
+        """
+        raise NotImplementedError
+
+    def claim(self, worker_id: str, limit: int = 1) -> List[WorkItem]:
+        """Lease up to limit ready articles, most urgent first"""
+        raise NotImplementedError
+
+    def renew(self, item: WorkItem) -> bool:
+        """Extend a lease while the analysis runs; False if the lease was lost"""
+        raise NotImplementedError
+
+    def complete(self, item: WorkItem, result: Dict[str, Any]) -> bool:
+        """Store the result; False if the lease was lost and the result discarded"""
+        raise NotImplementedError
+
+    def fail(self, item: WorkItem, error: str) -> str:
+        """Record a failed attempt; returns the new status ("queued" or "dead")"""
+        raise NotImplementedError
+
+    def results(self, job_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Status, result or error, attempts and timing of each known job"""
+        raise NotImplementedError
+
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recently dead-lettered articles with their last error"""
+        raise NotImplementedError
+
+    def requeue_dead(self, job_ids: Optional[Iterable[str]] = None) -> int:
+        """Queue dead-lettered articles again with fresh attempts; returns how many"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        """Job counts per status and how long the next job to run has waited"""
+        raise NotImplementedError
+
+    def prune(self, older_than_seconds: float) -> int:
+        """Delete finished jobs older than the cutoff; returns how many"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def _job_id(self, news_data: Dict[str, Any]) -> str:
+        return news_data.get("article_id") or generate_user_id(news_data.get("headline", ""))
+
+    def _retry_delay(self, attempts: int) -> float:
+        return self.retry_seconds * 2 ** max(attempts - 1, 0)
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    Work queue in a SQLite database in WAL mode
+
+    Claims run in an IMMEDIATE transaction, so concurrent workers in any
+    number of processes never lease the same article twice.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.db_path = db_path or os.path.join(config.DATA_DIR, "work_queue.db")
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS work_items ("
+            "job_id TEXT PRIMARY KEY, payload TEXT NOT NULL, topic TEXT, user_id TEXT, "
+            "priority INTEGER NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "available_at REAL NOT NULL, lease_id TEXT, lease_owner TEXT, lease_expires REAL, "
+            "result TEXT, error TEXT, enqueued_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS work_items_ready ON work_items (status, priority, available_at)"
+        )
+
+    def _transaction(self, fn):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                value = fn(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return value
+
+    def enqueue(self, news_items, topic=None, user=None, priority=None):
+        now = time.time()
+        rows = []
+        for news_data in news_items:
+            job_priority = score_priority(news_data) if priority is None else priority
+            rows.append((self._job_id(news_data), json.dumps(news_data), topic, user, job_priority, now, now))
+
+        def insert(conn):
+            conn.executemany(
+                "INSERT INTO work_items (job_id, payload, topic, user_id, priority, status, available_at, enqueued_at) "
+                "VALUES (?, ?, ?, ?, ?, 'queued', ?, ?) ON CONFLICT (job_id) DO NOTHING",
+                rows,
+            )
+
+        self._transaction(insert)
+        metrics.increment("work_queue_enqueued", len(rows))
+        return [row[0] for row in rows]
+
+    def claim(self, worker_id, limit=1):
+        now = time.time()
+
+        def lease(conn):
+            # Expired leases on their last attempt are dead-lettered, the rest become visible again
+            expired = conn.execute(
+                "UPDATE work_items SET status = 'dead', lease_id = NULL, finished_at = ?, "
+                "error = COALESCE(error, 'lease expired') "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts),
+            ).rowcount
+            rows = conn.execute(
+                "SELECT job_id, payload, topic, user_id, priority, attempts, status FROM work_items "
+                "WHERE (status = 'queued' AND available_at <= ?) OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY priority, available_at LIMIT ?",
+                (now, now, limit),
+            ).fetchall()
+            items = []
+            for job_id, payload, topic, user, priority, attempts, status in rows:
+                if status == "leased":
+                    metrics.increment("work_queue_leases_expired")
+                lease_id = uuid.uuid4().hex
+                conn.execute(
+                    "UPDATE work_items SET status = 'leased', lease_id = ?, lease_owner = ?, lease_expires = ?, "
+                    "attempts = attempts + 1, started_at = ? WHERE job_id = ?",
+                    (lease_id, worker_id, now + self.lease_seconds, now, job_id),
+                )
+                items.append(WorkItem(job_id, json.loads(payload), lease_id, attempts + 1, priority, topic, user))
+            return items, expired
+
+        items, expired = self._transaction(lease)
+        if expired:
+            metrics.increment("work_queue_dead_lettered", expired)
+        return items
+
+    def renew(self, item):
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE work_items SET lease_expires = ? WHERE job_id = ? AND lease_id = ? AND status = 'leased'",
+                (time.time() + self.lease_seconds, item.job_id, item.lease_id),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, item, result):
+        payload = json.dumps(result, default=str)
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE work_items SET status = 'done', result = ?, error = NULL, lease_id = NULL, finished_at = ? "
+                "WHERE job_id = ? AND lease_id = ? AND status = 'leased'",
+                (payload, time.time(), item.job_id, item.lease_id),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, item, error):
+        now = time.time()
+
+        def record(conn):
+            row = conn.execute(
+                "SELECT attempts FROM work_items WHERE job_id = ? AND lease_id = ? AND status = 'leased'",
+                (item.job_id, item.lease_id),
+            ).fetchone()
+            if row is None:
+                return "lost"
+            if row[0] >= self.max_attempts:
+                conn.execute(
+                    "UPDATE work_items SET status = 'dead', error = ?, lease_id = NULL, finished_at = ? WHERE job_id = ?",
+                    (error, now, item.job_id),
+                )
+                return "dead"
+            conn.execute(
+                "UPDATE work_items SET status = 'queued', error = ?, lease_id = NULL, available_at = ? WHERE job_id = ?",
+                (error, now + self._retry_delay(row[0]), item.job_id),
+            )
+            return "queued"
+
+        return self._transaction(record)
+
+    def results(self, job_ids):
+        job_ids = list(job_ids)
+        found = {}
+        with self._lock:
+            # Stay below SQLite's bound-parameter limit
+            for start in range(0, len(job_ids), 500):
+                chunk = job_ids[start:start + 500]
+                rows = self._conn.execute(
+                    "SELECT job_id, status, result, error, attempts, enqueued_at, started_at, finished_at "
+                    f"FROM work_items WHERE job_id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for job_id, status, result, error, attempts, enqueued_at, started_at, finished_at in rows:
+                    found[job_id] = {
+                        "status": status,
+                        "result": json.loads(result) if result else None,
+                        "error": error,
+                        "attempts": attempts,
+                        "enqueued_at": enqueued_at,
+                        "started_at": started_at,
+                        "finished_at": finished_at,
+                    }
+        return found
+
+    def dead_letters(self, limit=100):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, payload, topic, error, attempts, finished_at FROM work_items "
+                "WHERE status = 'dead' ORDER BY finished_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            {
+                "job_id": job_id,
+                "headline": json.loads(payload).get("headline", ""),
+                "topic": topic,
+                "error": error,
+                "attempts": attempts,
+                "dead_at": finished_at,
+            }
+            for job_id, payload, topic, error, attempts, finished_at in rows
+        ]
+
+    def requeue_dead(self, job_ids=None):
+        now = time.time()
+        update = (
+            "UPDATE work_items SET status = 'queued', attempts = 0, error = NULL, available_at = ?, "
+            "finished_at = NULL WHERE status = 'dead'"
+        )
+        with self._lock:
+            if job_ids is None:
+                return self._conn.execute(update, (now,)).rowcount
+            return sum(
+                self._conn.execute(update + " AND job_id = ?", (now, job_id)).rowcount for job_id in job_ids
+            )
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM work_items GROUP BY status").fetchall())
+            head = self._conn.execute(
+                "SELECT enqueued_at FROM work_items WHERE status = 'queued' AND available_at <= ? "
+                "ORDER BY priority, available_at LIMIT 1",
+                (time.time(),),
+            ).fetchone()
+        stats = {status: counts.get(status, 0) for status in WORK_STATUSES}
+        stats["head_wait_seconds"] = time.time() - head[0] if head else 0.0
+        return stats
+
+    def prune(self, older_than_seconds):
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM work_items WHERE status = 'done' AND finished_at < ?",
+                (time.time() - older_than_seconds,),
+            ).rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# Lua scripts keep each Redis state change atomic across clients
+_REDIS_ENQUEUE = """
+local key = KEYS[1]
+local status = redis.call('HGET', key, 'status')
+-- Known jobs are left alone, except dead ones when requeueing (ARGV[7] == '1')
+if status and (status ~= 'dead' or ARGV[7] ~= '1') then
+    return 0
+end
+redis.call('HSET', key, 'payload', ARGV[2], 'topic', ARGV[3], 'user', ARGV[4], 'priority', ARGV[5],
+           'status', 'queued', 'attempts', 0, 'error', '', 'lease_id', '', 'enqueued_at', ARGV[6])
+redis.call('ZREM', KEYS[4], ARGV[1])
+redis.call('ZADD', KEYS[2], tonumber(ARGV[5]) * 1e10 + tonumber(ARGV[6]), ARGV[1])
+return 1
+"""
+
+_REDIS_CLAIM = """
+local prefix, now, limit = ARGV[1], tonumber(ARGV[2]), tonumber(ARGV[3])
+local lease_seconds, owner, max_attempts = tonumber(ARGV[4]), ARGV[5], tonumber(ARGV[6])
+local ready, delayed, leased, dead = KEYS[1], KEYS[2], KEYS[3], KEYS[4]
+-- Retries whose backoff has passed become ready
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', delayed, '-inf', now)) do
+    redis.call('ZREM', delayed, id)
+    redis.call('ZADD', ready, tonumber(redis.call('HGET', prefix .. id, 'priority')) * 1e10 + now, id)
+end
+-- Expired leases on their last attempt are dead-lettered, the rest become visible again
+local expired = 0
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', leased, '-inf', now)) do
+    local key = prefix .. id
+    redis.call('ZREM', leased, id)
+    if tonumber(redis.call('HGET', key, 'attempts')) >= max_attempts then
+        if redis.call('HGET', key, 'error') == '' then
+            redis.call('HSET', key, 'error', 'lease expired')
+        end
+        redis.call('HSET', key, 'status', 'dead', 'lease_id', '', 'finished_at', now)
+        redis.call('ZADD', dead, now, id)
+        expired = expired + 1
+    else
+        redis.call('HSET', key, 'status', 'queued', 'lease_id', '')
+        redis.call('ZADD', ready, tonumber(redis.call('HGET', key, 'priority')) * 1e10 + now, id)
+    end
+end
+local claimed = {expired}
+for i, id in ipairs(redis.call('ZRANGE', ready, 0, limit - 1)) do
+    local key = prefix .. id
+    local lease_id = ARGV[7] .. i
+    redis.call('ZREM', ready, id)
+    redis.call('HSET', key, 'status', 'leased', 'lease_id', lease_id, 'lease_owner', owner, 'started_at', now)
+    local attempts = redis.call('HINCRBY', key, 'attempts', 1)
+    redis.call('ZADD', leased, now + lease_seconds, id)
+    local fields = redis.call('HMGET', key, 'payload', 'topic', 'user', 'priority')
+    table.insert(claimed, {id, lease_id, attempts, fields[1], fields[2], fields[3], fields[4]})
+end
+return claimed
+"""
+
+_REDIS_RENEW = """
+if redis.call('HGET', KEYS[1], 'lease_id') ~= ARGV[2] or redis.call('HGET', KEYS[1], 'status') ~= 'leased' then
+    return 0
+end
+redis.call('ZADD', KEYS[2], tonumber(ARGV[3]), ARGV[1])
+return 1
+"""
+
+_REDIS_COMPLETE = """
+if redis.call('HGET', KEYS[1], 'lease_id') ~= ARGV[2] or redis.call('HGET', KEYS[1], 'status') ~= 'leased' then
+    return 0
+end
+redis.call('ZREM', KEYS[2], ARGV[1])
+redis.call('HSET', KEYS[1], 'status', 'done', 'result', ARGV[3], 'error', '', 'lease_id', '', 'finished_at', ARGV[4])
+redis.call('ZADD', KEYS[3], tonumber(ARGV[4]), ARGV[1])
+return 1
+"""
+
+_REDIS_FAIL = """
+if redis.call('HGET', KEYS[1], 'lease_id') ~= ARGV[2] or redis.call('HGET', KEYS[1], 'status') ~= 'leased' then
+    return 'lost'
+end
+local now = tonumber(ARGV[4])
+redis.call('ZREM', KEYS[2], ARGV[1])
+local attempts = tonumber(redis.call('HGET', KEYS[1], 'attempts'))
+if attempts >= tonumber(ARGV[5]) then
+    redis.call('HSET', KEYS[1], 'status', 'dead', 'error', ARGV[3], 'lease_id', '', 'finished_at', now)
+    redis.call('ZADD', KEYS[4], now, ARGV[1])
+    return 'dead'
+end
+redis.call('HSET', KEYS[1], 'status', 'queued', 'error', ARGV[3], 'lease_id', '')
+redis.call('ZADD', KEYS[3], now + tonumber(ARGV[6]) * 2 ^ (attempts - 1), ARGV[1])
+return 'queued'
+"""
+
+class RedisWorkQueue(WorkQueue):
+    """
+    Work queue on a Redis-compatible server, for workers on several hosts
+
+    Each job is a hash; sorted sets index ready jobs (by priority, then
+    age), delayed retries and leases (by due time), and done and dead jobs
+    (by finish time). Requires the optional redis package.
+    """
+
+    def __init__(self, url: str, prefix: str = "fnna:work", **kwargs):
+        super().__init__(**kwargs)
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("The Redis work queue backend needs the redis package (pip install redis)") from e
+
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._keys = {name: f"{prefix}:{name}" for name in ("ready", "delayed", "leased", "done", "dead")}
+        self._enqueue = self._redis.register_script(_REDIS_ENQUEUE)
+        self._claim = self._redis.register_script(_REDIS_CLAIM)
+        self._renew = self._redis.register_script(_REDIS_RENEW)
+        self._complete = self._redis.register_script(_REDIS_COMPLETE)
+        self._fail = self._redis.register_script(_REDIS_FAIL)
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.prefix}:job:{job_id}"
+
+    def enqueue(self, news_items, topic=None, user=None, priority=None):
+        now = time.time()
+        job_ids = []
+        pipeline = self._redis.pipeline(transaction=False)
+        for news_data in news_items:
+            job_id = self._job_id(news_data)
+            job_priority = score_priority(news_data) if priority is None else priority
+            self._enqueue(
+                keys=[self._job_key(job_id), self._keys["ready"], self._keys["delayed"], self._keys["dead"]],
+                args=[job_id, json.dumps(news_data), topic or "", user or "", job_priority, now, 0],
+                client=pipeline,
+            )
+            job_ids.append(job_id)
+        pipeline.execute()
+        metrics.increment("work_queue_enqueued", len(job_ids))
+        return job_ids
+
+    def claim(self, worker_id, limit=1):
+        keys = [self._keys[name] for name in ("ready", "delayed", "leased", "dead")]
+        expired, *rows = self._claim(
+            keys=keys,
+            args=[f"{self.prefix}:job:", time.time(), limit, self.lease_seconds, worker_id,
+                  self.max_attempts, uuid.uuid4().hex],
+        )
+        if expired:
+            metrics.increment("work_queue_dead_lettered", expired)
+        return [
+            WorkItem(job_id, json.loads(payload), lease_id, int(attempts), int(priority), topic or None, user or None)
+            for job_id, lease_id, attempts, payload, topic, user, priority in rows
+        ]
+
+    def renew(self, item):
+        return bool(self._renew(
+            keys=[self._job_key(item.job_id), self._keys["leased"]],
+            args=[item.job_id, item.lease_id, time.time() + self.lease_seconds],
+        ))
+
+    def complete(self, item, result):
+        return bool(self._complete(
+            keys=[self._job_key(item.job_id), self._keys["leased"], self._keys["done"]],
+            args=[item.job_id, item.lease_id, json.dumps(result, default=str), time.time()],
+        ))
+
+    def fail(self, item, error):
+        return self._fail(
+            keys=[self._job_key(item.job_id), self._keys["leased"], self._keys["delayed"], self._keys["dead"]],
+            args=[item.job_id, item.lease_id, error, time.time(), self.max_attempts, self.retry_seconds],
+        )
+
+    def results(self, job_ids):
+        job_ids = list(job_ids)
+        pipeline = self._redis.pipeline(transaction=False)
+        for job_id in job_ids:
+            pipeline.hmget(self._job_key(job_id), "status", "result", "error", "attempts",
+                           "enqueued_at", "started_at", "finished_at")
+        found = {}
+        for job_id, fields in zip(job_ids, pipeline.execute()):
+            status, result, error, attempts, enqueued_at, started_at, finished_at = fields
+            if status is None:
+                continue
+            found[job_id] = {
+                "status": status,
+                "result": json.loads(result) if result else None,
+                "error": error or None,
+                "attempts": int(attempts or 0),
+                "enqueued_at": float(enqueued_at) if enqueued_at else None,
+                "started_at": float(started_at) if started_at else None,
+                "finished_at": float(finished_at) if finished_at else None,
+            }
+        return found
+
+    def dead_letters(self, limit=100):
+        job_ids = self._redis.zrevrange(self._keys["dead"], 0, limit - 1)
+        pipeline = self._redis.pipeline(transaction=False)
+        for job_id in job_ids:
+            pipeline.hmget(self._job_key(job_id), "payload", "topic", "error", "attempts", "finished_at")
+        return [
+            {
+                "job_id": job_id,
+                "headline": json.loads(payload).get("headline", "") if payload else "",
+                "topic": topic or None,
+                "error": error or None,
+                "attempts": int(attempts or 0),
+                "dead_at": float(finished_at) if finished_at else None,
+            }
+            for job_id, (payload, topic, error, attempts, finished_at) in zip(job_ids, pipeline.execute())
+        ]
+
+    def requeue_dead(self, job_ids=None):
+        if job_ids is None:
+            job_ids = self._redis.zrange(self._keys["dead"], 0, -1)
+        now = time.time()
+        requeued = 0
+        for job_id in job_ids:
+            payload = self._redis.hget(self._job_key(job_id), "payload")
+            if payload is None:
+                continue
+            fields = self._redis.hmget(self._job_key(job_id), "topic", "user", "priority")
+            requeued += self._enqueue(
+                keys=[self._job_key(job_id), self._keys["ready"], self._keys["delayed"], self._keys["dead"]],
+                args=[job_id, payload, fields[0] or "", fields[1] or "", fields[2], now, 1],
+            )
+        return requeued
+
+    def stats(self):
+        pipeline = self._redis.pipeline(transaction=False)
+        for name in ("ready", "delayed", "leased", "done", "dead"):
+            pipeline.zcard(self._keys[name])
+        pipeline.zrange(self._keys["ready"], 0, 0)
+        ready, delayed, leased, done, dead, head = pipeline.execute()
+        head_at = self._redis.hget(self._job_key(head[0]), "enqueued_at") if head else None
+        return {
+            "queued": ready + delayed,
+            "leased": leased,
+            "done": done,
+            "dead": dead,
+            "head_wait_seconds": time.time() - float(head_at) if head_at else 0.0,
+        }
+
+    def prune(self, older_than_seconds):
+        job_ids = self._redis.zrangebyscore(self._keys["done"], "-inf", time.time() - older_than_seconds)
+        if job_ids:
+            self._redis.delete(*[self._job_key(job_id) for job_id in job_ids])
+            self._redis.zrem(self._keys["done"], *job_ids)
+        return len(job_ids)
+
+    def close(self):
+        self._redis.close()
+
+def open_work_queue(url: Optional[str] = None) -> WorkQueue:
+    """
+    Open the work queue named by a URL
+
+    Args:
+        url: "redis://host:6379/0" (or rediss://, unix://) for a
+            Redis-compatible server, "sqlite:///path/to/queue.db" or a plain
+            path for SQLite; defaults to config.WORK_QUEUE_URL, then
+            DATA_DIR/work_queue.db
+    """
+    url = url or config.WORK_QUEUE_URL
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisWorkQueue(url)
+    if url.startswith("sqlite:///"):
+        url = url[len("sqlite:///"):]
+    return SQLiteWorkQueue(url or None)
+
+class QueueWorker:
+    """
+    Claims articles from a work queue and analyzes them with NewsAnalysisGraph
+
+    A heartbeat thread renews the lease of the article being analyzed, so
+    only a worker that has died or hung loses its claim.
+    """
+
+    def __init__(self, work_queue: WorkQueue, worker_id: Optional[str] = None,
+                 analysis_graph: Optional[NewsAnalysisGraph] = None):
+        self.work_queue = work_queue
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.analysis_graph = analysis_graph or get_shared_graph()
+        self.processed = 0
+        self._current: Optional[WorkItem] = None
+        self._stop_event = threading.Event()
+
+    def process(self, item: WorkItem):
+        """Analyze one claimed article and report the outcome"""
+        self._current = item
+        start = time.perf_counter()
+        try:
+            with usage_scope(user=item.user, topic=item.topic):
+                result = self.analysis_graph.analyze_news(item.news_data)
+        except Exception as e:
+            print(f"Error in queued analysis {item.job_id} (attempt {item.attempts}): {str(e)}")
+            status = self.work_queue.fail(item, str(e))
+        else:
+            status = "done" if self.work_queue.complete(item, result) else "lost"
+        finally:
+            self._current = None
+        if status == "lost":
+            # The lease expired and another worker owns the article now
+            print(f"Lease on {item.job_id} was lost; outcome discarded")
+        metrics.increment("work_queue_processed", status=status)
+        metrics.observe("work_queue_process_seconds", time.perf_counter() - start)
+        self.processed += 1
+
+    def _heartbeat(self):
+        while not self._stop_event.wait(self.work_queue.lease_seconds / 3):
+            item = self._current
+            if item is not None and not self.work_queue.renew(item):
+                print(f"Could not renew the lease on {item.job_id}")
+
+    def run(self, max_items: Optional[int] = None, max_idle_seconds: Optional[float] = None,
+            poll_seconds: float = 1.0) -> int:
+        """
+        Process articles until stopped
+
+        Args:
+            max_items: Stop after this many articles (None for no limit)
+            max_idle_seconds: Stop once the queue has been empty this long
+                (None to keep polling)
+            poll_seconds: Wait between claims while the queue is empty
+
+        Returns:
+            Number of articles processed
+        """
+        heartbeat = threading.Thread(target=self._heartbeat, name="work-queue-heartbeat", daemon=True)
+        heartbeat.start()
+        idle_since = time.monotonic()
+        try:
+            while not self._stop_event.is_set() and (max_items is None or self.processed < max_items):
+                items = self.work_queue.claim(self.worker_id)
+                if not items:
+                    if max_idle_seconds is not None and time.monotonic() - idle_since >= max_idle_seconds:
+                        break
+                    self._stop_event.wait(poll_seconds)
+                    continue
+                for item in items:
+                    self.process(item)
+                idle_since = time.monotonic()
+        finally:
+            self._stop_event.set()
+            heartbeat.join(timeout=1)
+        return self.processed
+
+    def stop(self):
+        self._stop_event.set()
+
+def _worker_main(url: Optional[str], worker_index: int, max_idle_seconds: Optional[float], barrier=None):
+    worker = QueueWorker(open_work_queue(url), worker_id=f"{socket.gethostname()}:{os.getpid()}:{worker_index}")
+    if barrier is not None:
+        # Start claiming together once every process has loaded the pipeline
+        barrier.wait(timeout=300)
+    try:
+        worker.run(max_idle_seconds=max_idle_seconds)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.work_queue.close()
+
+def run_worker_processes(processes: Optional[int] = None, url: Optional[str] = None,
+                         max_idle_seconds: Optional[float] = None, synchronized_start: bool = False) -> float:
+    """
+    Run QueueWorkers in separate processes and wait for them to exit
+
+    Each process has its own interpreter, so pipeline CPU work is not
+    serialized by one GIL. Start this on as many hosts as needed when the
+    queue is on a Redis-compatible server.
+
+    Args:
+        processes: Worker processes (defaults to config.WORK_QUEUE_WORKERS)
+        url: Work queue URL (see open_work_queue)
+        max_idle_seconds: Workers exit once the queue has been empty this long
+        synchronized_start: Hold every worker until all have started
+
+    Returns:
+        Seconds from the synchronized start (or from launch) until all workers exited
+    """
+    processes = processes or config.WORK_QUEUE_WORKERS
+    context = multiprocessing.get_context("spawn")
+    # One extra party: the parent, to time from the moment every worker is ready
+    barrier = context.Barrier(processes + 1) if synchronized_start else None
+    workers = [
+        context.Process(target=_worker_main, args=(url, i, max_idle_seconds, barrier), name=f"work-queue-worker-{i}")
+        for i in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    if barrier is not None:
+        barrier.wait(timeout=300)
+    start = time.perf_counter()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Durable work queue: enqueue articles and run worker processes")
+    parser.add_argument("--url", default=None, help="Work queue URL (default: WORK_QUEUE_URL or DATA_DIR/work_queue.db)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    worker_parser = commands.add_parser("worker", help="Run worker processes")
+    worker_parser.add_argument("--processes", type=int, default=None)
+    worker_parser.add_argument("--exit-when-idle", type=float, default=None, metavar="SECONDS",
+                               help="Exit once the queue has been empty this long")
+
+    enqueue_parser = commands.add_parser("enqueue", help="Search a topic and enqueue the articles")
+    enqueue_parser.add_argument("topic")
+    enqueue_parser.add_argument("--limit", type=int, default=50)
+    enqueue_parser.add_argument("--time-window", default=None)
+    enqueue_parser.add_argument("--priority", choices=PRIORITY_CLASSES, default=None)
+
+    commands.add_parser("stats", help="Show job counts per status")
+    dead_parser = commands.add_parser("dead", help="List dead-lettered articles")
+    dead_parser.add_argument("--limit", type=int, default=20)
+    requeue_parser = commands.add_parser("requeue-dead", help="Queue dead-lettered articles again")
+    requeue_parser.add_argument("job_ids", nargs="*")
+    prune_parser = commands.add_parser("prune", help="Delete finished jobs")
+    prune_parser.add_argument("--hours", type=float, default=config.WORK_QUEUE_RESULT_TTL_HOURS)
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        print(f"Starting {args.processes or config.WORK_QUEUE_WORKERS} worker processes")
+        run_worker_processes(args.processes, args.url, args.exit_when_idle)
+    else:
+        work_queue = open_work_queue(args.url)
+        if args.command == "enqueue":
+            from utils.serper_client import iter_financial_news
+
+            news_items = [
+                {
+                    "article_id": generate_user_id(article["headline"]),
+                    "headline": article["headline"],
+                    "content": article["content"],
+                    "published_at": article["published_at"],
+                    "link": article.get("link", ""),
+                    "source": article.get("source", ""),
+                }
+                for article in iter_financial_news(args.topic, limit=args.limit, time_window=args.time_window)
+            ]
+            priority = PRIORITY_CLASSES.index(args.priority) if args.priority else None
+            job_ids = work_queue.enqueue(news_items, topic=args.topic, user="cli", priority=priority)
+            print(f"Enqueued {len(job_ids)} articles for '{args.topic}'")
+        elif args.command == "stats":
+            print(json.dumps(work_queue.stats(), indent=2))
+        elif args.command == "dead":
+            for entry in work_queue.dead_letters(args.limit):
+                print(f"{entry['job_id']}  attempts={entry['attempts']}  {entry['headline'][:60]}  -> {entry['error']}")
+        elif args.command == "requeue-dead":
+            print(f"Requeued {work_queue.requeue_dead(args.job_ids or None)} articles")
+        elif args.command == "prune":
+            print(f"Deleted {work_queue.prune(args.hours * 3600)} finished jobs")
+        work_queue.close()
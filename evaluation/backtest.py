@@ -0,0 +1,270 @@
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from agents.decision_rules import decision_label
+from core.corpus_store import CorpusStore
+
+# Position taken for each decision, keyed by the text before " - "
+DECISION_POSITIONS = {
+    "Strong Buy Signal": 1.0,
+    "Moderate Buy Signal": 0.75,
+    "Cautious Buy Signal": 0.5,
+    "Weak Buy Signal": 0.25,
+    "Hold/Monitor": 0.0,
+    "Monitor/Hold": 0.0,
+    "Cautious Hold": 0.0,
+    "Monitor": 0.0,
+    "Hold": 0.0,
+    "No Action": 0.0,
+    "Moderate Sell/Avoid Signal": -0.75,
+    "Strong Sell Signal": -1.0,
+}
+
+def load_prices(path: str) -> pd.DataFrame:
+    """
+    Load closing prices as a date x ticker frame
+
+    Accepts CSV or Parquet in long form (date, ticker, close columns) or wide
+    form (a date column followed by one column per ticker).
+    """
+    frame = pd.read_parquet(path) if path.endswith((".parquet", ".pq")) else pd.read_csv(path)
+    frame.columns = [str(column) for column in frame.columns]
+    lower = {column.lower(): column for column in frame.columns}
+    date_column = lower.get("date") or frame.columns[0]
+    if "ticker" in lower and "close" in lower:
+        frame = frame.pivot_table(index=date_column, columns=lower["ticker"], values=lower["close"], aggfunc="last")
+    else:
+        frame = frame.set_index(date_column)
+    frame.index = pd.to_datetime(frame.index, utc=True)
+    frame.columns = [str(column).upper() for column in frame.columns]
+    return frame.sort_index().astype(np.float64)
+
+def events_from_corpus(store: Optional[CorpusStore] = None) -> pd.DataFrame:
+    """
+    One event per (analysis, ticker) pair from the corpus store
+
+    Built straight from the memory-mapped columns; analyses without tickers
+    or without a parseable publish date are dropped.
+    """
+    store = store or CorpusStore()
+    columns = store.columns()
+    if not len(store):
+        return pd.DataFrame(columns=["published_ts", "ticker", "decision", "sentiment", "impact_level", "confidence"])
+
+    offsets = columns["tickers_offsets"]
+    counts = np.diff(offsets, prepend=0)
+    rows = np.repeat(np.arange(len(offsets)), counts)
+    events = pd.DataFrame({
+        "published_ts": columns["published_ts"][rows],
+        "ticker": np.asarray(store.dictionary("tickers"), dtype=object)[columns["tickers_values"]],
+        "confidence": columns["confidence"][rows],
+    })
+    for name in ("decision", "sentiment", "impact_level"):
+        events[name] = np.asarray(store.dictionary(name), dtype=object)[columns[name][rows]]
+    return events[events["published_ts"] >= 0].reset_index(drop=True)
+
+def run_backtest(
+    events: pd.DataFrame,
+    prices: pd.DataFrame,
+    horizons: Iterable[int] = (1, 5, 20),
+    holding_days: int = 5,
+    positions: Optional[Dict[str, float]] = None,
+) -> Dict[str, Any]:
+    """
+    Replay decisions against price history
+
+    Each event enters at the first close after it was published (no
+    look-ahead) and is held for holding_days closes. Forward returns, hit
+    rates and the equity curve are computed with array operations over all
+    events at once.
+
+    Args:
+        events: Frame with published_ts (epoch seconds), ticker and decision
+            columns; sentiment/impact_level columns are used for breakdowns
+        prices: Date x ticker closing prices (see load_prices)
+        horizons: Forward-return horizons in trading days
+        holding_days: Days each position is held for the equity curve
+        positions: Decision label -> position size (defaults to DECISION_POSITIONS)
+
+    Returns:
+        Summary metrics, per-horizon stats and per-decision breakdowns
+    """
+    positions = positions or DECISION_POSITIONS
+    horizons = sorted(set(horizons) | {holding_days})
+    start = time.perf_counter()
+
+    close = prices.to_numpy(dtype=np.float64)
+    dates = prices.index.as_unit("s").asi8
+    ticker_index = pd.Index(prices.columns)
+
+    events = events.sort_values("published_ts", kind="stable")
+    ticker_codes = ticker_index.get_indexer(events["ticker"].str.upper())
+    entry = np.searchsorted(dates, events["published_ts"].to_numpy(), side="right")
+    labels = events["decision"].map(decision_label)
+    size = labels.map(positions).fillna(0.0).to_numpy()
+
+    # Events for unknown tickers or published after the last close cannot be traded
+    tradable = (ticker_codes >= 0) & (entry < len(dates))
+    ticker_codes, entry, size = ticker_codes[tradable], entry[tradable], size[tradable]
+    events, labels = events[tradable], labels[tradable]
+    entry_price = close[entry, ticker_codes]
+
+    frame = pd.DataFrame({"decision": labels.to_numpy(), "position": size})
+    for name in ("sentiment", "impact_level"):
+        if name in events:
+            frame[name] = events[name].to_numpy()
+    for horizon in horizons:
+        exit_index = entry + horizon
+        valid = exit_index < len(dates)
+        forward = np.full(len(entry), np.nan)
+        forward[valid] = close[exit_index[valid], ticker_codes[valid]] / entry_price[valid] - 1.0
+        frame[f"return_{horizon}d"] = forward
+        frame[f"pnl_{horizon}d"] = size * forward
+        # 1/0 when a positioned event made/lost money, NaN for flat or unpriced events
+        # (a missing entry or exit close leaves forward NaN even inside the price range)
+        priced = valid & np.isfinite(forward)
+        frame[f"hit_{horizon}d"] = np.where((size != 0) & priced, (size * forward > 0).astype(float), np.nan)
+
+    horizon_stats = {}
+    active = frame["position"] != 0
+    for horizon in horizons:
+        returns, pnl = frame[f"return_{horizon}d"], frame[f"pnl_{horizon}d"]
+        scored = active & pnl.notna()
+        horizon_stats[f"{horizon}d"] = {
+            "events": int(scored.sum()),
+            "mean_return": float(returns.mean()) if returns.notna().any() else None,
+            "mean_pnl": float(pnl[scored].mean()) if scored.any() else None,
+            "hit_rate": float(frame.loc[scored, f"hit_{horizon}d"].mean()) if scored.any() else None,
+        }
+
+    equity = _equity_curve(close, entry, ticker_codes, size, holding_days)
+    drawdown = equity / np.maximum.accumulate(equity) - 1.0 if len(equity) else np.zeros(0)
+
+    pnl_column = f"pnl_{holding_days}d"
+    by_decision = (
+        frame.groupby("decision")
+        .agg(
+            events=("position", "size"),
+            position=("position", "first"),
+            mean_return=(f"return_{holding_days}d", "mean"),
+            mean_pnl=(pnl_column, "mean"),
+            hit_rate=(f"hit_{holding_days}d", "mean"),
+        )
+        .sort_values("position", ascending=False)
+    )
+    breakdowns = {"decision": by_decision}
+    for name in ("sentiment", "impact_level"):
+        if name in frame:
+            breakdowns[name] = frame.groupby(name).agg(
+                events=("position", "size"), mean_return=(f"return_{holding_days}d", "mean")
+            )
+
+    return {
+        "events": int(len(frame)),
+        "untradable_events": int((~tradable).sum()),
+        "tickers": int(len(np.unique(ticker_codes))),
+        "holding_days": holding_days,
+        "total_return": float(equity[-1] - 1.0) if len(equity) else 0.0,
+        "max_drawdown": float(drawdown.min()) if len(drawdown) else 0.0,
+        "horizons": horizon_stats,
+        "breakdowns": breakdowns,
+        "elapsed_seconds": time.perf_counter() - start,
+    }
+
+def _equity_curve(close: np.ndarray, entry: np.ndarray, ticker_codes: np.ndarray, size: np.ndarray,
+                  holding_days: int) -> np.ndarray:
+    """
+    Daily equity of holding every event's position for holding_days closes
+
+    Overlapping events on a ticker add up. Each day's return is the
+    exposure-weighted mean of the held tickers' returns, so the curve shows
+    the rule's edge rather than its leverage.
+    """
+    num_dates, num_tickers = close.shape
+    holdings = np.zeros((num_dates + 1, num_tickers))
+    exit_index = np.minimum(entry + holding_days, num_dates)
+    # Difference array: +size on entry day, -size on exit day, then cumulative sum
+    np.add.at(holdings, (entry, ticker_codes), size)
+    np.add.at(holdings, (exit_index, ticker_codes), -size)
+    holdings = np.cumsum(holdings[:-1], axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        daily_returns = np.nan_to_num(close[1:] / close[:-1] - 1.0)
+    held = holdings[:-1]
+    exposure = np.abs(held).sum(axis=1)
+    portfolio = np.divide((held * daily_returns).sum(axis=1), exposure, out=np.zeros(num_dates - 1), where=exposure > 0)
+    return np.cumprod(1.0 + portfolio)
+
+def synthetic_data(num_tickers: int, num_days: int, num_events: int, seed: int = 0):
+    """Random-walk prices and random decisions, for timing the engine"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2015-01-01", periods=num_days, tz="UTC")
+    tickers = [f"T{i:04d}" for i in range(num_tickers)]
+    returns = rng.normal(0.0003, 0.02, size=(num_days, num_tickers))
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), index=dates, columns=tickers)
+
+    labels = np.array(list(DECISION_POSITIONS))
+    published = rng.integers(dates[0].value // 10**9, dates[-1].value // 10**9, size=num_events)
+    events = pd.DataFrame({
+        "published_ts": published,
+        "ticker": np.array(tickers)[rng.integers(0, num_tickers, size=num_events)],
+        "decision": labels[rng.integers(0, len(labels), size=num_events)],
+    })
+    return events, prices
+
+def print_summary(summary: Dict[str, Any]):
+    print(f"Events: {summary['events']} across {summary['tickers']} tickers "
+          f"({summary['untradable_events']} without prices), computed in {summary['elapsed_seconds']:.2f}s")
+    print(f"Holding {summary['holding_days']}d: total return {summary['total_return']:.2%}, "
+          f"max drawdown {summary['max_drawdown']:.2%}")
+    for horizon, stats in summary["horizons"].items():
+        hit_rate = f"{stats['hit_rate']:.1%}" if stats["hit_rate"] is not None else "—"
+        mean_pnl = f"{stats['mean_pnl']:.3%}" if stats["mean_pnl"] is not None else "—"
+        print(f"  {horizon:>4}: {stats['events']} positioned events, hit rate {hit_rate}, mean P&L {mean_pnl}")
+    print(summary["breakdowns"]["decision"].to_string(float_format=lambda value: f"{value:.4f}"))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest investment decisions against price history")
+    parser.add_argument("--prices", help="CSV or Parquet of closing prices (long: date,ticker,close; or wide)")
+    parser.add_argument("--corpus-dir", default=None, help="Corpus store to replay (default: DATA_DIR/corpus)")
+    parser.add_argument("--horizons", default="1,5,20", help="Forward-return horizons in trading days")
+    parser.add_argument("--holding-days", type=int, default=5)
+    parser.add_argument("--synthetic", default=None, metavar="TICKERS,DAYS,EVENTS",
+                        help="Time the engine on random data instead, e.g. 3000,2500,1000000")
+    parser.add_argument("--output-dir", default="evaluation/results")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        num_tickers, num_days, num_events = (int(value) for value in args.synthetic.split(","))
+        events, prices = synthetic_data(num_tickers, num_days, num_events)
+    elif args.prices:
+        events, prices = events_from_corpus(CorpusStore(args.corpus_dir)), load_prices(args.prices)
+    else:
+        parser.error("--prices or --synthetic is required")
+
+    summary = run_backtest(
+        events, prices, [int(value) for value in args.horizons.split(",")], args.holding_days
+    )
+    print_summary(summary)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_file = os.path.join(args.output_dir, f"backtest_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output_file, "w") as f:
+        json.dump(
+            {
+                **summary,
+                "breakdowns": {
+                    name: json.loads(table.to_json(orient="index")) for name, table in summary["breakdowns"].items()
+                },
+            },
+            f,
+            indent=2,
+        )
+    print(f"Results saved to: {output_file}")
@@ -0,0 +1,79 @@
+import argparse
+import os
+import tempfile
+import time
+from typing import Any, Dict
+
+from core.checkpoint_store import CheckpointStore
+
+def run_benchmark(num_articles: int = 2000, llm_latency: float = 0.5, batch_size: int = 32) -> Dict[str, Any]:
+    """
+    Measure the cost of checkpointing agent outputs
+
+    Simulates three LLM-node checkpoints per article, the same writes the
+    graph makes, and compares the per-node overhead with one LLM call.
+
+    Args:
+        num_articles: Articles to simulate
+        llm_latency: Reference latency of one Gemini call in seconds
+        batch_size: Checkpoints committed per SQLite transaction
+
+    Returns:
+        Benchmark summary
+    """
+    outputs = {
+        "SentimentAnalysisAgent": {"sentiment": "positive"},
+        "MarketImpactAgent": {"market_impact": "high"},
+        "EntityRiskAgent": {"risks": ["regulatory", "financial"]},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = CheckpointStore(
+            db_path=os.path.join(tmp_dir, "bench.db"), batch_size=batch_size, flush_seconds=3600
+        )
+
+        put_latencies = []
+        start = time.perf_counter()
+        for i in range(num_articles):
+            fingerprint = f"{i:064x}"
+            for node, output in outputs.items():
+                put_start = time.perf_counter()
+                store.put(fingerprint, node, output)
+                put_latencies.append(time.perf_counter() - put_start)
+        store.flush()
+        total = time.perf_counter() - start
+
+        read_start = time.perf_counter()
+        for i in range(num_articles):
+            store.get(f"{i:064x}", "EntityRiskAgent")
+        read_per_lookup = (time.perf_counter() - read_start) / num_articles
+        store.close()
+
+    put_latencies.sort()
+    per_node = total / len(put_latencies)
+    summary = {
+        "checkpoints": len(put_latencies),
+        "batch_size": batch_size,
+        "mean_write_seconds": per_node,
+        "p50_put_seconds": put_latencies[len(put_latencies) // 2],
+        "p99_put_seconds": put_latencies[int(len(put_latencies) * 0.99)],
+        "max_put_seconds": put_latencies[-1],
+        "mean_lookup_seconds": read_per_lookup,
+        "overhead_vs_llm_call": per_node / llm_latency,
+    }
+
+    print(f"Checkpoints written: {summary['checkpoints']} (batch size {batch_size})")
+    print(f"Mean write cost per node: {per_node * 1e6:.1f} µs "
+          f"(p50 put {summary['p50_put_seconds'] * 1e6:.1f} µs, "
+          f"p99 put {summary['p99_put_seconds'] * 1e6:.1f} µs incl. batch commits)")
+    print(f"Mean lookup: {read_per_lookup * 1e6:.1f} µs")
+    print(f"Overhead relative to a {llm_latency * 1000:.0f} ms LLM call: {summary['overhead_vs_llm_call']:.4%}")
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark node checkpoint write overhead")
+    parser.add_argument("--articles", type=int, default=2000)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Reference LLM call latency in seconds")
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+    run_benchmark(args.articles, args.llm_latency, args.batch_size)
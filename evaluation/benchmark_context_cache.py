@@ -0,0 +1,131 @@
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from evaluation.benchmark_work_queue import synthetic_articles
+from evaluation.load_test import StubUpstreamServer, UpstreamBehavior
+
+# Project modules read their endpoints from config at import time, so the
+# agents are imported only after run_benchmark() has pointed the environment
+# at the stand-in Gemini.
+
+def run_benchmark(
+    num_articles: int = 50,
+    gemini: Optional[UpstreamBehavior] = None,
+    output_dir: str = "evaluation/results",
+) -> Dict[str, Any]:
+    """
+    Compare agent calls with instructions sent inline against cached contexts
+
+    The same articles go through the sentiment, market impact and risk
+    prompts twice against a stand-in Gemini whose latency grows with the
+    prompt tokens it has to read: once with context caching off (the
+    instructions are sent as a system instruction on every call) and once
+    with it on (they are uploaded once per agent and referenced).
+
+    Args:
+        num_articles: Articles per run
+        gemini: Gemini stand-in behaviour; prefill_ms_per_1k_tokens sets
+            how much the uncached prompt tokens cost in latency
+        output_dir: Where the JSON summary is written
+
+    Returns:
+        Per-mode latency, token and cost figures, and the savings
+    """
+    gemini = gemini or UpstreamBehavior(median_ms=100, sigma=0.2, prefill_ms_per_1k_tokens=400)
+    server = StubUpstreamServer(UpstreamBehavior(median_ms=10), gemini)
+    base_url = server.start()
+    os.environ.update({
+        "GEMINI_API_BASE": base_url,
+        "GEMINI_API_KEY": "benchmark",
+        "FNNA_DATA_DIR": tempfile.mkdtemp(prefix="fnna_context_cache_"),
+        # The stand-in accepts contexts of any size; Gemini itself has a minimum
+        "CONTEXT_CACHE_MIN_TOKENS": "0",
+    })
+
+    from agents import entity_risk_agent, market_impact_agent, sentiment_agent
+    from config import config
+    from utils.llm_client import agent_prompt, context_cache
+    from utils.metrics import metrics
+    from utils.usage import usage_ledger
+
+    def calls(article: Dict[str, Any]) -> List[tuple]:
+        content, tickers = article["content"], [article["content"].split("(")[1].split(")")[0]]
+        return [
+            ("sentiment", sentiment_agent.build_prompt(content), sentiment_agent.SENTIMENT_INSTRUCTIONS),
+            ("market_impact", market_impact_agent.build_prompt(content, tickers, "positive"),
+             market_impact_agent.IMPACT_INSTRUCTIONS),
+            ("entity_risk", entity_risk_agent.build_prompt(content, tickers), entity_risk_agent.RISK_INSTRUCTIONS),
+        ]
+
+    articles = synthetic_articles(num_articles, seed=1)
+    modes = {}
+    print(f"{'mode':>8}{'calls':>7}{'mean ms':>9}{'p95 ms':>8}{'prompt tok':>12}{'cached tok':>12}{'cost $':>11}")
+    try:
+        for mode in ("inline", "cached"):
+            config.CONTEXT_CACHE_ENABLED = mode == "cached"
+            metrics.reset()
+            usage_ledger.reset()
+            latencies = []
+            for article in articles:
+                for agent, prompt, instructions in calls(article):
+                    start = time.perf_counter()
+                    agent_prompt(agent, prompt, instructions=instructions)
+                    latencies.append(time.perf_counter() - start)
+            tokens = metrics.counters("llm_tokens")
+            row = {
+                "calls": len(latencies),
+                "mean_ms": statistics.mean(latencies) * 1000,
+                "p95_ms": sorted(latencies)[int(0.95 * (len(latencies) - 1))] * 1000,
+                "prompt_tokens": sum(value for key, value in tokens.items() if "kind=prompt" in key),
+                "cached_tokens": sum(value for key, value in tokens.items() if "kind=cached" in key),
+                "cost_usd": sum(metrics.counters("llm_cost_usd").values()),
+                "cache_storage_usd": sum(metrics.counters("context_cache_storage_usd").values()),
+                "contexts_created": sum(metrics.counters("context_cache_creates").values()),
+            }
+            modes[mode] = row
+            print(f"{mode:>8}{row['calls']:>7}{row['mean_ms']:>9.1f}{row['p95_ms']:>8.1f}"
+                  f"{row['prompt_tokens']:>12.0f}{row['cached_tokens']:>12.0f}{row['cost_usd']:>11.6f}")
+        context_cache.clear()
+    finally:
+        server.stop()
+
+    inline, cached = modes["inline"], modes["cached"]
+    summary = {
+        "articles": num_articles,
+        "gemini": vars(gemini),
+        "modes": modes,
+        "latency_saved": 1 - cached["mean_ms"] / inline["mean_ms"],
+        "cached_token_share": cached["cached_tokens"] / cached["prompt_tokens"] if cached["prompt_tokens"] else 0.0,
+        "cost_saved": 1 - (cached["cost_usd"] + cached["cache_storage_usd"]) / inline["cost_usd"]
+        if inline["cost_usd"] else 0.0,
+        "upstream_requests": server.counts,
+    }
+    print(f"Mean latency {summary['latency_saved']:.0%} lower, {summary['cached_token_share']:.0%} of prompt tokens "
+          f"cached, cost {summary['cost_saved']:.0%} lower including {cached['contexts_created']:.0f} contexts' storage")
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_file = os.path.join(output_dir, f"context_cache_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output_file, "w") as f:
+        json.dump(summary, f, indent=2)
+    print(f"Results saved to: {output_file}")
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark context caching of agent instructions")
+    parser.add_argument("--articles", type=int, default=50)
+    parser.add_argument("--gemini-median-ms", type=float, default=100)
+    parser.add_argument("--prefill-ms-per-1k-tokens", type=float, default=400)
+    parser.add_argument("--output-dir", default="evaluation/results")
+    args = parser.parse_args()
+    run_benchmark(
+        args.articles,
+        UpstreamBehavior(median_ms=args.gemini_median_ms, sigma=0.2,
+                         prefill_ms_per_1k_tokens=args.prefill_ms_per_1k_tokens),
+        args.output_dir,
+    )
@@ -0,0 +1,105 @@
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from typing import Any, Dict
+
+from core.corpus_store import CorpusStore
+
+TICKERS = ["AAPL", "MSFT", "TSLA", "NVDA", "AMZN", "GOOGL", "META", "JPM", "XOM", "PFE"]
+RISKS = ["regulatory", "geopolitical", "financial", "operational", "market", "legal", "reputation", "cyber"]
+
+def run_benchmark(num_rows: int = 200000, chunk_size: int = 10000, repeats: int = 20, seed: int = 0) -> Dict[str, Any]:
+    """
+    Measure append and filter speed of the columnar corpus store
+
+    Writes synthetic analyses spread over a year of publish dates, then times
+    typical history filters against the memory-mapped columns.
+
+    Args:
+        num_rows: Analyses to write
+        chunk_size: Rows per append call
+        repeats: Runs per query; the median is reported
+        seed: Seed for the synthetic data
+
+    Returns:
+        Benchmark summary
+    """
+    rng = random.Random(seed)
+    now = time.time()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = CorpusStore(tmp_dir)
+
+        start = time.perf_counter()
+        for chunk_start in range(0, num_rows, chunk_size):
+            records = []
+            for i in range(chunk_start, min(chunk_start + chunk_size, num_rows)):
+                records.append((
+                    {
+                        "article_id": f"bench_{i}",
+                        "headline": f"Synthetic headline {i}",
+                        "link": f"https://news.example.com/{i}",
+                        "source": "Benchmark Wire",
+                        "published_at": f"{rng.randint(1, 365)} days ago",
+                    },
+                    {
+                        "sentiment": rng.choice(["positive", "negative", "neutral"]),
+                        "impact_level": rng.choice(["high", "medium", "low"]),
+                        "route": "full",
+                        "analysis_quality": "complete",
+                        "decision": "Hold",
+                        "risks": rng.sample(RISKS, rng.randint(0, 2)) or ["none"],
+                        "tickers": rng.sample(TICKERS, rng.randint(0, 2)),
+                        "confidence_score": rng.random(),
+                    },
+                ))
+            store.append(records, analyzed_at=now)
+        append_seconds = time.perf_counter() - start
+
+        queries = {
+            "ticker": lambda: store.query(ticker="NVDA"),
+            "last_30_days": lambda: store.query(since=now - 30 * 86400),
+            "sentiment": lambda: store.query(sentiment="negative"),
+            "ticker_30_days_negative": lambda: store.query(
+                ticker="NVDA", since=now - 30 * 86400, sentiment="negative"
+            ),
+            "risk_high_impact": lambda: store.query(risk="regulatory", impact_level="high"),
+        }
+        timings = {}
+        matches = {}
+        for name, query in queries.items():
+            durations = []
+            for _ in range(repeats):
+                query_start = time.perf_counter()
+                rows = query()
+                durations.append(time.perf_counter() - query_start)
+            timings[name] = statistics.median(durations)
+            matches[name] = len(rows)
+
+        materialize_start = time.perf_counter()
+        store.rows(store.query(ticker="NVDA", since=now - 30 * 86400, sentiment="negative"))
+        materialize_seconds = time.perf_counter() - materialize_start
+
+    summary = {
+        "rows": num_rows,
+        "append_rows_per_second": num_rows / append_seconds,
+        "query_seconds": timings,
+        "query_matches": matches,
+        "materialize_seconds": materialize_seconds,
+    }
+
+    print(f"Rows written: {num_rows} ({summary['append_rows_per_second']:.0f} rows/s in chunks of {chunk_size})")
+    for name, seconds in timings.items():
+        print(f"  {name:<26}{seconds * 1000:8.2f} ms  ({matches[name]} rows)")
+    print(f"Materializing the ticker/30-day/negative rows: {materialize_seconds * 1000:.2f} ms")
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark corpus store appends and filters")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    run_benchmark(args.rows, args.chunk_size, args.repeats)
@@ -0,0 +1,151 @@
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from evaluation.load_test import COMPANIES, HEADLINE_TEMPLATES, StubUpstreamServer, UpstreamBehavior
+
+# Project modules read their endpoints from config at import time, and spawned
+# worker processes inherit the environment, so the work queue is imported only
+# after run_benchmark() has pointed it at the stand-in servers.
+
+@contextlib.contextmanager
+def _quiet_workers(verbose: bool):
+    """Send the workers' pipeline logging to /dev/null (they share this process's stdout)"""
+    if verbose:
+        yield
+        return
+    sys.stdout.flush()
+    saved = os.dup(1)
+    with open(os.devnull, "w") as devnull:
+        os.dup2(devnull.fileno(), 1)
+    try:
+        yield
+    finally:
+        os.dup2(saved, 1)
+        os.close(saved)
+
+def synthetic_articles(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Distinct articles built from the load-test templates"""
+    rng = random.Random(seed)
+    articles = []
+    for i in range(count):
+        headline, content = rng.choice(HEADLINE_TEMPLATES)
+        company, ticker = rng.choice(COMPANIES)
+        articles.append({
+            "article_id": f"bench_{seed}_{i}",
+            "headline": f"{headline.format(company=company)} ({i})",
+            "content": content.format(company=company, ticker=ticker),
+            "published_at": "1 hour ago",
+        })
+    return articles
+
+def run_benchmark(
+    worker_counts: List[int],
+    articles_per_worker: int = 20,
+    gemini: Optional[UpstreamBehavior] = None,
+    output_dir: str = "evaluation/results",
+    verbose: bool = False,
+) -> Dict[str, Any]:
+    """
+    Measure throughput of the durable work queue against the number of worker processes
+
+    For each worker count a fresh SQLite queue is filled with
+    articles_per_worker articles per worker, so every run takes about as
+    long at perfect scaling. Workers load the pipeline, start together and
+    exit once the queue is drained; Gemini is a local stand-in with fixed
+    latency.
+
+    Args:
+        worker_counts: Worker process counts to compare, ascending
+        articles_per_worker: Articles enqueued per worker process
+        gemini: Gemini stand-in behaviour (errors off so runs are comparable)
+        output_dir: Where the JSON summary is written
+        verbose: Show the workers' pipeline logging
+
+    Returns:
+        Rows of throughput and scaling efficiency per worker count
+    """
+    gemini = gemini or UpstreamBehavior(median_ms=300, sigma=0.3)
+    server = StubUpstreamServer(UpstreamBehavior(median_ms=50), gemini)
+    base_url = server.start()
+    data_dir = tempfile.mkdtemp(prefix="fnna_work_queue_")
+    os.environ.update({
+        "SERPER_API_URL": f"{base_url}/news",
+        "SERPER_API_KEY": "benchmark",
+        "GEMINI_API_BASE": base_url,
+        "GEMINI_API_KEY": "benchmark",
+        "FNNA_DATA_DIR": data_dir,
+        # Each run measures analyses, not the corpus append
+        "CORPUS_ENABLED": "false",
+    })
+
+    from core.work_queue import SQLiteWorkQueue, run_worker_processes
+
+    rows = []
+    print(f"{'workers':>8}{'articles':>10}{'elapsed s':>11}{'articles/s':>12}{'speedup':>9}{'efficiency':>12}{'failed':>8}")
+    try:
+        for workers in worker_counts:
+            db_path = os.path.join(data_dir, f"queue_{workers}.db")
+            work_queue = SQLiteWorkQueue(db_path)
+            job_ids = work_queue.enqueue(synthetic_articles(workers * articles_per_worker, seed=workers))
+            # Pipeline start-up is excluded: workers claim only once all have loaded it
+            with _quiet_workers(verbose):
+                wall_seconds = run_worker_processes(workers, f"sqlite:///{db_path}", max_idle_seconds=0,
+                                                    synchronized_start=True)
+            jobs = work_queue.results(job_ids).values()
+            work_queue.close()
+
+            done = [job for job in jobs if job["status"] == "done"]
+            throughput = len(done) / wall_seconds if wall_seconds > 0 else 0.0
+            base = rows[0]["throughput"] / rows[0]["workers"] if rows else throughput / workers
+            row = {
+                "workers": workers,
+                "articles": len(job_ids),
+                "elapsed_seconds": wall_seconds,
+                "throughput": throughput,
+                "speedup": throughput / base if base else 0.0,
+                "efficiency": throughput / (base * workers) if base else 0.0,
+                "failed": len(job_ids) - len(done),
+                "mean_attempts": sum(job["attempts"] for job in jobs) / len(job_ids),
+            }
+            rows.append(row)
+            print(f"{workers:>8}{row['articles']:>10}{wall_seconds:>11.2f}{throughput:>12.2f}"
+                  f"{row['speedup']:>9.2f}{row['efficiency']:>12.0%}{row['failed']:>8}")
+    finally:
+        server.stop()
+
+    summary = {
+        "cpu_count": os.cpu_count(),
+        "articles_per_worker": articles_per_worker,
+        "gemini": vars(gemini),
+        "rows": rows,
+        "upstream_requests": server.counts,
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    output_file = os.path.join(output_dir, f"work_queue_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output_file, "w") as f:
+        json.dump(summary, f, indent=2)
+    print(f"CPUs: {os.cpu_count()}; results saved to: {output_file}")
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark work queue throughput against worker process count")
+    parser.add_argument("--workers", default="1,2,4,8", help="Comma-separated worker process counts")
+    parser.add_argument("--articles-per-worker", type=int, default=20)
+    parser.add_argument("--gemini-median-ms", type=float, default=300)
+    parser.add_argument("--output-dir", default="evaluation/results")
+    parser.add_argument("--verbose", action="store_true", help="Show worker pipeline logging")
+    args = parser.parse_args()
+    run_benchmark(
+        [int(value) for value in args.workers.split(",")],
+        args.articles_per_worker,
+        UpstreamBehavior(median_ms=args.gemini_median_ms, sigma=0.3),
+        args.output_dir,
+        args.verbose,
+    )
@@ -1,14 +1,20 @@
+import argparse
 import json
 import os
-from typing import Dict, Any, List
-from core.graph import analyze_news_article
+import time
+from typing import Dict, Any, List, Optional
+from agents.relevance_filter import evaluate_filter
+from core.graph import analyze_news_article, analyze_news_batch, get_route_stats
+from utils.profiler import profiler
+from utils.usage import usage_ledger
 from datetime import datetime
 
 class NewsAnalysisEvaluator:
     """Evaluator for the financial news analysis system"""
     
-    def __init__(self, output_dir: str = "evaluation/results"):
+    def __init__(self, output_dir: str = "evaluation/results", batch_size: Optional[int] = None):
         self.output_dir = output_dir
+        self.batch_size = batch_size
         os.makedirs(output_dir, exist_ok=True)
     
     def create_test_data(self) -> List[Dict[str, Any]]:
@@ -40,10 +46,41 @@ class NewsAnalysisEvaluator:
                 "expected_sentiment": "positive",
                 "expected_impact": "low",
                 "expected_risks": ["none"]
+            },
+            # Off-topic articles the relevance filter should keep away from the LLM
+            {
+                "article_id": "test_004",
+                "headline": "Lakers Edge Celtics in Overtime Thriller as Fans Pack the Arena",
+                "content": "LeBron James scored 35 points and the Lakers held on in overtime to win the season opener. The coach praised the team's defense, and the players thanked the fans after the game.",
+                "published_at": "2024-01-18",
+                "expected_relevant": False,
+                "expected_sentiment": "neutral",
+                "expected_impact": "low",
+                "expected_risks": ["none"]
+            },
+            {
+                "article_id": "test_005",
+                "headline": "Ten Easy Weeknight Pasta Recipes for Busy Families",
+                "content": "These quick dinners take less than 30 minutes and use pantry staples. Our chef shares tips for cooking pasta perfectly, plus a few ideas for vegetarian sauces the whole family will love.",
+                "published_at": "2024-01-19",
+                "expected_relevant": False,
+                "expected_sentiment": "neutral",
+                "expected_impact": "low",
+                "expected_risks": ["none"]
             }
         ]
         return test_cases
     
+    def evaluate_relevance(self, test_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Precision and recall of the local relevance filter (no LLM calls)
+        
+        Test cases are financial news unless they set "expected_relevant": False.
+        """
+        texts = [f"{case['headline']}. {case['content']}" for case in test_data]
+        labels = [case.get("expected_relevant", True) for case in test_data]
+        return evaluate_filter(texts, labels)
+    
     def evaluate_prediction(self, predicted: Dict[str, Any], expected: Dict[str, Any]) -> Dict[str, Any]:
         """
         Evaluate prediction accuracy against expected results
@@ -106,12 +143,25 @@ class NewsAnalysisEvaluator:
         
         print(f"Running evaluation on {len(test_data)} test cases...")
         
+        # Packed mode classifies all cases up front, K articles per prompt
+        batch_results = None
+        start_time = time.perf_counter()
+        if self.batch_size and self.batch_size > 1:
+            print(f"Using packed prompts with batch size {self.batch_size}")
+            try:
+                batch_results = analyze_news_batch(test_data, self.batch_size)
+            except Exception as e:
+                print(f"Batch analysis failed, falling back to single-article mode: {str(e)}")
+        
         for i, test_case in enumerate(test_data):
             print(f"\nEvaluating test case {i+1}: {test_case['headline'][:50]}...")
             
             try:
                 # Run analysis
-                analysis_result = analyze_news_article(test_case)
+                if batch_results is not None:
+                    analysis_result = batch_results[i]
+                else:
+                    analysis_result = analyze_news_article(test_case)
                 final_analysis = analysis_result.get("final_analysis", {})
                 
                 # Evaluate results
@@ -145,6 +195,8 @@ class NewsAnalysisEvaluator:
                     "timestamp": datetime.now().isoformat()
                 })
         
+        elapsed_seconds = time.perf_counter() - start_time
+        
         # Calculate final averages
         num_successful = len([r for r in results if "error" not in r])
         if num_successful > 0:
@@ -156,6 +208,12 @@ class NewsAnalysisEvaluator:
             "successful_analyses": num_successful,
             "failed_analyses": len(test_data) - num_successful,
             "average_metrics": total_metrics,
+            "batch_size": self.batch_size or 1,
+            "elapsed_seconds": elapsed_seconds,
+            "articles_per_second": len(test_data) / elapsed_seconds if elapsed_seconds > 0 else 0.0,
+            "route_stats": get_route_stats(),
+            "relevance_filter": self.evaluate_relevance(test_data),
+            "token_usage": usage_ledger.summary(),
             "detailed_results": results,
             "evaluation_timestamp": datetime.now().isoformat()
         }
@@ -167,13 +225,39 @@ class NewsAnalysisEvaluator:
         
         print(f"\nEvaluation complete! Results saved to: {output_file}")
         print(f"Overall Accuracy: {total_metrics['overall_accuracy']:.2f}")
+        print(f"Throughput: {evaluation_summary['articles_per_second']:.2f} articles/s (batch size {evaluation_summary['batch_size']})")
+        print(f"Routes: {evaluation_summary['route_stats']['routes']} "
+              f"(LLM calls saved: {evaluation_summary['route_stats']['llm_calls_saved']})")
+        model_totals = evaluation_summary["token_usage"]["totals"]["model"].values()
+        print(f"Tokens: {sum(entry['prompt_tokens'] + entry['output_tokens'] for entry in model_totals):.0f} "
+              f"(${sum(entry['cost_usd'] for entry in model_totals):.4f})")
+        relevance = evaluation_summary["relevance_filter"]
+        print(f"Relevance filter: precision {relevance['precision']:.2f}, recall {relevance['recall']:.2f} "
+              f"(threshold {relevance['threshold']})")
         
         return evaluation_summary
 
-def run_evaluation():
+def run_evaluation(batch_size: Optional[int] = None):
     """Main evaluation function for backward compatibility"""
-    evaluator = NewsAnalysisEvaluator()
+    evaluator = NewsAnalysisEvaluator(batch_size=batch_size)
     return evaluator.run_evaluation()
 
 if __name__ == "__main__":
-    run_evaluation() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Evaluate the financial news analysis pipeline")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="Articles per packed sentiment/impact prompt (default: single-article prompts)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile nodes and client calls and write a CPU vs wait report")
+    parser.add_argument("--relevance-only", action="store_true",
+                        help="Only report the relevance filter's precision/recall (no LLM calls)")
+    args = parser.parse_args()
+    if args.relevance_only:
+        evaluator = NewsAnalysisEvaluator()
+        print(json.dumps(evaluator.evaluate_relevance(evaluator.create_test_data()), indent=2))
+        raise SystemExit(0)
+    if args.profile:
+        profiler.enable(sample_rate=1.0, capture_stacks=True)
+    run_evaluation(batch_size=args.batch_size)
+    if args.profile:
+        profiler.write_report()
+ 
\ No newline at end of file
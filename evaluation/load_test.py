@@ -0,0 +1,546 @@
+import argparse
+import contextlib
+import csv
+import io
+import json
+import math
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from agents.heuristics import heuristic_impact, heuristic_risks, heuristic_sentiment
+
+# Project modules read their endpoints from config at import time, so they
+# are imported only after run_load_test() has pointed the environment at the
+# stand-in servers. Run this as its own process: python -m evaluation.load_test
+
+HEADLINE_TEMPLATES = [
+    ("{company} beats earnings estimates as revenue surges", "{company} ({ticker}) reported record profits and strong growth in cloud revenue, raising full-year guidance."),
+    ("SEC charges {company} executives over accounting fraud", "Regulators filed charges against {company} ({ticker}) alleging fraud; shares plunge on the probe."),
+    ("{company} announces quarterly dividend", "{company} ({ticker}) declared its regular quarterly dividend, unchanged from the prior quarter."),
+    ("{company} to acquire rival in $4 billion deal", "{company} ({ticker}) agreed to acquire a competitor in a merger expected to close next year, pending antitrust approval."),
+    ("{company} recalls vehicles over battery defect", "{company} ({ticker}) issued a recall after a supply shortage and production outage; losses may widen."),
+    ("Analysts see steady demand for {company} products", "Market commentary on {company} ({ticker}) notes steady demand and stable pricing."),
+]
+
+COMPANIES = [
+    ("Apple", "AAPL"), ("Tesla", "TSLA"), ("Microsoft", "MSFT"), ("Nvidia", "NVDA"),
+    ("Amazon", "AMZN"), ("Meta", "META"), ("JPMorgan", "JPM"), ("Boeing", "BA"),
+]
+
+class UpstreamBehavior:
+    """Latency and failure profile of one stand-in endpoint"""
+
+    def __init__(
+        self,
+        median_ms: float,
+        sigma: float = 0.5,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        slow_body_rate: float = 0.0,
+        slow_body_seconds: float = 2.0,
+        prefill_ms_per_1k_tokens: float = 0.0,
+    ):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.slow_body_rate = slow_body_rate
+        self.slow_body_seconds = slow_body_seconds
+        # Time to read the prompt, charged on tokens not served from a cached context
+        self.prefill_ms_per_1k_tokens = prefill_ms_per_1k_tokens
+
+    def sample_latency(self, rng: random.Random, prompt_tokens: int = 0) -> float:
+        """Lognormal latency in seconds around the median, plus prefill of the uncached prompt tokens"""
+        prefill = self.prefill_ms_per_1k_tokens * prompt_tokens / 1_000_000.0
+        return rng.lognormvariate(math.log(self.median_ms / 1000.0), self.sigma) + prefill
+
+class StubUpstreamServer:
+    """
+    Local HTTP server emulating the Serper /news endpoint and Gemini's
+    generateContent and cachedContents endpoints
+
+    Gemini answers are produced by the local keyword heuristics, so the
+    pipeline takes realistic routes. Each response draws a latency from the
+    endpoint's distribution and may instead be a 500, a 429, or a body that
+    trickles out over slow_body_seconds. Cached contexts are kept in memory
+    until their TTL runs out; their tokens are reported as cached and skip
+    the prefill latency.
+    """
+
+    def __init__(self, serper: UpstreamBehavior, gemini: UpstreamBehavior, seed: int = 0):
+        self.behaviors = {"serper": serper, "gemini": gemini}
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._counts_lock = threading.Lock()
+        self.counts: Dict[str, int] = {}
+        self._sequence = 0
+        self.cached_contents: Dict[str, Dict[str, Any]] = {}
+        self._cache_lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _body(self) -> Dict[str, Any]:
+                length = int(self.headers.get("Content-Length", 0))
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def do_POST(self):
+                body = self._body()
+                if self.path.startswith("/news"):
+                    server._respond(self, "serper", server._serper_payload(body))
+                elif ":generateContent" in self.path:
+                    payload, uncached_tokens = server._gemini_payload(body)
+                    if "error" in payload:
+                        server._send(self, payload["error"]["code"], payload)
+                    else:
+                        server._respond(self, "gemini", payload, uncached_tokens)
+                elif "/cachedContents" in self.path:
+                    server._send(self, 200, server._create_cached_content(body))
+                else:
+                    self.send_error(404)
+
+            def do_GET(self):
+                server._send(self, *server._cached_content_op(self.path, "get", {}))
+
+            def do_PATCH(self):
+                server._send(self, *server._cached_content_op(self.path, "update", self._body()))
+
+            def do_DELETE(self):
+                server._send(self, *server._cached_content_op(self.path, "delete", {}))
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stub-upstream", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _count(self, key: str):
+        with self._counts_lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def _serper_payload(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        news = []
+        for _ in range(int(body.get("num", 10))):
+            with self._rng_lock:
+                self._sequence += 1
+                sequence = self._sequence
+                headline, snippet = self._rng.choice(HEADLINE_TEMPLATES)
+                company, ticker = self._rng.choice(COMPANIES)
+            # Unique text so neither the analysis cache nor job dedup short-circuits
+            news.append({
+                "title": f"{headline.format(company=company)} (#{sequence})",
+                "snippet": f"{snippet.format(company=company, ticker=ticker)} Report #{sequence}.",
+                "date": "1 hour ago",
+                "link": f"https://news.example.com/{ticker.lower()}/{sequence}",
+                "source": "Load Test Wire",
+            })
+        return {"news": news}
+
+    @staticmethod
+    def _text(content: Optional[Dict[str, Any]]) -> str:
+        return "".join(part.get("text", "") for part in (content or {}).get("parts", []))
+
+    @staticmethod
+    def _ttl_seconds(body: Dict[str, Any]) -> float:
+        return float(str(body.get("ttl", "3600s")).rstrip("s"))
+
+    def _cached_content_view(self, name: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "name": name,
+            "model": entry["model"],
+            "displayName": entry["displayName"],
+            "usageMetadata": {"totalTokenCount": entry["tokens"]},
+            "expireTime": datetime.fromtimestamp(entry["expires_at"], tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        }
+
+    def _create_cached_content(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        self._count("gemini:cache_create")
+        instructions = self._text(body.get("systemInstruction"))
+        with self._cache_lock:
+            self._sequence += 1
+            name = f"cachedContents/stub{self._sequence}"
+            entry = self.cached_contents[name] = {
+                "model": body.get("model", ""),
+                "displayName": body.get("displayName", ""),
+                "instructions": instructions,
+                "tokens": len(instructions) // 4,
+                "expires_at": time.time() + self._ttl_seconds(body),
+            }
+        return self._cached_content_view(name, entry)
+
+    def _live_cached_content(self, name: str) -> Optional[Dict[str, Any]]:
+        with self._cache_lock:
+            entry = self.cached_contents.get(name)
+            if entry is not None and entry["expires_at"] <= time.time():
+                del self.cached_contents[name]
+                entry = None
+        return entry
+
+    def _cached_content_op(self, path: str, op: str, body: Dict[str, Any]):
+        name = "cachedContents/" + path.split("/cachedContents/", 1)[-1].split("?", 1)[0]
+        entry = self._live_cached_content(name)
+        if entry is None:
+            return 404, {"error": {"code": 404, "message": f"CachedContent not found: {name}", "status": "NOT_FOUND"}}
+        self._count(f"gemini:cache_{op}")
+        if op == "delete":
+            with self._cache_lock:
+                self.cached_contents.pop(name, None)
+            return 200, {}
+        if op == "update" and "ttl" in body:
+            entry["expires_at"] = time.time() + self._ttl_seconds(body)
+        return 200, self._cached_content_view(name, entry)
+
+    def _gemini_payload(self, body: Dict[str, Any]):
+        """generateContent answer and the number of prompt tokens not served from a cached context"""
+        prompt = body.get("contents", [{}])[0].get("parts", [{}])[0].get("text", "")
+        cached_tokens = 0
+        if body.get("cachedContent"):
+            entry = self._live_cached_content(body["cachedContent"])
+            if entry is None:
+                self._count("gemini:cache_missing")
+                return {"error": {"code": 404, "message": f"CachedContent not found: {body['cachedContent']}",
+                                  "status": "NOT_FOUND"}}, 0
+            cached_tokens = entry["tokens"]
+        uncached_tokens = (len(prompt) + len(self._text(body.get("systemInstruction")))) // 4
+        match = re.search(r'"""(.*?)"""', prompt, re.DOTALL)
+        content = match.group(1) if match else prompt
+        if prompt.rstrip().endswith("Sentiment:"):
+            text = heuristic_sentiment(content)
+        elif prompt.rstrip().endswith("Market Impact:"):
+            text = heuristic_impact(content)
+        elif prompt.rstrip().endswith("Risks:"):
+            text = ", ".join(heuristic_risks(content))
+        else:
+            text = "neutral"
+        prompt_tokens = uncached_tokens + cached_tokens
+        usage = {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": max(len(text) // 4, 1),
+            "totalTokenCount": prompt_tokens + max(len(text) // 4, 1),
+        }
+        if cached_tokens:
+            usage["cachedContentTokenCount"] = cached_tokens
+        return {
+            "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}],
+            "usageMetadata": usage,
+        }, uncached_tokens
+
+    def _send(self, handler: BaseHTTPRequestHandler, status: int, payload: Dict[str, Any]):
+        data = json.dumps(payload).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json; charset=UTF-8")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _respond(self, handler: BaseHTTPRequestHandler, endpoint: str, payload: Dict[str, Any], prompt_tokens: int = 0):
+        behavior = self.behaviors[endpoint]
+        with self._rng_lock:
+            latency = behavior.sample_latency(self._rng, prompt_tokens)
+            roll = self._rng.random()
+            slow_body = self._rng.random() < behavior.slow_body_rate
+        time.sleep(latency)
+
+        if roll < behavior.throttle_rate:
+            status, outcome = 429, "throttled"
+            payload = {"error": {"code": 429, "message": "Resource has been exhausted (e.g. check quota).",
+                                 "status": "RESOURCE_EXHAUSTED"}}
+        elif roll < behavior.throttle_rate + behavior.error_rate:
+            status, outcome = 500, "error"
+            payload = {"error": {"code": 500, "message": "Internal error encountered.", "status": "INTERNAL"}}
+        else:
+            status, outcome = 200, "slow_body" if slow_body else "ok"
+        self._count(f"{endpoint}:{outcome}")
+
+        data = json.dumps(payload).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json; charset=UTF-8")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        try:
+            if status == 200 and slow_body:
+                # Headers arrive on time, the body trickles out
+                chunks = 10
+                step = max(len(data) // chunks, 1)
+                for start in range(0, len(data), step):
+                    handler.wfile.write(data[start:start + step])
+                    handler.wfile.flush()
+                    time.sleep(behavior.slow_body_seconds / chunks)
+            else:
+                handler.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # Client gave up (timeout) mid-body
+            self._count(f"{endpoint}:client_disconnected")
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100.0 * (len(ordered) - 1))))]
+
+def _run_service_level(job_queue, offered_rps: float, duration: float, rng: random.Random) -> Dict[str, Any]:
+    """Open-loop arrivals: each user searches, then submits the top article as a job"""
+    from utils.metrics import metrics
+    from utils.serper_client import fetch_financial_news
+
+    latencies: List[float] = []
+    outcomes = {"complete": 0, "degraded": 0, "failed": 0}
+    lock = threading.Lock()
+    metrics.reset()
+
+    def user_request():
+        start = time.perf_counter()
+        articles = fetch_financial_news("load test", num_results=1)
+        outcome = "failed"
+        if articles:
+            article = articles[0]
+            job = job_queue.submit({
+                "article_id": article["link"],
+                "headline": article["headline"],
+                "content": article["content"],
+                "published_at": article["published_at"],
+            })
+            job.wait()
+            if job.status == "done":
+                outcome = job.result["final_analysis"].get("analysis_quality", "complete")
+        with lock:
+            latencies.append(time.perf_counter() - start)
+            outcomes[outcome] += 1
+
+    level_start = time.perf_counter()
+    # Enough user threads that arrivals never wait on the load generator itself
+    with ThreadPoolExecutor(max_workers=512) as users:
+        next_arrival = level_start
+        while next_arrival - level_start < duration:
+            users.submit(user_request)
+            next_arrival += rng.expovariate(offered_rps)
+            time.sleep(max(0.0, next_arrival - time.perf_counter()))
+    # Includes draining, so a growing backlog shows up as lower throughput
+    elapsed = time.perf_counter() - level_start
+    return {
+        "outcomes": outcomes,
+        "elapsed": elapsed,
+        "p50": _percentile(latencies, 50),
+        "p95": _percentile(latencies, 95),
+        "p99": _percentile(latencies, 99),
+        "p95_wait_by_priority": {
+            name: class_stats["p95_wait"] for name, class_stats in job_queue.stats()["by_priority"].items()
+        },
+    }
+
+def _run_batch_level(offered_rps: float, duration: float) -> Dict[str, Any]:
+    """Closed loop over analyze_news_batch: one search + batch per second of offered load"""
+    from core.graph import analyze_news_batch
+    from utils.metrics import metrics
+    from utils.serper_client import fetch_financial_news
+
+    batch_size = max(1, int(round(offered_rps)))
+    outcomes = {"complete": 0, "degraded": 0, "failed": 0}
+    metrics.reset()
+    level_start = time.perf_counter()
+    while time.perf_counter() - level_start < duration:
+        articles = fetch_financial_news("load test", num_results=batch_size)
+        outcomes["failed"] += batch_size - len(articles)
+        news_list = [
+            {"article_id": a["link"], "headline": a["headline"], "content": a["content"], "published_at": a["published_at"]}
+            for a in articles
+        ]
+        for result in analyze_news_batch(news_list):
+            outcomes[result["final_analysis"].get("analysis_quality", "complete")] += 1
+    elapsed = time.perf_counter() - level_start
+    # Per-article latency from the pipeline's own SLO histogram
+    return {
+        "outcomes": outcomes,
+        "elapsed": elapsed,
+        "p50": metrics.percentile("analysis_latency_seconds", 50),
+        "p95": metrics.percentile("analysis_latency_seconds", 95),
+        "p99": metrics.percentile("analysis_latency_seconds", 99),
+    }
+
+def run_load_test(
+    levels: List[float],
+    duration: float = 15.0,
+    entry: str = "service",
+    serper: Optional[UpstreamBehavior] = None,
+    gemini: Optional[UpstreamBehavior] = None,
+    workers: Optional[int] = None,
+    slo_seconds: float = 10.0,
+    output_dir: str = "evaluation/results",
+    verbose: bool = False,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Drive the pipeline at increasing offered load against local stand-in APIs
+
+    Args:
+        levels: Offered loads in requests per second, ascending
+        duration: Seconds of arrivals per level
+        entry: "service" (job queue, open-loop arrivals) or "batch" (analyze_news_batch)
+        serper: Serper endpoint behaviour
+        gemini: Gemini endpoint behaviour
+        workers: Job queue workers (defaults to config.JOB_WORKERS)
+        slo_seconds: p95 latency a level must meet to count as sustained
+        output_dir: Where the curve is written as CSV and JSON
+        verbose: Show pipeline logging instead of suppressing it
+        seed: Seed for arrivals and the stand-in servers
+
+    Returns:
+        Curve rows and the saturation point
+    """
+    serper = serper or UpstreamBehavior(median_ms=150, sigma=0.4)
+    gemini = gemini or UpstreamBehavior(median_ms=400, sigma=0.6, error_rate=0.01,
+                                        throttle_rate=0.02, slow_body_rate=0.02)
+    server = StubUpstreamServer(serper, gemini, seed=seed)
+    base_url = server.start()
+
+    # Point the clients at the stand-ins before any project module reads config
+    os.environ.update({
+        "SERPER_API_URL": f"{base_url}/news",
+        "SERPER_API_KEY": "load-test",
+        "GEMINI_API_BASE": base_url,
+        "GEMINI_API_KEY": "load-test",
+        "FNNA_DATA_DIR": tempfile.mkdtemp(prefix="fnna_load_test_"),
+    })
+    if workers:
+        os.environ["JOB_WORKERS"] = str(workers)
+
+    from core.job_queue import AnalysisJobQueue
+    from utils.llm_client import llm_limiter
+    from utils.metrics import metrics
+
+    rng = random.Random(seed)
+    if entry == "service":
+        job_queue = AnalysisJobQueue()
+        run_level = lambda offered: _run_service_level(job_queue, offered, duration, rng)
+    else:
+        run_level = lambda offered: _run_batch_level(offered, duration)
+    rows = []
+    print(f"Stand-in upstreams at {base_url}; entry point: {entry}")
+    print(f"{'offered/s':>10}{'achieved/s':>12}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}{'degraded':>10}{'failed':>8}{'llm limit':>11}")
+    try:
+        for offered in levels:
+            output = io.StringIO()
+            with contextlib.nullcontext() if verbose else contextlib.redirect_stdout(output):
+                level = run_level(offered)
+            outcomes = level["outcomes"]
+            total = sum(outcomes.values())
+            row = {
+                "offered_rps": offered,
+                "achieved_rps": (outcomes["complete"] + outcomes["degraded"]) / level["elapsed"],
+                "p50_seconds": level["p50"],
+                "p95_seconds": level["p95"],
+                "p99_seconds": level["p99"],
+                "degraded_share": outcomes["degraded"] / total if total else 0.0,
+                "failed": outcomes["failed"],
+                "failed_share": outcomes["failed"] / total if total else 1.0,
+                "llm_limit": llm_limiter.stats()["limit"],
+                "hedges_fired": sum(metrics.counters("llm_hedges_fired").values()),
+                "hedges_won": sum(metrics.counters("llm_hedges_won").values()),
+            }
+            for name, wait in level.get("p95_wait_by_priority", {}).items():
+                row[f"p95_wait_{name}_seconds"] = wait
+            rows.append(row)
+            print(f"{offered:>10.1f}{row['achieved_rps']:>12.2f}{row['p50_seconds'] or 0:>8.2f}"
+                  f"{row['p95_seconds'] or 0:>8.2f}{row['p99_seconds'] or 0:>8.2f}"
+                  f"{row['degraded_share']:>10.1%}{row['failed']:>8}{row['llm_limit']:>11}")
+    finally:
+        server.stop()
+
+    # Saturation: the highest load still served within the SLO without failures
+    sustained = [
+        row for row in rows
+        if row["p95_seconds"] is not None and row["p95_seconds"] <= slo_seconds
+        and row["failed_share"] <= 0.01
+    ]
+    saturation = max(sustained, key=lambda row: row["offered_rps"]) if sustained else None
+
+    summary = {
+        "entry": entry,
+        "duration_seconds": duration,
+        "slo_p95_seconds": slo_seconds,
+        "serper": vars(serper),
+        "gemini": vars(gemini),
+        "curve": rows,
+        "saturation_rps": saturation["offered_rps"] if saturation else None,
+        "upstream_requests": server.counts,
+    }
+
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    with open(os.path.join(output_dir, f"load_test_{stamp}.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    csv_path = os.path.join(output_dir, f"load_test_{stamp}.csv")
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()) if rows else ["offered_rps"])
+        writer.writeheader()
+        writer.writerows(rows)
+
+    if saturation:
+        print(f"Saturation point: ~{saturation['offered_rps']:.1f} req/s "
+              f"(p95 {saturation['p95_seconds']:.2f}s within the {slo_seconds:.0f}s SLO)")
+    else:
+        print(f"No level was sustained within the {slo_seconds:.0f}s p95 SLO")
+    print(f"Upstream requests: {server.counts}")
+    print(f"Curve written to: {csv_path}")
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the pipeline against local stand-in Serper/Gemini servers")
+    parser.add_argument("--levels", default="1,2,4,8,16", help="Comma-separated offered loads in requests/s")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds of arrivals per level")
+    parser.add_argument("--entry", choices=["service", "batch"], default="service")
+    parser.add_argument("--workers", type=int, default=None, help="Job queue workers (service entry point)")
+    parser.add_argument("--slo", type=float, default=10.0, help="p95 latency target in seconds")
+    parser.add_argument("--gemini-median-ms", type=float, default=400)
+    parser.add_argument("--gemini-sigma", type=float, default=0.6)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.01)
+    parser.add_argument("--gemini-429-rate", type=float, default=0.02)
+    parser.add_argument("--gemini-slow-body-rate", type=float, default=0.02)
+    parser.add_argument("--serper-median-ms", type=float, default=150)
+    parser.add_argument("--serper-error-rate", type=float, default=0.0)
+    parser.add_argument("--output-dir", default="evaluation/results")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline logging")
+    args = parser.parse_args()
+
+    run_load_test(
+        levels=[float(level) for level in args.levels.split(",")],
+        duration=args.duration,
+        entry=args.entry,
+        serper=UpstreamBehavior(args.serper_median_ms, sigma=0.4, error_rate=args.serper_error_rate),
+        gemini=UpstreamBehavior(
+            args.gemini_median_ms,
+            sigma=args.gemini_sigma,
+            error_rate=args.gemini_error_rate,
+            throttle_rate=args.gemini_429_rate,
+            slow_body_rate=args.gemini_slow_body_rate,
+        ),
+        workers=args.workers,
+        slo_seconds=args.slo,
+        output_dir=args.output_dir,
+        verbose=args.verbose,
+    )
@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from agents.decision_rules import DecisionRuleTable, decision_label, get_rules
+from core.corpus_store import CorpusStore
+
+# Routes whose stored decision came from the rule table; other routes (e.g.
+# not_relevant, decided "No Action - Not financial news") keep theirs
+RESCORED_ROUTES = ["full", "risk_skipped", "cached"]
+
+def corpus_features(store: CorpusStore, table: DecisionRuleTable) -> pd.DataFrame:
+    """
+    Rule inputs, route and current decision of every stored analysis
+
+    Built straight from the memory-mapped columns: labels become
+    categoricals over the store's dictionaries, the significant-risk flag is
+    counted from the risk codes and has_tickers comes from the ticker offsets.
+    """
+    columns = store.columns()
+    frame = pd.DataFrame({
+        name: pd.Categorical.from_codes(np.asarray(columns[name], dtype=np.int32), store.dictionary(name))
+        for name in ("sentiment", "impact_level", "route", "decision")
+    })
+    # Per risk code whether it is high risk / "none", then per row how many of each it has
+    risk_names = pd.Index(store.dictionary("risks"))
+    risk_codes = np.asarray(columns["risks_values"])
+    risk_rows = np.repeat(np.arange(len(frame)), np.diff(np.asarray(columns["risks_offsets"]), prepend=0))
+    high = np.bincount(risk_rows, weights=risk_names.isin(table.high_risk_categories)[risk_codes], minlength=len(frame))
+    none = np.bincount(risk_rows, weights=(risk_names == "none")[risk_codes], minlength=len(frame))
+    frame["significant_risk"] = (high > 0) & (none == 0)
+    frame["has_tickers"] = np.diff(np.asarray(columns["tickers_offsets"]), prepend=0) > 0
+    return frame
+
+def diff_decisions(old: pd.Series, new: pd.Series) -> Dict[str, Any]:
+    """
+    Which decisions changed between two categorical decision columns
+
+    Returns:
+        Row and change counts, a transitions table (short label before ->
+        after, with article counts, most common first), decision counts
+        before and after, and the positions of the changed rows
+    """
+    # Compare codes after translating the old categories into the new ones
+    old_in_new = pd.Index(new.cat.categories).get_indexer(old.cat.categories)
+    old_codes = np.where(old.cat.codes.to_numpy() >= 0, old_in_new[old.cat.codes.to_numpy()], -1)
+    new_codes = new.cat.codes.to_numpy()
+    changed = old_codes != new_codes
+
+    transitions = (
+        pd.DataFrame({
+            "before": old[changed].map(decision_label).to_numpy(dtype=object),
+            "after": new[changed].map(decision_label).to_numpy(dtype=object),
+        })
+        .value_counts()
+        .rename("articles")
+        .reset_index()
+    )
+    # Counted per category first, so only the dictionaries are relabelled
+    counts = pd.DataFrame({
+        "before": old.value_counts(sort=False).groupby(decision_label).sum(),
+        "after": new.value_counts(sort=False).groupby(decision_label).sum(),
+    }).fillna(0).astype(int)
+    return {
+        "rows": int(len(new)),
+        "changed": int(changed.sum()),
+        "changed_share": float(changed.mean()) if len(new) else 0.0,
+        "transitions": transitions,
+        "decision_counts": counts[(counts["before"] > 0) | (counts["after"] > 0)],
+        "changed_rows": np.flatnonzero(changed),
+    }
+
+def rescore(features: pd.DataFrame, table: DecisionRuleTable) -> Dict[str, Any]:
+    """
+    Re-score stored analyses under a rule table and diff against their decisions
+
+    Args:
+        features: corpus_features() output, or any frame with a decision
+            column and the columns DecisionRuleTable.features accepts; with
+            a route column, rows outside RESCORED_ROUTES keep their decision
+        table: Rules to apply
+
+    Returns:
+        diff_decisions() report plus the new decisions, the number of rows
+        kept for their route and timing
+    """
+    start = time.perf_counter()
+    new = table.evaluate(table.features(features))
+    old = features["decision"].astype("category")
+    kept = np.zeros(len(features), dtype=bool)
+    if "route" in features:
+        kept = ~features["route"].isin(RESCORED_ROUTES).to_numpy()
+        categories = new.cat.categories.union(old.cat.categories, sort=False)
+        new = pd.Series(
+            np.where(kept, old.astype(object), new.astype(object)),
+            index=new.index,
+            dtype=pd.CategoricalDtype(categories),
+        )
+    report = diff_decisions(old, new)
+    report["decisions"] = new
+    report["kept"] = int(kept.sum())
+    report["elapsed_seconds"] = time.perf_counter() - start
+    return report
+
+def synthetic_features(num_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Random stored analyses decided with the default rules, for timing re-scoring"""
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "sentiment": pd.Categorical.from_codes(rng.integers(0, 3, num_rows), ["positive", "negative", "neutral"]),
+        "impact_level": pd.Categorical.from_codes(rng.integers(0, 3, num_rows), ["high", "medium", "low"]),
+        "significant_risk": rng.random(num_rows) < 0.3,
+        "has_tickers": rng.random(num_rows) < 0.7,
+    })
+    frame["decision"] = DecisionRuleTable().evaluate(frame)
+    return frame
+
+def print_report(report: Dict[str, Any]):
+    print(f"Re-scored {report['rows']} analyses in {report['elapsed_seconds']:.2f}s: "
+          f"{report['changed']} decisions changed ({report['changed_share']:.1%})")
+    if report["kept"]:
+        print(f"{report['kept']} analyses on routes the rules do not decide kept their decision")
+    if report["changed"]:
+        print(report["transitions"].head(20).to_string(index=False))
+    print(report["decision_counts"].to_string())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-score stored analyses under new decision rules (no LLM calls)")
+    parser.add_argument("--rules", default=None,
+                        help="Rule table JSON to apply (default: the table in effect, see DECISION_RULES_PATH)")
+    parser.add_argument("--corpus-dir", default=None, help="Corpus store to re-score (default: DATA_DIR/corpus)")
+    parser.add_argument("--apply", action="store_true", help="Write the new decisions back to the corpus store")
+    parser.add_argument("--sample", type=int, default=20, help="Changed articles listed in the results file")
+    parser.add_argument("--synthetic", type=int, default=None, metavar="ROWS",
+                        help="Time re-scoring on random analyses instead, e.g. 1000000")
+    parser.add_argument("--export-default-rules", default=None, metavar="PATH",
+                        help="Write the built-in rule table as JSON (a starting point for edits) and exit")
+    parser.add_argument("--output-dir", default="evaluation/results")
+    args = parser.parse_args()
+
+    if args.export_default_rules:
+        DecisionRuleTable().to_file(args.export_default_rules)
+        print(f"Default rules written to: {args.export_default_rules}")
+        raise SystemExit(0)
+
+    table = DecisionRuleTable.from_file(args.rules) if args.rules else get_rules()
+    store: Optional[CorpusStore] = None
+    if args.synthetic:
+        features = synthetic_features(args.synthetic)
+    else:
+        store = CorpusStore(args.corpus_dir)
+        features = corpus_features(store, table)
+
+    report = rescore(features, table)
+    print_report(report)
+
+    sample = []
+    if store is not None and report["changed"]:
+        changed_rows = report["changed_rows"][:args.sample]
+        for row, record in zip(changed_rows, store.rows(changed_rows)):
+            sample.append({
+                "article_id": record["article_id"],
+                "headline": record["headline"],
+                "before": record["decision"],
+                "after": report["decisions"].iloc[int(row)],
+            })
+    if args.apply and store is not None:
+        decisions = report["decisions"]
+        updated = store.rewrite_labels("decision", decisions.cat.codes.to_numpy(), list(decisions.cat.categories))
+        print(f"Decisions updated in the corpus store: {updated}")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_file = os.path.join(args.output_dir, f"rescore_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output_file, "w") as f:
+        json.dump(
+            {
+                "rules": args.rules or "current",
+                "rows": report["rows"],
+                "changed": report["changed"],
+                "changed_share": report["changed_share"],
+                "kept": report["kept"],
+                "elapsed_seconds": report["elapsed_seconds"],
+                "applied": bool(args.apply and store is not None),
+                "transitions": report["transitions"].to_dict(orient="records"),
+                "decision_counts": json.loads(report["decision_counts"].to_json(orient="index")),
+                "sample": sample,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Results saved to: {output_file}")
@@ -2,12 +2,27 @@
 
 import streamlit as st
 import json
+import sys
+import time
+import uuid
 import pandas as pd
 from datetime import datetime
 from io import StringIO
-from core.graph import NewsAnalysisGraph, analyze_news_article
+from core.graph import get_route_stats, get_shared_graph, get_slo_stats
+from agents.aggregator_agent import build_topic_consensus
+from core.watcher import TopicWatcher
+from core.corpus_store import CorpusStore
+from core.job_queue import AnalysisJobQueue
+from core.scheduler import PRIORITY_CLASSES
+from core.ticker_stats import TickerSignalStats
 from utils.serper_client import fetch_financial_news
+from utils.article_fetcher import fetch_article_bodies
 from utils.id_generator import generate_user_id
+from utils.concurrency import circuit_breakers
+from utils.llm_client import client_pool, context_cache, llm_limiter
+from utils.metrics import metrics
+from utils.profiler import profiler
+from utils.usage import BudgetExceededError, usage_ledger
 from config import config
 
 # Validate configuration on startup
@@ -36,6 +51,35 @@ if 'current_articles' not in st.session_state:
     st.session_state.current_articles = []
 if 'selected_article_idx' not in st.session_state:
     st.session_state.selected_article_idx = 0
+if 'watcher_sequence' not in st.session_state:
+    st.session_state.watcher_sequence = 0
+if 'history_totals' not in st.session_state:
+    st.session_state.history_totals = {"total": 0, "positive": 0, "high_impact": 0, "confidence_sum": 0.0}
+if 'ticker_stats' not in st.session_state:
+    st.session_state.ticker_stats = TickerSignalStats()
+if 'recorded_jobs' not in st.session_state:
+    st.session_state.recorded_jobs = set()
+if 'session_id' not in st.session_state:
+    # Token usage and per-user budgets are tracked per browser session
+    st.session_state.session_id = uuid.uuid4().hex[:12]
+if 'prefetch_jobs' not in st.session_state:
+    st.session_state.prefetch_jobs = []
+    st.session_state.prefetch_pending = False
+
+@st.cache_resource
+def get_topic_watcher():
+    """Process-wide topic watcher shared by all sessions"""
+    return TopicWatcher()
+
+@st.cache_resource
+def get_analysis_queue():
+    """Process-wide analysis worker pool shared by all sessions"""
+    return AnalysisJobQueue(analysis_graph=get_shared_graph())
+
+@st.cache_resource
+def get_corpus_store():
+    """Process-wide reader of the columnar store of past analyses"""
+    return CorpusStore()
 
 def add_to_history(topic, news_data, analysis_result):
     """Add analysis result to session history"""
@@ -49,11 +93,107 @@ def add_to_history(topic, news_data, analysis_result):
         "full_result": analysis_result
     }
     st.session_state.analysis_history.append(history_entry)
+    update_history_totals(history_entry["analysis"], 1)
+    st.session_state.ticker_stats.update(history_entry["analysis"])
     
     # Keep only last 10 analyses to prevent memory issues
     if len(st.session_state.analysis_history) > 10:
+        for dropped in st.session_state.analysis_history[:-10]:
+            update_history_totals(dropped["analysis"], -1)
         st.session_state.analysis_history = st.session_state.analysis_history[-10:]
 
+def record_job(topic, news_data, job):
+    """Add a finished job's result to history once, however often the page reruns"""
+    key = (job.job_id, job.finished_at)
+    if key not in st.session_state.recorded_jobs:
+        st.session_state.recorded_jobs.add(key)
+        add_to_history(topic, news_data, job.result)
+
+def update_history_totals(analysis, sign):
+    """Incrementally add (sign=1) or remove (sign=-1) an analysis from the sidebar totals"""
+    totals = st.session_state.history_totals
+    totals["total"] += sign
+    totals["positive"] += sign * (analysis.get("sentiment") == "positive")
+    totals["high_impact"] += sign * (analysis.get("impact_level") == "high")
+    totals["confidence_sum"] += sign * analysis.get("confidence_score", 0)
+
+def reset_history():
+    """Clear history, totals and per-ticker statistics"""
+    st.session_state.analysis_history = []
+    st.session_state.selected_comparison = []
+    st.session_state.history_totals = {"total": 0, "positive": 0, "high_impact": 0, "confidence_sum": 0.0}
+    st.session_state.ticker_stats.reset()
+
+def sync_watcher_results():
+    """Add analyses completed by the topic watcher since the last rerun"""
+    watcher = get_topic_watcher()
+    if watcher.work_queue is not None:
+        # Pick up articles the worker processes finished since the last poll
+        watcher.collect_finished()
+    sequence, entries = watcher.results_since(st.session_state.watcher_sequence)
+    st.session_state.watcher_sequence = sequence
+    for entry in entries:
+        add_to_history(f"👀 {entry['topic']}", entry["news_data"], entry["result"])
+    return len(entries)
+
+def render_watcher_sidebar():
+    """Render controls for the background topic watcher"""
+    watcher = get_topic_watcher()
+    
+    with st.sidebar:
+        st.header("👀 Watched Topics")
+        
+        new_topics = st.text_input(
+            "Watch topics or tickers (comma-separated)",
+            key="watch_topics_input",
+            placeholder="e.g. TSLA, Apple earnings"
+        )
+        if st.button("➕ Watch", key="watch_add") and new_topics:
+            watcher.register([topic for topic in new_topics.split(",") if topic.strip()])
+            st.rerun()
+        
+        for topic in watcher.topics:
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                st.write(f"• {topic}")
+            with col2:
+                if st.button("✖", key=f"unwatch_{topic}"):
+                    watcher.unregister(topic)
+                    st.rerun()
+        
+        if watcher.topics:
+            col1, col2 = st.columns(2)
+            with col1:
+                if watcher.is_running:
+                    if st.button("⏸️ Pause", key="watch_pause"):
+                        watcher.stop()
+                        st.rerun()
+                elif st.button("▶️ Start", key="watch_start"):
+                    watcher.start()
+                    st.rerun()
+            with col2:
+                if st.button("🔄 Check now", key="watch_poll"):
+                    with st.spinner("Checking watched topics for new articles..."):
+                        watcher.poll_once()
+                    st.rerun()
+            
+            status = "running" if watcher.is_running else "paused"
+            st.caption(
+                f"Watcher {status}, every {watcher.interval_seconds}s · "
+                f"last check: {watcher.last_poll_at or 'never'} · "
+                f"{len(watcher.seen_store)} articles seen"
+            )
+            if watcher.work_queue is not None:
+                queue_stats = watcher.work_queue.stats()
+                st.caption(
+                    f"Work queue: {watcher.pending_count} awaiting results · "
+                    f"{queue_stats['queued']} queued · {queue_stats['leased']} in progress · "
+                    f"{queue_stats['dead']} dead-lettered"
+                )
+        
+        st.divider()
+
+@profiler.profiled("export_analysis")
 def export_analysis(analysis_data, format_type="json"):
     """Export analysis data in specified format"""
     if format_type == "json":
@@ -80,25 +220,23 @@ def render_history_sidebar():
         st.header("📈 Analysis History")
         
         if st.session_state.analysis_history:
-            # Summary stats
-            total_analyses = len(st.session_state.analysis_history)
-            positive_count = sum(1 for h in st.session_state.analysis_history 
-                               if h["analysis"].get("sentiment") == "positive")
-            high_impact_count = sum(1 for h in st.session_state.analysis_history 
-                                  if h["analysis"].get("impact_level") == "high")
+            # Summary stats (maintained incrementally by add_to_history)
+            totals = st.session_state.history_totals
+            total_analyses = totals["total"]
             
             col1, col2 = st.columns(2)
             with col1:
                 st.metric("Total", total_analyses)
-                st.metric("Positive", positive_count)
+                st.metric("Positive", totals["positive"])
             with col2:
-                st.metric("High Impact", high_impact_count)
-                avg_confidence = sum(h["analysis"].get("confidence_score", 0) 
-                                   for h in st.session_state.analysis_history) / total_analyses
+                st.metric("High Impact", totals["high_impact"])
+                avg_confidence = totals["confidence_sum"] / total_analyses if total_analyses else 0.0
                 st.metric("Avg Confidence", f"{avg_confidence:.2f}")
             
             st.divider()
             
+            render_ticker_signals()
+            
             # History entries
             st.subheader("Recent Analyses")
             for i, analysis in enumerate(reversed(st.session_state.analysis_history)):
@@ -179,12 +317,315 @@ def render_history_sidebar():
                 
                 with col2:
                     if st.button("🗑️ Clear History"):
-                        st.session_state.analysis_history = []
-                        st.session_state.selected_comparison = []
+                        reset_history()
                         st.rerun()
         else:
             st.info("No analyses yet. Start by entering a financial topic!")
 
+def render_ticker_signals():
+    """Render rolling per-ticker signals from the ticker statistics engine"""
+    ticker_stats = st.session_state.ticker_stats
+    tickers = ticker_stats.known_tickers()
+    if not tickers:
+        return
+    
+    st.subheader("🏷️ Ticker Signals")
+    ticker = st.selectbox("Ticker", tickers, key="ticker_signal_select")
+    stats = ticker_stats.get(ticker)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Decayed Sentiment", f"{stats['decayed_sentiment']:+.2f}")
+        st.metric("Mentions", stats["count"])
+    with col2:
+        st.metric("Impact-Weighted", f"{stats['impact_weighted_count']:.0f}")
+        st.metric("Avg Confidence", f"{stats['avg_confidence']:.2f}")
+    
+    impact_counts = stats["impact_counts"]
+    st.caption(
+        f"Impact: {impact_counts['high']} high · {impact_counts['medium']} medium · {impact_counts['low']} low"
+    )
+    if stats["risk_frequencies"]:
+        st.caption("Risks: " + ", ".join(
+            f"{risk} {freq:.0%}" for risk, freq in sorted(
+                stats["risk_frequencies"].items(), key=lambda item: -item[1]
+            )
+        ))
+    
+    st.divider()
+
+def render_corpus_search():
+    """Filter all stored analyses by ticker, publish date and sentiment"""
+    if not config.CORPUS_ENABLED:
+        return
+    corpus = get_corpus_store()
+    
+    with st.sidebar:
+        with st.expander(f"🗄️ Analysis Corpus ({len(corpus)} articles)"):
+            ticker = st.text_input("Ticker", key="corpus_ticker", placeholder="e.g. NVDA").strip()
+            days = st.slider("Published within (days)", 1, 365, 30, key="corpus_days")
+            sentiment = st.selectbox("Sentiment", ["any", "positive", "negative", "neutral"], key="corpus_sentiment")
+            
+            start = time.perf_counter()
+            rows = corpus.query(
+                ticker=ticker or None,
+                since=time.time() - days * 86400,
+                sentiment=None if sentiment == "any" else sentiment,
+            )
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            st.caption(f"{len(rows)} matching analyses ({elapsed_ms:.1f} ms)")
+            
+            if len(rows):
+                counts = corpus.value_counts("sentiment", rows)
+                st.caption(" · ".join(f"{label}: {count}" for label, count in counts.items()))
+                # Newest rows only; the rest stay on disk
+                latest = corpus.rows(rows[-10:][::-1])
+                st.dataframe(
+                    pd.DataFrame([
+                        {
+                            "Published": datetime.fromtimestamp(row["published_ts"]).strftime("%Y-%m-%d %H:%M")
+                            if row["published_ts"] else "",
+                            "Headline": row["headline"][:60],
+                            "Sentiment": row["sentiment"],
+                            "Impact": row["impact_level"],
+                            "Tickers": ", ".join(row["tickers"]),
+                        }
+                        for row in latest
+                    ]),
+                    hide_index=True,
+                )
+
+def render_pipeline_metrics():
+    """Render process-wide pipeline metrics in the sidebar"""
+    with st.sidebar:
+        with st.expander("⚙️ Pipeline Metrics"):
+            route_stats = get_route_stats()
+            st.metric("LLM Calls Saved by Routing", route_stats["llm_calls_saved"])
+            st.dataframe(
+                pd.DataFrame(
+                    [{"Route": route, "Articles": count} for route, count in route_stats["routes"].items()]
+                ),
+                hide_index=True,
+                use_container_width=True
+            )
+            
+            st.divider()
+            slo_stats = get_slo_stats()
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Degraded Rate", f"{slo_stats['degraded_rate']:.1%}")
+                st.metric("Deadline Misses", slo_stats["deadline_misses"])
+            with col2:
+                p99 = slo_stats["p99_latency"]
+                st.metric("p99 Latency", f"{p99:.1f}s" if p99 is not None else "—")
+                st.metric("Deadline", f"{slo_stats['deadline_seconds']:.0f}s")
+            
+            st.divider()
+            limiter_stats = llm_limiter.stats()
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("LLM Concurrency Limit", limiter_stats["limit"])
+            with col2:
+                st.metric("In Flight", limiter_stats["in_flight"])
+            if limiter_stats["changes"]:
+                st.caption("Recent limit changes")
+                st.dataframe(
+                    pd.DataFrame([
+                        {
+                            "Time": datetime.fromtimestamp(change["time"]).strftime("%H:%M:%S"),
+                            "Limit": f"{change['old']} → {change['new']}",
+                            "Reason": change["reason"],
+                        }
+                        for change in reversed(limiter_stats["changes"])
+                    ]),
+                    hide_index=True,
+                    use_container_width=True
+                )
+            
+            breaker_stats = circuit_breakers.stats()
+            if breaker_stats:
+                st.caption("Circuit breakers (rolling window)")
+                st.dataframe(
+                    pd.DataFrame([
+                        {
+                            "Upstream": name,
+                            "State": stats["state"].replace("_", "-"),
+                            "Calls": stats["calls"],
+                            "Failures": f"{stats['failure_rate']:.0%}",
+                            "Slow": f"{stats['slow_rate']:.0%}",
+                        }
+                        for name, stats in breaker_stats.items()
+                    ]),
+                    hide_index=True,
+                    use_container_width=True
+                )
+                transitions = sorted(
+                    (event for stats in breaker_stats.values() for event in stats["transitions"]),
+                    key=lambda event: event["time"],
+                )
+                if transitions:
+                    st.caption("Recent breaker transitions")
+                    st.dataframe(
+                        pd.DataFrame([
+                            {
+                                "Time": datetime.fromtimestamp(event["time"]).strftime("%H:%M:%S"),
+                                "Upstream": event["breaker"],
+                                "State": f"{event['old']} → {event['new']}",
+                                "Reason": event["reason"],
+                            }
+                            for event in reversed(transitions[-10:])
+                        ]),
+                        hide_index=True,
+                        use_container_width=True
+                    )
+            
+            if config.LLM_HEDGING_ENABLED:
+                hedges_fired = sum(metrics.counters("llm_hedges_fired").values())
+                hedges_won = sum(metrics.counters("llm_hedges_won").values())
+                st.caption(f"Hedged calls: {hedges_fired:.0f} fired, {hedges_won:.0f} won by the duplicate")
+            
+            model_latencies = client_pool.stats()
+            if model_latencies:
+                st.caption("Recent p95 latency per model"
+                           + (" (tiering on)" if config.MODEL_TIERING_ENABLED else ""))
+                st.dataframe(
+                    pd.DataFrame([
+                        {"Model": model, "p95": f"{p95:.1f}s" if p95 is not None else "—"}
+                        for model, p95 in model_latencies.items()
+                    ]),
+                    hide_index=True,
+                    use_container_width=True
+                )
+            
+            st.divider()
+            job_stats = get_analysis_queue().stats()
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Jobs Queued", job_stats["queued"])
+                st.metric("Jobs Shared", int(job_stats["deduplicated"]))
+                st.metric("Prefetch Hits", int(sum(metrics.counters("prefetch_hits").values())))
+            with col2:
+                st.metric("Jobs Running", f"{job_stats['running']}/{job_stats['workers']}")
+                p95_wait = job_stats["p95_wait"]
+                st.metric("p95 Queue Wait", f"{p95_wait:.1f}s" if p95_wait is not None else "—")
+                st.metric("Prefetches Cancelled", int(metrics.counter("jobs_cancelled")))
+            st.dataframe(
+                pd.DataFrame([
+                    {
+                        "Priority": name.title(),
+                        "Queued": class_stats["queued"],
+                        "Submitted": int(class_stats["submitted"]),
+                        "p95 Wait": f"{class_stats['p95_wait']:.1f}s" if class_stats["p95_wait"] is not None else "—",
+                    }
+                    for name, class_stats in job_stats["by_priority"].items()
+                ]),
+                hide_index=True,
+                use_container_width=True
+            )
+            
+            st.divider()
+            usage = usage_ledger.summary()
+            total_cost = sum(entry["cost_usd"] for entry in usage["totals"]["model"].values())
+            session_usage = usage["totals"]["user"].get(st.session_state.session_id, {})
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Tokens (last minute)", f"{usage['usage']['per_minute']:.0f}")
+                st.metric("Tokens (this session)",
+                          f"{session_usage.get('prompt_tokens', 0) + session_usage.get('output_tokens', 0):.0f}")
+            with col2:
+                st.metric("Tokens (last day)", f"{usage['usage']['per_day']:.0f}")
+                st.metric("LLM Cost", f"${total_cost:.5f}")
+            cached_contexts = context_cache.stats()
+            if cached_contexts:
+                cached_tokens = sum(value for key, value in metrics.counters("llm_tokens").items() if "kind=cached" in key)
+                saved = sum(metrics.counters("llm_cache_savings_usd").values())
+                storage = sum(metrics.counters("context_cache_storage_usd").values())
+                st.caption(f"Context cache: {len(cached_contexts)} cached instruction contexts, "
+                           f"{cached_tokens:.0f} prompt tokens served from cache, "
+                           f"${saved:.5f} saved (${storage:.5f} storage)")
+            budget_status = usage_ledger.status(st.session_state.session_id)
+            if budget_status == "cheap":
+                st.warning("Token budget nearly used up - cheaper models, no risk extraction, no prefetching")
+            elif budget_status == "exhausted":
+                st.error("Token budget used up - new analyses are refused")
+            if usage["totals"]["agent"]:
+                st.dataframe(
+                    pd.DataFrame([
+                        {
+                            "Agent": agent,
+                            "Calls": int(entry["calls"]),
+                            "Prompt": int(entry["prompt_tokens"]),
+                            "Output": int(entry["output_tokens"]),
+                            "Cost $": f"{entry['cost_usd']:.4f}",
+                        }
+                        for agent, entry in usage["totals"]["agent"].items()
+                    ]),
+                    hide_index=True,
+                    use_container_width=True
+                )
+            st.download_button(
+                "📈 Export Metrics (JSON)",
+                data=json.dumps({"metrics": metrics.snapshot(), "usage": usage}, indent=2, default=str),
+                file_name=f"fnna_metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                mime="application/json",
+                use_container_width=True
+            )
+            
+            if profiler.enabled:
+                st.divider()
+                st.caption("Profile (CPU vs wait per span)")
+                profile_rows = profiler.span_table()
+                if profile_rows:
+                    st.dataframe(
+                        pd.DataFrame([
+                            {
+                                "Span": row["span"],
+                                "Calls": row["calls"],
+                                "Mean ms": f"{row['mean_wall_ms']:.0f}",
+                                "CPU %": f"{row['cpu_share']:.0%}",
+                            }
+                            for row in profile_rows
+                        ]),
+                        hide_index=True,
+                        use_container_width=True
+                    )
+                if st.button("Write Profile Report", use_container_width=True):
+                    paths = profiler.write_report()
+                    st.success(f"Profile written to {', '.join(paths.values())}")
+
+def render_degraded_banner():
+    """Warn when an upstream's circuit breaker is open or probing, and what the pipeline does instead"""
+    for name, stats in circuit_breakers.degraded().items():
+        if stats["state"] == "open":
+            status = f"unavailable (next trial in {stats['half_open_in']:.0f}s)"
+        else:
+            status = "recovering (trial calls in progress)"
+        if name == "serper":
+            effect = "news search is paused; new topics cannot be fetched"
+        else:
+            effect = (f"analyses fall back to {config.CIRCUIT_FALLBACK_MODEL} where it is healthy, "
+                      "otherwise to local estimates")
+        st.warning(f"⚡ {name} is {status} - {effect}. "
+                   f"Failure rate {stats['failure_rate']:.0%}, slow calls {stats['slow_rate']:.0%}.")
+
+# Why an agent fell back to a local estimate (NewsState.degraded_reasons)
+DEGRADATION_REASONS = {
+    "deadline": "⏱️ Latency budget exhausted",
+    "circuit_open": "⚡ Gemini unavailable (circuit breaker open)",
+    "llm_error": "⚠️ Gemini call failed",
+}
+
+def degradation_message(analysis):
+    """Which agents used fast local estimates, grouped by why they fell back"""
+    reasons = analysis.get("degraded_reasons", {})
+    by_reason = {}
+    for agent in analysis.get("degraded_agents", []):
+        by_reason.setdefault(reasons.get(agent, "deadline"), []).append(agent)
+    return "\n\n".join(
+        f"{DEGRADATION_REASONS.get(reason, reason)} - fast local estimates were used for: {', '.join(agents)}"
+        for reason, agents in by_reason.items()
+    )
+
 def render_comparison_view():
     """Render comparison view for selected analyses"""
     if st.session_state.selected_comparison:
@@ -230,12 +671,23 @@ def render_comparison_view():
             st.session_state.selected_comparison = []
             st.rerun()
 
+# Profiling can be switched on with `streamlit run main.py -- --profile`
+if "--profile" in sys.argv:
+    profiler.enable()
+
 # Main content
 st.title(config.APP_TITLE)
 st.markdown(f"*{config.APP_DESCRIPTION}*")
 
-# Render sidebar
+# Pick up analyses from the topic watcher, then render sidebar
+new_watch_results = sync_watcher_results()
+if new_watch_results:
+    st.toast(f"👀 {new_watch_results} new watched article(s) analyzed")
+render_watcher_sidebar()
 render_history_sidebar()
+render_corpus_search()
+render_pipeline_metrics()
+render_degraded_banner()
 
 # Main content area
 if st.session_state.selected_comparison:
@@ -246,6 +698,112 @@ if st.session_state.selected_comparison:
 # Analysis section
 st.header("🔍 New Analysis")
 
+def build_news_data(article):
+    """Pipeline input for a fetched article"""
+    return {
+        "article_id": generate_user_id(article["headline"]),
+        "headline": article["headline"],
+        "content": article["content"],
+        "published_at": article["published_at"]
+    }
+
+def cancel_prefetch():
+    """Drop this session's prefetches that have not started yet"""
+    job_queue = get_analysis_queue()
+    for job_id in st.session_state.prefetch_jobs:
+        job_queue.cancel(job_id)
+    st.session_state.prefetch_jobs = []
+
+def prefetch_articles(articles):
+    """Analyze articles the user has not opened yet in the background, at low priority"""
+    # Speculative work is the first thing to go when tokens run short
+    if usage_ledger.status(st.session_state.session_id) != "ok":
+        return
+    job_queue = get_analysis_queue()
+    for article in articles[:config.PREFETCH_MAX_ARTICLES]:
+        job = job_queue.submit(
+            build_news_data(article),
+            topic=st.session_state.current_topic,
+            priority=PRIORITY_CLASSES.index("low"),
+            speculative=True,
+            user=st.session_state.session_id,
+        )
+        st.session_state.prefetch_jobs.append(job.job_id)
+
+def render_topic_consensus(consensus, finished, total):
+    """Render the topic-level consensus of the analyzed articles"""
+    st.subheader("🧩 Topic Consensus")
+    if finished < total:
+        st.caption(f"Partial consensus from {finished} of {total} articles - updating as analyses complete")
+    if consensus["filtered_articles"]:
+        st.caption(f"🚫 {consensus['filtered_articles']} article(s) filtered as not financial news")
+    if not consensus["articles"]:
+        st.info("No financially relevant articles analyzed yet")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("📊 Consensus Sentiment", consensus["sentiment"].title())
+        st.metric("🤝 Agreement", f"{consensus['agreement']:.0%}")
+    with col2:
+        st.metric("📈 Market Impact", consensus["impact_level"].title())
+        st.metric("🎯 Confidence", f"{consensus['confidence_score']:.2f}")
+    with col3:
+        risks = consensus["risks"]
+        st.metric("⚠️ Risks", ", ".join(risks) if risks != ["none"] else "None identified")
+        st.metric("🏷️ Tickers", ", ".join(consensus["tickers"]) if consensus["tickers"] else "None identified")
+
+    st.bar_chart(pd.Series(consensus["sentiment_distribution"], name="Articles"))
+    st.info(f"📊 **Topic Signal**: {consensus['decision']}")
+    if consensus["degraded_articles"]:
+        st.caption(f"⏱️ {consensus['degraded_articles']} article(s) used fast local estimates")
+
+def render_topic_analysis(articles):
+    """Analyze every fetched article concurrently and show results as they complete"""
+    topic = st.session_state.current_topic
+    news_items = [build_news_data(article) for article in articles]
+    # All articles go to the shared worker pool at once, so the topic takes
+    # about as long as its slowest article rather than the sum of all
+    try:
+        jobs = [
+            get_analysis_queue().submit(news_data, topic=topic, user=st.session_state.session_id)
+            for news_data in news_items
+        ]
+    except BudgetExceededError as e:
+        st.error(f"🪙 {str(e)}")
+        return
+
+    pending = [job for job in jobs if not job.finished]
+    done = len(jobs) - len(pending)
+    st.progress(done / len(jobs), text=f"{done}/{len(jobs)} articles analyzed")
+
+    analyses = [job.result.get("final_analysis") for job in jobs if job.status == "done"]
+    analyses = [analysis for analysis in analyses if analysis]
+    if analyses:
+        render_topic_consensus(build_topic_consensus(analyses), len(analyses), len(jobs))
+
+    st.subheader("📰 Per-Article Results")
+    for news_data, job in zip(news_items, jobs):
+        with st.container(border=True):
+            st.markdown(f"**{news_data['headline']}**")
+            if not job.finished:
+                stage = job.completed_nodes[-1] if job.completed_nodes else "waiting for a worker"
+                st.caption(f"⏳ {job.status.title()} ({job.priority_class} priority) - {stage}")
+            elif job.status == "failed":
+                st.error(f"Analysis failed: {job.error}")
+            else:
+                record_job(topic, news_data, job)
+                analysis = job.result.get("final_analysis") or {}
+                col1, col2, col3 = st.columns([1, 1, 3])
+                col1.markdown(f"📊 {analysis.get('sentiment', 'unknown').title()}")
+                col2.markdown(f"📈 {analysis.get('impact_level', 'unknown').title()}")
+                col3.markdown(f"💡 {analysis.get('decision', '')}")
+
+    if pending:
+        # Poll until every article is done, re-rendering as each completes
+        pending[0].wait(timeout=0.5)
+        st.rerun()
+
 def main():
     """Main Streamlit application"""
     
@@ -254,8 +812,11 @@ def main():
     
     # Handle new topic input
     if topic:
+        # Prefetches for the previous topic are no longer useful
+        cancel_prefetch()
         st.session_state.current_topic = topic
         st.session_state.selected_article_idx = 0
+        st.session_state.prefetch_pending = True
         
         st.info(f"🔍 Searching for financial news about: **{topic}**")
         
@@ -263,11 +824,19 @@ def main():
         with st.spinner("🛰️ Fetching latest news from Google..."):
             try:
                 articles = fetch_financial_news(topic, num_results=5)
-                st.session_state.current_articles = articles
             except Exception as e:
                 st.error(f"Error fetching news: {str(e)}")
                 return
+        
+        if articles and config.FETCH_FULL_TEXT:
+            with st.spinner("📄 Downloading full article text..."):
+                articles = fetch_article_bodies(articles)
+        st.session_state.current_articles = articles
 
+        if not articles and circuit_breakers.is_open("serper"):
+            st.error("⚡ News search is temporarily unavailable after repeated failures. Please try again shortly.")
+            st.session_state.current_articles = []
+            return
         if not articles:
             st.error("❌ No relevant news found. Please try another topic or check your API configuration.")
             st.session_state.current_articles = []
@@ -279,6 +848,10 @@ def main():
         
         st.subheader(f"📰 Articles for: {st.session_state.current_topic}")
         
+        if len(articles) > 1 and st.toggle("🧩 Topic mode: analyze all articles and build a consensus", key="topic_mode"):
+            render_topic_analysis(articles)
+            return
+        
         # Article selection
         if len(articles) > 1:
             # Use a key to ensure the selectbox updates properly
@@ -303,39 +876,64 @@ def main():
         
         with st.container():
             st.markdown(f"**📰 Headline**: {selected_article['headline']}")
-            st.markdown(f"**📄 Content**: {selected_article['content']}")
+            if selected_article.get("content_source") == "full_text":
+                st.markdown(f"**📄 Content**: {selected_article['snippet']}")
+                with st.expander(f"📖 Full article text ({len(selected_article['content'])} characters)"):
+                    st.write(selected_article["content"])
+            else:
+                st.markdown(f"**📄 Content**: {selected_article['content']}")
             st.markdown(f"**📅 Published**: {selected_article['published_at']}")
             if selected_article.get('source'):
                 st.markdown(f"**📰 Source**: {selected_article['source']}")
 
-        # Generate article ID
-        article_id = generate_user_id(selected_article['headline'])
-        st.caption(f"🆔 Article ID: `{article_id}`")
-
         # Prepare news data for analysis
-        news_data = {
-            "article_id": article_id,
-            "headline": selected_article["headline"],
-            "content": selected_article["content"],
-            "published_at": selected_article["published_at"]
-        }
+        news_data = build_news_data(selected_article)
+        st.caption(f"🆔 Article ID: `{news_data['article_id']}`")
 
-        # Run analysis
+        # Run analysis on the shared worker pool
         st.subheader("🧠 AI Analysis")
         
-        with st.spinner("🤖 Analyzing news through AI agent pipeline..."):
-            try:
-                result = analyze_news_article(news_data)
-            except Exception as e:
-                st.error(f"Error during analysis: {str(e)}")
-                return
+        try:
+            job = get_analysis_queue().submit(
+                news_data, topic=st.session_state.current_topic, user=st.session_state.session_id
+            )
+        except BudgetExceededError as e:
+            st.error(f"🪙 {str(e)}")
+            return
+        if st.session_state.prefetch_pending:
+            # Speculatively analyze the other articles so switching to them is instant
+            st.session_state.prefetch_pending = False
+            prefetch_articles([article for article in articles if article is not selected_article])
+        if not job.finished:
+            stage = job.completed_nodes[-1] if job.completed_nodes else None
+            if job.status == "queued":
+                st.info(f"⏳ Waiting for a free analysis worker... (priority: {job.priority_class})")
+            else:
+                st.info(f"🤖 Analyzing news through AI agent pipeline... (last step: {stage or 'starting'})")
+            st.progress(min(len(job.completed_nodes), 5) / 5)
+            # Poll without holding the script thread on the LLM calls
+            job.wait(timeout=0.5)
+            st.rerun()
+        
+        if job.status == "failed":
+            st.error(f"Error during analysis: {job.error}")
+            return
+        result = job.result
 
         # Display results
         if "final_analysis" in result and result["final_analysis"]:
             analysis = result["final_analysis"]
             
-            # Add to history
-            add_to_history(st.session_state.current_topic, news_data, result)
+            # Add to history once per finished job, not on every rerun
+            record_job(st.session_state.current_topic, news_data, job)
+            
+            if analysis.get("route") == "not_relevant":
+                st.info(
+                    f"🚫 This does not look like financial news (relevance {analysis.get('relevance', 0):.2f}), "
+                    "so it was not sent to the LLM agents"
+                )
+            if analysis.get("analysis_quality") == "degraded":
+                st.warning(degradation_message(analysis))
             
             # Create columns for better layout
             col1, col2, col3 = st.columns(3)
@@ -0,0 +1,137 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils import article_fetcher
+from utils.article_fetcher import ArticleFetcher
+
+BODY = " ".join(["Shares of the company rose after it reported record quarterly revenue."] * 6)
+
+PAGE = f"""<html><head><title>Earnings</title><script>var tracking = "{'x' * 100}";</script></head>
+<body><nav><p>Markets | Economy | Technology | Opinion | Subscribe now</p></nav>
+<article><h1>Earnings beat</h1><p>{BODY}</p><p>{BODY}</p></article>
+<footer><p>Copyright 2024 Example News. All rights reserved worldwide.</p></footer></body></html>"""
+
+ETAG = '"v1"'
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Pages the tests fetch; records the request headers of every hit"""
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        if self.path in ("/article", "/broken"):
+            if self.headers.get("If-None-Match") == ETAG:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self._send(200, "text/html; charset=utf-8", PAGE.encode(), {"ETag": ETAG})
+        elif self.path == "/plain":
+            self._send(200, "text/plain", BODY.encode())
+        else:
+            self._send(404, "text/html", b"<p>Not found</p>")
+
+    def _send(self, status, content_type, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture
+def fetcher(tmp_path):
+    return ArticleFetcher(cache_dir=str(tmp_path / "page_cache"), timeout=5)
+
+def url(server, path):
+    return f"http://127.0.0.1:{server.server_port}{path}"
+
+def article(link, snippet="Shares rose on record revenue."):
+    return {"title": "Earnings beat", "link": link, "content": snippet}
+
+def test_extracts_article_text(server, fetcher):
+    text = fetcher.fetch_text(url(server, "/article"))
+
+    assert text.startswith("Shares of the company rose")
+    assert "Subscribe" not in text
+    assert "Copyright" not in text
+    assert "tracking" not in text
+
+def test_revalidates_cached_page_with_etag(server, fetcher):
+    first = fetcher.fetch_text(url(server, "/article"))
+    second = fetcher.fetch_text(url(server, "/article"))
+
+    assert second == first
+    assert server.requests[1][1].get("If-None-Match") == ETAG
+
+def test_text_capped_at_max_chars(server, tmp_path):
+    fetcher = ArticleFetcher(cache_dir=str(tmp_path / "page_cache"), max_chars=100)
+
+    assert len(fetcher.fetch_text(url(server, "/article"))) == 100
+
+def test_enrich_replaces_snippet_with_full_text(server, fetcher):
+    [enriched] = fetcher.enrich([article(url(server, "/article"))])
+
+    assert enriched["content_source"] == "full_text"
+    assert enriched["snippet"] == "Shares rose on record revenue."
+    assert len(enriched["content"]) > len(enriched["snippet"])
+
+@pytest.mark.parametrize("path", ["/missing", "/plain"])
+def test_enrich_keeps_snippet_for_unusable_pages(server, fetcher, path):
+    [enriched] = fetcher.enrich([article(url(server, path))])
+
+    assert enriched["content_source"] == "snippet"
+    assert enriched["content"] == "Shares rose on record revenue."
+
+def test_enrich_keeps_snippet_when_server_unreachable(fetcher):
+    [enriched] = fetcher.enrich([article("http://127.0.0.1:9/article")])
+
+    assert enriched["content_source"] == "snippet"
+
+def test_parser_error_falls_back_to_snippet_per_article(server, fetcher, monkeypatch):
+    extract = fetcher._extract
+
+    def extract_or_fail(response):
+        if response.url.endswith("/broken"):
+            raise ValueError("unparseable page")
+        return extract(response)
+
+    monkeypatch.setattr(fetcher, "_extract", extract_or_fail)
+    good, broken = fetcher.enrich([article(url(server, "/article")), article(url(server, "/broken"))])
+
+    assert good["content_source"] == "full_text"
+    assert broken["content_source"] == "snippet"
+    assert broken["content"] == "Shares rose on record revenue."
+
+def test_cache_write_failure_still_uses_full_text(server, fetcher, monkeypatch):
+    def full_disk(url, entry):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(fetcher.cache, "put", full_disk)
+    [enriched] = fetcher.enrich([article(url(server, "/article"))])
+
+    assert enriched["content_source"] == "full_text"
+
+def test_fetch_article_bodies_keeps_snippets_without_cache_dir(monkeypatch):
+    def unusable_cache_dir():
+        raise PermissionError(13, "Permission denied")
+
+    monkeypatch.setattr(article_fetcher, "_get_fetcher", unusable_cache_dir)
+    [enriched] = article_fetcher.fetch_article_bodies([article("http://127.0.0.1:9/article")])
+
+    assert enriched["content_source"] == "snippet"
+    assert enriched["content"] == "Shares rose on record revenue."
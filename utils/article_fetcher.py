@@ -0,0 +1,303 @@
+import codecs
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import config
+from utils.metrics import metrics
+from utils.profiler import profiler
+
+# Elements whose text is never article body
+SKIP_TAGS = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg", "iframe", "button"}
+BODY_TAGS = {"article", "main"}
+MIN_PARAGRAPH_CHARS = 25
+
+class ArticleTextExtractor(HTMLParser):
+    """
+    Streaming main-text extractor
+
+    Collects <p> text, preferring paragraphs inside <article>/<main>, and can
+    be fed the page chunk by chunk as it downloads. Once enough text has been
+    collected, `done` is set so the caller can stop reading the response.
+    """
+
+    def __init__(self, max_chars: int):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.body_paragraphs: List[str] = []
+        self.other_paragraphs: List[str] = []
+        self.body_chars = 0
+        self._skip_depth = 0
+        self._body_depth = 0
+        self._in_paragraph = False
+        self._buffer: List[str] = []
+
+    @property
+    def done(self) -> bool:
+        return self.body_chars >= self.max_chars
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in BODY_TAGS:
+            self._body_depth += 1
+        elif tag == "p" and not self._skip_depth:
+            self._flush()
+            self._in_paragraph = True
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in BODY_TAGS:
+            self._flush()
+            self._body_depth = max(0, self._body_depth - 1)
+        elif tag == "p":
+            self._flush()
+
+    def handle_data(self, data):
+        if self._in_paragraph and not self._skip_depth:
+            self._buffer.append(data)
+
+    def _flush(self):
+        if self._in_paragraph:
+            text = " ".join("".join(self._buffer).split())
+            if len(text) >= MIN_PARAGRAPH_CHARS:
+                if self._body_depth:
+                    self.body_paragraphs.append(text)
+                    self.body_chars += len(text)
+                else:
+                    self.other_paragraphs.append(text)
+        self._in_paragraph = False
+        self._buffer = []
+
+    def text(self) -> str:
+        self._flush()
+        # Fall back to all paragraphs for pages without <article>/<main>
+        paragraphs = self.body_paragraphs if self.body_chars >= 200 else self.body_paragraphs + self.other_paragraphs
+        return "\n\n".join(paragraphs)[:self.max_chars]
+
+class PageCache:
+    """On-disk cache of extracted article text keyed by URL"""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(url), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url: str, entry: Dict[str, Any]):
+        path = self._path(url)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+class ArticleFetcher:
+    """
+    Concurrent full-article downloader
+
+    Uses one pooled HTTP session, caps connections per host, bounds each page
+    by a timeout and a byte limit, and revalidates cached pages with
+    ETag/Last-Modified so unchanged pages are not downloaded again.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        per_host_limit: Optional[int] = None,
+        timeout: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        max_chars: Optional[int] = None,
+    ):
+        self.max_workers = max_workers or config.FETCH_MAX_WORKERS
+        self.per_host_limit = per_host_limit or config.FETCH_PER_HOST_CONNECTIONS
+        self.timeout = timeout or config.FETCH_TIMEOUT_SECONDS
+        self.max_bytes = max_bytes or config.FETCH_MAX_BYTES
+        self.max_chars = max_chars or config.MAX_ARTICLE_CHARS
+        self.cache = PageCache(cache_dir or os.path.join(config.DATA_DIR, "page_cache"))
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = "Mozilla/5.0 (compatible; FinancialNewsAnalysisAgent/1.0)"
+
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_lock = threading.Lock()
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc
+        with self._host_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return slot
+
+    @profiler.profiled("article_fetch", kind="client")
+    def fetch_text(self, url: str) -> Optional[str]:
+        """
+        Download and extract the main text of one page
+
+        Args:
+            url: Article URL
+
+        Returns:
+            Extracted text, or None if the page could not be fetched or parsed
+        """
+        cached = self.cache.get(url)
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        start = time.perf_counter()
+        try:
+            with self._host_slot(url):
+                with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                    if response.status_code == 304 and cached:
+                        metrics.increment("article_fetch", result="not_modified")
+                        return cached["text"]
+                    response.raise_for_status()
+
+                    content_type = response.headers.get("Content-Type", "")
+                    if "html" not in content_type:
+                        metrics.increment("article_fetch", result="not_html")
+                        return None
+
+                    text = self._extract(response)
+                    etag = response.headers.get("ETag")
+                    last_modified = response.headers.get("Last-Modified")
+        except requests.exceptions.RequestException as e:
+            metrics.increment("article_fetch", result="error")
+            print(f"Error fetching article {url}: {str(e)}")
+            # A stale cached copy is better than the snippet
+            return cached["text"] if cached else None
+        finally:
+            metrics.observe("article_fetch_seconds", time.perf_counter() - start)
+
+        if not text:
+            metrics.increment("article_fetch", result="no_text")
+            return None
+
+        try:
+            self.cache.put(url, {
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "text": text,
+                "fetched_at": time.time(),
+            })
+        except OSError as e:
+            # The page was fetched; failing to cache it only costs a re-download
+            print(f"Error caching article {url}: {str(e)}")
+        metrics.increment("article_fetch", result="downloaded")
+        return text
+
+    def _extract(self, response: requests.Response) -> str:
+        """Feed the response into the extractor chunk by chunk, within the size cap"""
+        extractor = ArticleTextExtractor(self.max_chars)
+        # requests assumes ISO-8859-1 when no charset is declared; HTML is almost always UTF-8
+        declared = "charset" in response.headers.get("Content-Type", "").lower()
+        encoding = response.encoding if declared and response.encoding else "utf-8"
+        try:
+            decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        received = 0
+        # The request timeout bounds each read; this bounds slow-drip bodies
+        deadline = time.monotonic() + self.timeout
+        for chunk in response.iter_content(chunk_size=16384):
+            received += len(chunk)
+            extractor.feed(decoder.decode(chunk))
+            # Stop downloading once we have enough text or hit the size/time cap
+            if extractor.done or received >= self.max_bytes or time.monotonic() > deadline:
+                break
+        extractor.feed(decoder.decode(b"", final=True))
+        return extractor.text()
+
+    def enrich(self, articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Replace search snippets with full article text where possible
+
+        Args:
+            articles: Parsed articles from SerperClient (with "link" and "content")
+
+        Returns:
+            New article dicts; "content" holds the full text when it was fetched
+            (keeping the original in "snippet"), otherwise the snippet is kept
+        """
+        def enrich_one(article: Dict[str, Any]) -> Dict[str, Any]:
+            enriched = dict(article)
+            enriched["snippet"] = article.get("content", "")
+            enriched["content_source"] = "snippet"
+
+            link = article.get("link")
+            if link:
+                try:
+                    text = self.fetch_text(link)
+                except Exception as e:
+                    # One bad page (parser error, unreadable cache entry) must not fail the others
+                    metrics.increment("article_fetch", result="error")
+                    print(f"Error extracting article {link}: {str(e)}")
+                    text = None
+                # Only use the page if it says more than the snippet did
+                if text and len(text) > len(enriched["snippet"]):
+                    enriched["content"] = text
+                    enriched["content_source"] = "full_text"
+            return enriched
+
+        if not articles:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(articles))) as executor:
+            return list(executor.map(enrich_one, articles))
+
+# Global fetcher instance - lazy initialization
+_fetcher: Optional[ArticleFetcher] = None
+_fetcher_lock = threading.Lock()
+
+def _get_fetcher() -> ArticleFetcher:
+    """Get or create the shared fetcher instance"""
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = ArticleFetcher()
+        return _fetcher
+
+def fetch_article_bodies(articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Fetch full text for articles, falling back to their snippets
+
+    Args:
+        articles: Parsed articles from fetch_financial_news
+
+    Returns:
+        Articles with full-text content where available
+    """
+    try:
+        fetcher = _get_fetcher()
+    except OSError as e:
+        # Page cache directory unusable: analyze the snippets
+        print(f"Error starting article fetcher: {str(e)}")
+        return [{**article, "snippet": article.get("content", ""), "content_source": "snippet"}
+                for article in articles]
+    return fetcher.enrich(articles)
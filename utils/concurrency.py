@@ -0,0 +1,418 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from config import config
+from utils.metrics import metrics
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limit on the number of in-flight requests to an upstream
+
+    The limit grows additively (about +1 per round of successful calls) while
+    latency stays under target, and is cut multiplicatively on throttling,
+    latency spikes or a high rolling error rate. Every change is recorded as a
+    metrics event together with its reason.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        initial_limit: int = 4,
+        latency_target: float = 5.0,
+        decrease_factor: float = 0.5,
+        error_rate_threshold: float = 0.2,
+        window: int = 20,
+    ):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.error_rate_threshold = error_rate_threshold
+
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._outcomes: deque = deque(maxlen=window)
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        self._publish()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _publish(self):
+        metrics.set_gauge("concurrency_limit", self.limit, limiter=self.name)
+        metrics.set_gauge("concurrency_in_flight", self._in_flight, limiter=self.name)
+
+    def _set_limit(self, new_limit: float, reason: str):
+        new_limit = min(max(new_limit, float(self.min_limit)), float(self.max_limit))
+        old = self.limit
+        self._limit = new_limit
+        if self.limit != old:
+            metrics.increment("concurrency_limit_changes", limiter=self.name, reason=reason)
+            metrics.record_event(
+                "concurrency_limit_change", limiter=self.name, old=old, new=self.limit, reason=reason
+            )
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Wait for an in-flight slot; returns False if timeout expires first"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._in_flight >= self.limit:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            self._in_flight += 1
+            self._publish()
+            return True
+
+    def release(self, latency: float, outcome: str = "success"):
+        """
+        Return a slot and feed the call's result into the control loop
+
+        Args:
+            latency: Call duration in seconds
+            outcome: "success", "throttled", "timeout" or "error"
+        """
+        with self._condition:
+            saturated = self._in_flight >= self.limit
+            self._in_flight -= 1
+            self._outcomes.append(outcome != "success")
+            metrics.observe("concurrency_latency_seconds", latency, limiter=self.name)
+
+            error_rate = sum(self._outcomes) / len(self._outcomes)
+            now = time.monotonic()
+            # Back off at most once per target latency so one burst of
+            # failures from the same wave of requests is only counted once
+            can_decrease = now - self._last_decrease >= self.latency_target
+
+            reason = None
+            if outcome == "throttled":
+                reason = "throttled"
+            elif outcome == "timeout" or latency > 2 * self.latency_target:
+                reason = "latency_spike"
+            elif len(self._outcomes) >= 5 and error_rate > self.error_rate_threshold:
+                reason = "error_rate"
+
+            if reason is not None:
+                if can_decrease:
+                    self._last_decrease = now
+                    self._set_limit(self._limit * self.decrease_factor, reason)
+            elif outcome == "success" and latency <= self.latency_target and saturated:
+                # Only grow when the current limit is actually being used
+                self._set_limit(self._limit + 1.0 / self._limit, "healthy")
+
+            self._publish()
+            # A freed slot or a higher limit may unblock waiters
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = None):
+        """
+        Hold a slot for the duration of a call
+
+        The yielded dict may be updated with {"outcome": ...}; it defaults to
+        "success" and to "error" if the block raises. Raises TimeoutError if
+        no slot frees up within timeout.
+        """
+        if not self.acquire(timeout):
+            metrics.increment("concurrency_acquire_timeouts", limiter=self.name)
+            raise TimeoutError(f"No {self.name} slot available within {timeout:.2f}s")
+        start = time.perf_counter()
+        result = {"outcome": "success"}
+        try:
+            yield result
+        except Exception:
+            if result["outcome"] == "success":
+                result["outcome"] = "error"
+            raise
+        finally:
+            self.release(time.perf_counter() - start, result["outcome"])
+
+    def stats(self):
+        """Current limit, in-flight count and recent limit changes"""
+        return {
+            "limit": self.limit,
+            "in_flight": self._in_flight,
+            "changes": [
+                event for event in metrics.events("concurrency_limit_change")
+                if event["limiter"] == self.name
+            ][-20:],
+        }
+
+class HedgeBudget:
+    """
+    Caps duplicate (hedged) requests to a fraction of recent traffic
+
+    Calls and hedges are counted over a sliding time window; a hedge is
+    allowed only while hedges stay under max_rate of the calls in it.
+    """
+
+    def __init__(self, max_rate: float = 0.05, window_seconds: float = 60.0):
+        self.max_rate = max_rate
+        self.window_seconds = window_seconds
+        self._calls: deque = deque()
+        self._hedges: deque = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float):
+        cutoff = now - self.window_seconds
+        for timestamps in (self._calls, self._hedges):
+            while timestamps and timestamps[0] < cutoff:
+                timestamps.popleft()
+
+    def record_call(self):
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            self._calls.append(now)
+
+    def try_acquire(self) -> bool:
+        """Reserve one hedge if the rate cap allows it"""
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            if len(self._hedges) + 1 > self.max_rate * len(self._calls):
+                return False
+            self._hedges.append(now)
+            return True
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open"""
+
+CIRCUIT_STATES = ("closed", "half_open", "open")
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream while it is failing or slow
+
+    Closed: calls go through, and their outcomes over the last
+    window_seconds are tracked. Once at least min_calls were made and the
+    failure rate or the share of calls slower than slow_call_seconds
+    reaches its threshold, the breaker opens. Open: calls are refused
+    (CircuitOpenError) for open_seconds. Half-open: up to
+    half_open_max_calls trial calls go through; if they all succeed the
+    breaker closes, and any failure opens it again. Every transition is
+    recorded as a metrics event together with its reason.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 10.0,
+        slow_call_rate_threshold: float = 0.5,
+        window_seconds: float = 30.0,
+        min_calls: int = 10,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 3,
+        enabled: bool = True,
+    ):
+        self.name = name
+        self.enabled = enabled
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self._state = "closed"
+        self._opened_at = 0.0
+        # (time, failed, slow) per call in the window
+        self._outcomes: deque = deque()
+        self._trial_calls = 0
+        self._trial_successes = 0
+        self._lock = threading.Lock()
+        self._publish()
+
+    def _publish(self):
+        metrics.set_gauge("circuit_state", CIRCUIT_STATES.index(self._state), breaker=self.name)
+
+    def _trim(self, now: float):
+        cutoff = now - self.window_seconds
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            self._outcomes.popleft()
+
+    def _rates(self) -> Tuple[float, float]:
+        if not self._outcomes:
+            return 0.0, 0.0
+        calls = len(self._outcomes)
+        return sum(failed for _, failed, _ in self._outcomes) / calls, sum(slow for _, _, slow in self._outcomes) / calls
+
+    def _transition(self, new_state: str, reason: str):
+        old = self._state
+        failure_rate, slow_rate = self._rates()
+        self._state = new_state
+        if new_state == "open":
+            self._opened_at = time.monotonic()
+        if new_state in ("half_open", "closed"):
+            self._trial_calls = self._trial_successes = 0
+        if new_state == "closed":
+            self._outcomes.clear()
+        self._publish()
+        metrics.increment("circuit_transitions", breaker=self.name, to=new_state)
+        metrics.record_event(
+            "circuit_breaker_transition", breaker=self.name, old=old, new=new_state, reason=reason,
+            failure_rate=round(failure_rate, 3), slow_rate=round(slow_rate, 3),
+        )
+        print(f"Circuit breaker {self.name}: {old} -> {new_state} ({reason})")
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == "open" and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._transition("half_open", "open_timeout")
+            return self._state
+
+    def try_acquire(self) -> bool:
+        """Permission for one call; False while open or while half-open trials are in flight"""
+        state = self.state
+        with self._lock:
+            if state == "closed":
+                return True
+            if state == "half_open" and self._trial_calls < self.half_open_max_calls:
+                self._trial_calls += 1
+                return True
+            return False
+
+    def record(self, latency: float, failed: bool):
+        """Feed one permitted call's outcome into the breaker"""
+        slow = latency >= self.slow_call_seconds
+        with self._lock:
+            if self._state == "half_open":
+                if failed or slow:
+                    self._transition("open", "trial_failed" if failed else "trial_slow")
+                else:
+                    self._trial_successes += 1
+                    if self._trial_successes >= self.half_open_max_calls:
+                        self._transition("closed", "trials_succeeded")
+                return
+            if self._state == "open":
+                # A call permitted before the breaker opened
+                return
+
+            now = time.monotonic()
+            self._outcomes.append((now, failed, slow))
+            self._trim(now)
+            if len(self._outcomes) < self.min_calls:
+                return
+            failure_rate, slow_rate = self._rates()
+            if failure_rate >= self.failure_rate_threshold:
+                self._transition("open", "error_rate")
+            elif slow_rate >= self.slow_call_rate_threshold:
+                self._transition("open", "slow_calls")
+
+    def release(self):
+        """Give back a permission whose call ended without a meaningful outcome"""
+        with self._lock:
+            if self._state == "half_open" and self._trial_calls > 0:
+                self._trial_calls -= 1
+
+    @contextmanager
+    def guard(self):
+        """
+        Permit one call, or raise CircuitOpenError
+
+        The yielded dict may be updated with {"outcome": ...}: "success"
+        (the default), "failure" (the default if the block raises),
+        "timeout" (counted as a slow call if it took slow_call_seconds,
+        ignored otherwise: a caller's short budget ran out) or "ignored"
+        for outcomes that say nothing about the upstream's health. A
+        disabled breaker permits every call.
+        """
+        if not self.enabled:
+            yield {"outcome": "success"}
+            return
+        if not self.try_acquire():
+            metrics.increment("circuit_rejections", breaker=self.name)
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open); failing fast")
+        start = time.perf_counter()
+        result = {"outcome": "success"}
+        try:
+            yield result
+        except Exception:
+            if result["outcome"] == "success":
+                result["outcome"] = "failure"
+            raise
+        finally:
+            latency = time.perf_counter() - start
+            if result["outcome"] == "ignored" or (result["outcome"] == "timeout" and latency < self.slow_call_seconds):
+                self.release()
+            else:
+                self.record(latency, result["outcome"] == "failure")
+
+    def stats(self) -> Dict[str, Any]:
+        """State, failure/slow rates in the window, seconds until trial calls if open, and recent transitions"""
+        state = self.state
+        with self._lock:
+            self._trim(time.monotonic())
+            failure_rate, slow_rate = self._rates()
+            calls = len(self._outcomes)
+            half_open_in = max(self.open_seconds - (time.monotonic() - self._opened_at), 0.0) if state == "open" else None
+        return {
+            "state": state,
+            "calls": calls,
+            "failure_rate": failure_rate,
+            "slow_rate": slow_rate,
+            "half_open_in": half_open_in,
+            "transitions": [
+                event for event in metrics.events("circuit_breaker_transition")
+                if event["breaker"] == self.name
+            ][-10:],
+        }
+
+class CircuitBreakerRegistry:
+    """One CircuitBreaker per upstream name, created on first use with the configured thresholds"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(
+                    name,
+                    failure_rate_threshold=config.CIRCUIT_FAILURE_RATE,
+                    slow_call_seconds=config.CIRCUIT_SLOW_CALL_SECONDS,
+                    slow_call_rate_threshold=config.CIRCUIT_SLOW_CALL_RATE,
+                    window_seconds=config.CIRCUIT_WINDOW_SECONDS,
+                    min_calls=config.CIRCUIT_MIN_CALLS,
+                    open_seconds=config.CIRCUIT_OPEN_SECONDS,
+                    half_open_max_calls=config.CIRCUIT_HALF_OPEN_CALLS,
+                    enabled=config.CIRCUIT_BREAKER_ENABLED,
+                )
+            return breaker
+
+    def is_open(self, name: str) -> bool:
+        """Whether calls to an upstream are currently refused (a breaker never used is closed)"""
+        with self._lock:
+            breaker = self._breakers.get(name)
+        return breaker is not None and breaker.state == "open"
+
+    def degraded(self) -> Dict[str, Dict[str, Any]]:
+        """Stats of the breakers that are not closed"""
+        return {name: stats for name, stats in self.stats().items() if stats["state"] != "closed"}
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Stats of every breaker"""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.stats() for breaker in breakers}
+
+# Shared by every client so all paths see the same upstream health
+circuit_breakers = CircuitBreakerRegistry()
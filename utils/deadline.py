@@ -0,0 +1,28 @@
+import time
+from typing import Optional
+
+from config import config
+
+def deadline_from_now(budget_seconds: Optional[float] = None) -> float:
+    """
+    Absolute deadline (epoch seconds) for an analysis started now
+
+    Args:
+        budget_seconds: Latency budget (defaults to config.ANALYSIS_DEADLINE_SECONDS)
+
+    Returns:
+        Deadline timestamp, or 0.0 when the budget is disabled
+    """
+    budget_seconds = config.ANALYSIS_DEADLINE_SECONDS if budget_seconds is None else budget_seconds
+    return time.time() + budget_seconds if budget_seconds > 0 else 0.0
+
+def remaining_seconds(deadline: float) -> Optional[float]:
+    """Time left until deadline, or None when there is no deadline"""
+    if not deadline:
+        return None
+    return deadline - time.time()
+
+def has_budget(deadline: float) -> bool:
+    """Whether enough time is left to start another LLM call"""
+    remaining = remaining_seconds(deadline)
+    return remaining is None or remaining > config.MIN_LLM_CALL_SECONDS
@@ -5,3 +5,18 @@ def generate_user_id(ssid: str) -> str:
     Generate a consistent anonymized user ID based on SSID (Wi-Fi name).
     """
     return hashlib.sha256(ssid.encode()).hexdigest()[:16]
+
+def generate_link_hash(link: str) -> str:
+    """
+    Generate a stable key for an article URL, used to recognise articles
+    that have already been analyzed.
+    """
+    return hashlib.sha256(link.strip().encode()).hexdigest()
+
+def generate_content_fingerprint(headline: str, content: str) -> str:
+    """
+    Generate a fingerprint of an article's text, so identical articles
+    (e.g. syndicated copies under different links) share cached results.
+    """
+    normalized = " ".join(f"{headline} {content}".lower().split())
+    return hashlib.sha256(normalized.encode()).hexdigest()
@@ -1,62 +1,529 @@
 import google.generativeai as genai
+import contextvars
+import datetime
+import hashlib
 import os
-from typing import Optional
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional, Tuple
 from dotenv import load_dotenv
+from config import config
+from utils.concurrency import AdaptiveConcurrencyLimiter, CircuitOpenError, HedgeBudget, circuit_breakers
+from utils.metrics import metrics
+from utils.profiler import profiler
+from utils.usage import current_user, usage_ledger, usage_scope
 
 # Load environment variables
 load_dotenv()
 
 # Configure Gemini API
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+if config.GEMINI_API_BASE:
+    # REST transport so the endpoint can be any HTTP server speaking the Gemini API
+    genai.configure(
+        api_key=os.getenv("GEMINI_API_KEY"),
+        transport="rest",
+        client_options={"api_endpoint": config.GEMINI_API_BASE},
+    )
+else:
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+
+# Shared by every client so the UI, watcher and batch paths draw on one budget
+llm_limiter = AdaptiveConcurrencyLimiter(
+    "gemini",
+    min_limit=config.LLM_MIN_CONCURRENCY,
+    max_limit=config.LLM_MAX_CONCURRENCY,
+    initial_limit=config.LLM_INITIAL_CONCURRENCY,
+    latency_target=config.LLM_LATENCY_TARGET_SECONDS,
+)
+
+# Hedged requests: duplicates are capped to a share of all calls
+hedge_budget = HedgeBudget(max_rate=config.LLM_HEDGE_MAX_RATE)
+_hedge_executor = ThreadPoolExecutor(max_workers=2 * config.LLM_MAX_CONCURRENCY, thread_name_prefix="gemini-hedge")
+
+class LLMTimeoutError(Exception):
+    """Raised when a call with a timeout does not complete in time"""
+
+class LLMError(Exception):
+    """Raised when a Gemini call fails for any other reason (API error, throttling, bad response)"""
+
+def is_timeout_error(error: Exception) -> bool:
+    """Whether an API error means the request ran out of time"""
+    if isinstance(error, TimeoutError) or type(error).__name__ in ("DeadlineExceeded", "ReadTimeout", "Timeout"):
+        return True
+    message = str(error).lower()
+    return "deadline" in message or "timed out" in message or "timeout" in message
+
+def is_throttling_error(error: Exception) -> bool:
+    """Whether an API error means we are being rate limited (HTTP 429)"""
+    if type(error).__name__ in ("ResourceExhausted", "TooManyRequests"):
+        return True
+    message = str(error).lower()
+    return "429" in message or "quota" in message or "rate limit" in message
+
+def is_missing_cache_error(error: Exception) -> bool:
+    """Whether a call failed because its cached context expired or was deleted"""
+    message = str(error).lower()
+    return type(error).__name__ in ("NotFound", "PermissionDenied") or "cachedcontent" in message
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) for size checks before any API call"""
+    return len(text) // 4
+
+class ContextCache:
+    """
+    Provider-side cached contexts for agents' static instructions
+
+    Agent prompts are split into fixed instructions and a per-article
+    suffix. The instructions of each (model, agent, instructions) triple
+    are uploaded once as a Gemini cached context; calls then send only the
+    suffix plus a reference, and the cached tokens are billed at the
+    cached-input rate. A context is extended when less than
+    config.CONTEXT_CACHE_REFRESH_SECONDS of its TTL is left, and recreated
+    if it was evicted.
+
+    Instructions shorter than config.CONTEXT_CACHE_MIN_TOKENS, or a failed
+    create, fall back to sending the instructions as a system instruction
+    (for config.CONTEXT_CACHE_RETRY_SECONDS after a failure), which keeps
+    the prefix byte-identical across calls for the provider's implicit
+    prefix caching.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self._locks: Dict[Tuple[str, str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(model_name: str, agent: str, instructions: str) -> Tuple[str, str, str]:
+        return model_name, agent, hashlib.sha1(instructions.encode("utf-8")).hexdigest()[:12]
+
+    def model_for(self, model_name: str, agent: str, instructions: str):
+        """
+        GenerativeModel bound to the cached context for these instructions
+
+        Returns:
+            The model, or None when the instructions should be sent inline
+        """
+        if not config.CONTEXT_CACHE_ENABLED:
+            return None
+        if estimate_tokens(instructions) < config.CONTEXT_CACHE_MIN_TOKENS:
+            metrics.increment("context_cache_skipped", agent=agent, reason="too_small")
+            return None
+
+        key = self._key(model_name, agent, instructions)
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        # Only callers of the same context wait for its create or refresh
+        with lock:
+            entry = self._entries.get(key)
+            now = time.time()
+            if entry is not None and entry.get("failed_until", 0.0) > now:
+                return None
+            if entry is None or "model" not in entry or entry["expires_at"] <= now:
+                entry = self._create(key, instructions)
+            elif entry["expires_at"] - now < config.CONTEXT_CACHE_REFRESH_SECONDS:
+                self._refresh(key, entry)
+            if "model" not in entry:
+                return None
+            entry["hits"] += 1
+            metrics.increment("context_cache_hits", model=model_name, agent=agent)
+            return entry["model"]
+
+    def _create(self, key: Tuple[str, str, str], instructions: str) -> Dict[str, Any]:
+        model_name, agent, _ = key
+        try:
+            cached = genai.caching.CachedContent.create(
+                model=f"models/{model_name}",
+                display_name=f"fnna-{agent}-{key[2]}",
+                system_instruction=instructions,
+                ttl=datetime.timedelta(seconds=config.CONTEXT_CACHE_TTL_SECONDS),
+            )
+        except Exception as e:
+            print(f"Context cache for {agent} on {model_name} unavailable, sending instructions inline: {str(e)}")
+            metrics.increment("context_cache_errors", model=model_name, agent=agent, kind="create")
+            entry = self._entries[key] = {"failed_until": time.time() + config.CONTEXT_CACHE_RETRY_SECONDS, "hits": 0}
+            return entry
+
+        tokens = cached.usage_metadata.total_token_count or estimate_tokens(instructions)
+        entry = self._entries[key] = {
+            "cached": cached,
+            "model": genai.GenerativeModel.from_cached_content(cached),
+            "tokens": tokens,
+            "expires_at": time.time() + config.CONTEXT_CACHE_TTL_SECONDS,
+            "hits": 0,
+        }
+        metrics.increment("context_cache_creates", model=model_name, agent=agent)
+        self._record_storage(model_name, tokens, config.CONTEXT_CACHE_TTL_SECONDS)
+        return entry
+
+    def _refresh(self, key: Tuple[str, str, str], entry: Dict[str, Any]):
+        model_name, agent, _ = key
+        remaining = max(entry["expires_at"] - time.time(), 0.0)
+        try:
+            entry["cached"].update(ttl=datetime.timedelta(seconds=config.CONTEXT_CACHE_TTL_SECONDS))
+        except Exception as e:
+            # Keep using it until it expires; the next call after that recreates it
+            print(f"Context cache refresh for {agent} on {model_name} failed: {str(e)}")
+            metrics.increment("context_cache_errors", model=model_name, agent=agent, kind="refresh")
+            return
+        entry["expires_at"] = time.time() + config.CONTEXT_CACHE_TTL_SECONDS
+        metrics.increment("context_cache_refreshes", model=model_name, agent=agent)
+        self._record_storage(model_name, entry["tokens"], config.CONTEXT_CACHE_TTL_SECONDS - remaining)
+
+    @staticmethod
+    def _record_storage(model_name: str, tokens: int, seconds: float):
+        """Storage is billed per cached token per hour of TTL"""
+        price = config.MODEL_PRICES.get(model_name, config.MODEL_PRICES.get("default", {}))
+        cost = tokens * price.get("cache_storage", 0.0) * seconds / 3600 / 1_000_000
+        metrics.increment("context_cache_storage_usd", cost, model=model_name)
+
+    def invalidate(self, model_name: str, agent: str, instructions: str):
+        """Forget a context the provider no longer has, so the next call recreates it"""
+        with self._lock:
+            self._entries.pop(self._key(model_name, agent, instructions), None)
+        metrics.increment("context_cache_errors", model=model_name, agent=agent, kind="missing")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Live cached contexts: tokens, calls served and seconds until expiry"""
+        with self._lock:
+            entries = dict(self._entries)
+        now = time.time()
+        return {
+            f"{agent}@{model_name}": {
+                "tokens": entry["tokens"],
+                "hits": entry["hits"],
+                "expires_in": max(entry["expires_at"] - now, 0.0),
+            }
+            for (model_name, agent, _), entry in entries.items()
+            if "model" in entry
+        }
+
+    def clear(self):
+        """Delete every cached context (storage is billed until they expire otherwise)"""
+        with self._lock:
+            entries, self._entries = self._entries, {}
+        for entry in entries.values():
+            if "cached" in entry:
+                try:
+                    entry["cached"].delete()
+                except Exception as e:
+                    print(f"Could not delete cached context: {str(e)}")
+
+# Shared by every client so each context is created once per process
+context_cache = ContextCache()
 
 class GeminiClient:
     """Google Gemini API client for LLM operations"""
     
-    def __init__(self, model_name: str = "gemini-1.5-flash"):
-        self.model_name = model_name
-        self.model = genai.GenerativeModel(model_name)
+    def __init__(self, model_name: Optional[str] = None, latency_window: int = 50):
+        self.model_name = model_name or config.GEMINI_MODEL
+        self.model = genai.GenerativeModel(self.model_name)
+        # Models carrying an agent's instructions as a system instruction, keyed by the instructions
+        self._instructed: Dict[str, Any] = {}
+        self.breaker = circuit_breakers.get(f"gemini:{self.model_name}")
+        # Recent successful single-attempt latencies, for tiering and hedging
+        self.recent_latencies: deque = deque(maxlen=latency_window)
     
-    def generate_response(self, prompt: str, temperature: float = 0.3, max_tokens: int = 500) -> str:
+    def latency_percentile(self, q: float = 95, min_samples: int = 10) -> Optional[float]:
+        """Percentile (0-100) of recent call latencies, or None until enough calls were made"""
+        samples = sorted(self.recent_latencies)
+        if len(samples) < min_samples:
+            return None
+        return samples[int(q / 100.0 * (len(samples) - 1))]
+    
+    def _model_for(self, instructions: Optional[str], context_name: str) -> Tuple[Any, bool]:
+        """Model to send a prompt to and whether its instructions come from a cached context"""
+        if not instructions:
+            return self.model, False
+        cached = context_cache.model_for(self.model_name, context_name, instructions)
+        if cached is not None:
+            return cached, True
+        return self._instructed_model(instructions), False
+    
+    def _instructed_model(self, instructions: str):
+        model = self._instructed.get(instructions)
+        if model is None:
+            model = self._instructed[instructions] = genai.GenerativeModel(
+                self.model_name, system_instruction=instructions
+            )
+        return model
+    
+    def _call(self, prompt: str, generation_config, timeout: Optional[float], model=None) -> str:
+        """One attempt: wait for a concurrency slot, then call the API"""
+        model = model or self.model
+        start = time.perf_counter()
+        with llm_limiter.slot(timeout) as slot:
+            request_options = {}
+            if timeout is not None:
+                # Whatever is left after waiting for a slot
+                request_options["timeout"] = max(timeout - (time.perf_counter() - start), 0.001)
+            try:
+                response = model.generate_content(
+                    prompt,
+                    generation_config=generation_config,
+                    request_options=request_options or None
+                )
+                self._record_usage(response)
+                text = response.text.strip()
+            except Exception as e:
+                if is_throttling_error(e):
+                    slot["outcome"] = "throttled"
+                elif is_timeout_error(e):
+                    slot["outcome"] = "timeout"
+                else:
+                    slot["outcome"] = "error"
+                raise
+        self.recent_latencies.append(time.perf_counter() - start)
+        return text
+    
+    def _record_usage(self, response):
+        """Account the call's tokens; every attempt counts, including hedges"""
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return
+        usage_ledger.record(
+            self.model_name,
+            prompt_tokens=getattr(usage, "prompt_token_count", 0) or 0,
+            output_tokens=getattr(usage, "candidates_token_count", 0) or 0,
+            cached_tokens=getattr(usage, "cached_content_token_count", 0) or 0,
+        )
+    
+    def _hedged_call(self, prompt: str, generation_config, timeout: Optional[float], model=None) -> str:
+        """
+        Call with a backup request if the first is slower than usual
+        
+        If the call has not returned after the recent LLM_HEDGE_PERCENTILE
+        latency, a duplicate is sent and the first successful answer wins.
+        The loser cannot be interrupted mid-request; its result is discarded
+        and it releases its concurrency slot when it returns.
+        """
+        start = time.perf_counter()
+        hedge_budget.record_call()
+        # Each attempt runs in a copy of the caller's context to keep its usage attribution
+        primary = _hedge_executor.submit(
+            contextvars.copy_context().run, self._call, prompt, generation_config, timeout, model
+        )
+        
+        delay = self.latency_percentile(config.LLM_HEDGE_PERCENTILE, min_samples=config.LLM_HEDGE_MIN_SAMPLES)
+        if delay is None or (timeout is not None and delay >= timeout):
+            return primary.result()
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        if not hedge_budget.try_acquire():
+            metrics.increment("llm_hedges_skipped", model=self.model_name)
+            return primary.result()
+        
+        metrics.increment("llm_hedges_fired", model=self.model_name)
+        hedge_timeout = timeout - (time.perf_counter() - start) if timeout is not None else None
+        hedge = _hedge_executor.submit(
+            contextvars.copy_context().run, self._call, prompt, generation_config, hedge_timeout, model
+        )
+        
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        metrics.increment("llm_hedges_won", model=self.model_name)
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                error = future.exception()
+        raise error
+    
+    @profiler.profiled("gemini", kind="client")
+    def generate_response(self, prompt: str, temperature: float = 0.3, max_tokens: int = 500,
+                          timeout: Optional[float] = None, instructions: Optional[str] = None,
+                          context_name: str = "default") -> str:
         """
         Generate response using Google Gemini API
         
         Args:
-            prompt: Input prompt for the model
+            prompt: Input prompt for the model (the variable part when
+                instructions are given)
             temperature: Controls randomness (0.0 to 1.0)
             max_tokens: Maximum tokens in response
+            timeout: Seconds the call may take, including waiting for a
+                concurrency slot; None means no limit
+            instructions: Static instructions sent ahead of the prompt, from
+                a cached context where possible (see ContextCache)
+            context_name: Label of the cached context (the agent name)
             
         Returns:
             Generated response text
+            
+        Raises:
+            LLMTimeoutError: If timeout is set and the call does not finish in time
+            CircuitOpenError: If the model's circuit breaker is open
+            LLMError: If the call failed otherwise
         """
+        start = time.perf_counter()
         try:
             generation_config = genai.types.GenerationConfig(
                 temperature=temperature,
                 max_output_tokens=max_tokens,
             )
             
-            response = self.model.generate_content(
-                prompt,
-                generation_config=generation_config
-            )
+            send = self._hedged_call if config.LLM_HEDGING_ENABLED else self._call
+            with self.breaker.guard() as call:
+                model, cached = self._model_for(instructions, context_name)
+                try:
+                    try:
+                        text = send(prompt, generation_config, timeout, model)
+                    except Exception as e:
+                        if not (cached and is_missing_cache_error(e)):
+                            raise
+                        # Evicted before its TTL ran out: send the instructions inline this time
+                        context_cache.invalidate(self.model_name, context_name, instructions)
+                        cached = False
+                        remaining = timeout - (time.perf_counter() - start) if timeout is not None else None
+                        text = send(prompt, generation_config, remaining, self._instructed_model(instructions))
+                except Exception as e:
+                    if is_timeout_error(e):
+                        call["outcome"] = "timeout"
+                    raise
             
-            return response.text.strip()
+            latency = time.perf_counter() - start
+            metrics.observe("llm_latency_seconds", latency, model=self.model_name)
+            if instructions:
+                metrics.observe("llm_instructed_latency_seconds", latency, agent=context_name,
+                                context="cached" if cached else "inline")
+            return text
             
+        except CircuitOpenError:
+            metrics.increment("llm_errors", model=self.model_name, kind="circuit_open")
+            raise
         except Exception as e:
+            if timeout is not None and is_timeout_error(e):
+                metrics.increment("llm_errors", model=self.model_name, kind="timeout")
+                raise LLMTimeoutError(f"Gemini call exceeded {timeout:.2f}s: {str(e)}") from e
+            metrics.increment("llm_errors", model=self.model_name,
+                              kind="throttled" if is_throttling_error(e) else "error")
             print(f"Error generating response: {str(e)}")
-            return "Error: Unable to generate response"
+            raise LLMError(f"Gemini call failed: {str(e)}") from e
+
+class GeminiClientPool:
+    """
+    One GeminiClient per model, created on first use
 
-# Global client instance
-_client = GeminiClient()
+    With tiering enabled, a request for a model whose recent p95 latency is
+    above the threshold is served by the next faster model in
+    config.MODEL_TIERS instead. A small share of calls still goes to the
+    slow model so its latency keeps being measured and it is used again
+    once it recovers.
 
-def llama_prompt(prompt: str, temperature: float = 0.3, max_tokens: int = 500) -> str:
+    A request for a model whose circuit breaker is open goes to
+    config.CIRCUIT_FALLBACK_MODEL while that model's breaker is not open.
+    """
+    
+    def __init__(self):
+        self._clients: Dict[str, GeminiClient] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, model_name: Optional[str] = None) -> GeminiClient:
+        """Pooled client for a model (defaults to config.GEMINI_MODEL)"""
+        model_name = model_name or config.GEMINI_MODEL
+        with self._lock:
+            client = self._clients.get(model_name)
+            if client is None:
+                client = self._clients[model_name] = GeminiClient(model_name)
+            return client
+    
+    def resolve(self, model_name: Optional[str] = None) -> GeminiClient:
+        """Client to use for a requested model, after latency-aware tiering and circuit breaking"""
+        client = self._tiered(self.get(model_name))
+        fallback_model = config.CIRCUIT_FALLBACK_MODEL
+        if client.breaker.state == "open" and fallback_model and fallback_model != client.model_name:
+            fallback = self.get(fallback_model)
+            if fallback.breaker.state != "open":
+                metrics.increment("circuit_fallbacks", model=client.model_name, to=fallback.model_name)
+                client = fallback
+        return client
+    
+    def _tiered(self, client: GeminiClient) -> GeminiClient:
+        if not config.MODEL_TIERING_ENABLED or client.model_name not in config.MODEL_TIERS:
+            return client
+        
+        tier = config.MODEL_TIERS.index(client.model_name)
+        while tier + 1 < len(config.MODEL_TIERS):
+            p95 = client.latency_percentile(95)
+            if p95 is None or p95 <= config.MODEL_TIERING_P95_SECONDS:
+                break
+            if random.random() < config.MODEL_TIERING_PROBE_RATE:
+                metrics.increment("model_tier_probes", model=client.model_name)
+                break
+            tier += 1
+            faster = self.get(config.MODEL_TIERS[tier])
+            metrics.increment("model_tier_fallbacks", model=client.model_name, to=faster.model_name)
+            client = faster
+        return client
+    
+    def stats(self) -> Dict[str, Optional[float]]:
+        """Recent p95 latency per pooled model"""
+        with self._lock:
+            clients = list(self._clients.values())
+        return {client.model_name: client.latency_percentile(95) for client in clients}
+
+# Global client pool shared by all agents
+client_pool = GeminiClientPool()
+
+def llama_prompt(prompt: str, temperature: float = 0.3, max_tokens: int = 500, timeout: Optional[float] = None) -> str:
     """
     Legacy function name maintained for backward compatibility
     Now uses Google Gemini instead of Llama
     """
-    return _client.generate_response(prompt, temperature, max_tokens)
+    return client_pool.resolve().generate_response(prompt, temperature, max_tokens, timeout)
 
-def gemini_prompt(prompt: str, temperature: float = 0.3, max_tokens: int = 500) -> str:
+def gemini_prompt(prompt: str, temperature: float = 0.3, max_tokens: int = 500, timeout: Optional[float] = None,
+                  model: Optional[str] = None, instructions: Optional[str] = None,
+                  context_name: str = "default") -> str:
     """
     New function name for clarity - uses Google Gemini API
     """
-    return _client.generate_response(prompt, temperature, max_tokens)
+    return client_pool.resolve(model).generate_response(
+        prompt, temperature, max_tokens, timeout, instructions=instructions, context_name=context_name
+    )
+
+def agent_prompt(agent: str, prompt: str, timeout: Optional[float] = None, max_tokens: Optional[int] = None,
+                 instructions: Optional[str] = None) -> str:
+    """
+    Prompt Gemini with an agent's configured model, temperature and token limit
+    
+    Tokens are attributed to the agent. Once a token budget is nearly used
+    up, the call goes to config.GEMINI_FAST_MODEL instead.
+    
+    Args:
+        agent: Key into config.AGENT_PROFILES ("sentiment", "market_impact", "entity_risk")
+        prompt: Per-article part of the prompt
+        timeout: Seconds the call may take (None for no limit)
+        max_tokens: Override of the profile's token limit (e.g. for packed prompts)
+        instructions: The agent's static instructions, identical across
+            calls so they can be served from a cached context
+        
+    Returns:
+        Generated response text
+        
+    Raises:
+        LLMTimeoutError, CircuitOpenError, LLMError: As GeminiClient.generate_response
+    """
+    profile = config.AGENT_PROFILES[agent]
+    model = profile["model"]
+    if model != config.GEMINI_FAST_MODEL and usage_ledger.status(current_user()) != "ok":
+        metrics.increment("budget_downgrades", agent=agent)
+        model = config.GEMINI_FAST_MODEL
+    with usage_scope(agent=agent):
+        return gemini_prompt(
+            prompt,
+            temperature=profile["temperature"],
+            max_tokens=max_tokens or profile["max_tokens"],
+            timeout=timeout,
+            model=model,
+            instructions=instructions,
+            context_name=agent,
+        )
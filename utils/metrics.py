@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+def _key(name: str, labels: Dict[str, Any]) -> str:
+    if not labels:
+        return name
+    label_text = ",".join(f"{k}={labels[k]}" for k in sorted(labels))
+    return f"{name}{{{label_text}}}"
+
+def _percentile(ordered: List[float], q: float) -> float:
+    index = min(len(ordered) - 1, max(0, int(round(q / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+class MetricsRegistry:
+    """
+    In-process metrics: counters, gauges, latency samples and events
+
+    Histograms keep a bounded window of recent samples so percentiles reflect
+    current behaviour rather than the whole process lifetime.
+    """
+
+    def __init__(self, window: int = 1000, max_events: int = 500):
+        self._lock = threading.Lock()
+        self._window = window
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._samples: Dict[str, deque] = {}
+        self._sample_totals: Dict[str, Tuple[int, float]] = {}
+        self._events: deque = deque(maxlen=max_events)
+
+    def increment(self, name: str, value: float = 1, **labels):
+        """Add value to a counter"""
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Set a gauge to its current value"""
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one sample (e.g. a latency in seconds)"""
+        key = _key(name, labels)
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self._window)
+            samples.append(value)
+            count, total = self._sample_totals.get(key, (0, 0.0))
+            self._sample_totals[key] = (count + 1, total + value)
+
+    def record_event(self, name: str, **fields):
+        """Append a timestamped event (e.g. a state transition)"""
+        with self._lock:
+            self._events.append({"event": name, "time": time.time(), **fields})
+
+    def counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(_key(name, labels), 0)
+
+    def gauge(self, name: str, **labels) -> Optional[float]:
+        with self._lock:
+            return self._gauges.get(_key(name, labels))
+
+    def percentile(self, name: str, q: float, **labels) -> Optional[float]:
+        """Percentile (0-100) over the recent sample window, or None if empty"""
+        with self._lock:
+            samples = self._samples.get(_key(name, labels))
+            if not samples:
+                return None
+            ordered = sorted(samples)
+        return _percentile(ordered, q)
+
+    def events(self, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [event for event in self._events if name is None or event["event"] == name]
+
+    def counters(self, prefix: str = "") -> Dict[str, float]:
+        """Counters whose key starts with prefix"""
+        with self._lock:
+            return {key: value for key, value in self._counters.items() if key.startswith(prefix)}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """All metrics as plain data (for JSON export or display)"""
+        with self._lock:
+            histogram_keys = list(self._samples)
+            snapshot = {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "events": list(self._events),
+            }
+
+        histograms = {}
+        for key in histogram_keys:
+            with self._lock:
+                ordered = sorted(self._samples[key])
+                count, total = self._sample_totals[key]
+            histograms[key] = {
+                "count": count,
+                "mean": total / count if count else 0.0,
+                "p50": _percentile(ordered, 50),
+                "p95": _percentile(ordered, 95),
+                "p99": _percentile(ordered, 99),
+            }
+        snapshot["histograms"] = histograms
+        return snapshot
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._samples.clear()
+            self._sample_totals.clear()
+            self._events.clear()
+
+# Global registry shared by the pipeline, clients and UI
+metrics = MetricsRegistry()
@@ -0,0 +1,97 @@
+import json
+import re
+from typing import Dict, List
+
+def build_packed_instructions(instructions: str, valid_labels: List[str], label_name: str) -> str:
+    """
+    Build the static part of a packed prompt, shared by every batch
+
+    Args:
+        instructions: Task description shared by every article
+        valid_labels: Labels the model is allowed to answer with
+        label_name: Name of the label being predicted (e.g. "sentiment")
+
+    Returns:
+        Instructions asking for a JSON array with one label per numbered article
+    """
+    labels_text = ", ".join(f"'{label}'" for label in valid_labels)
+
+    return f"""{instructions}
+
+You will be given numbered articles. Classify each article independently.
+
+Respond with ONLY a JSON array containing one object per article, in the form:
+[{{"index": 1, "{label_name}": "<label>"}}, {{"index": 2, "{label_name}": "<label>"}}]
+Each label must be one of: {labels_text}."""
+
+def build_packed_prompt(items: List[str], label_name: str) -> str:
+    """
+    Build the per-batch part of a packed prompt (follows build_packed_instructions)
+
+    Args:
+        items: Article blocks to classify, in order
+        label_name: Name of the label being predicted (e.g. "sentiment")
+
+    Returns:
+        Prompt holding the numbered articles
+    """
+    blocks = []
+    for index, item in enumerate(items, start=1):
+        blocks.append(f"### ARTICLE {index} ###\n{item}\n### END ARTICLE {index} ###")
+
+    return f"""There are {len(items)} articles; answer with exactly {len(items)} {label_name} objects.
+
+{chr(10).join(blocks)}
+
+JSON:"""
+
+def parse_packed_labels(response: str, count: int, valid_labels: List[str], label_name: str) -> Dict[int, str]:
+    """
+    Parse the JSON array returned for a packed prompt
+
+    Args:
+        response: Raw response from the LLM
+        count: Number of articles that were packed into the prompt
+        valid_labels: Labels the model was allowed to answer with
+        label_name: Key holding the label in each returned object
+
+    Returns:
+        Mapping of zero-based article position to label; missing or invalid
+        entries are left out so the caller can re-query them individually
+    """
+    labels: Dict[int, str] = {}
+
+    # Strip code fences and pick out the outermost array
+    array_match = re.search(r'\[.*\]', response or "", re.DOTALL)
+    if not array_match:
+        return labels
+
+    try:
+        entries = json.loads(array_match.group(0))
+    except (json.JSONDecodeError, ValueError):
+        return labels
+
+    if not isinstance(entries, list):
+        return labels
+
+    for position, entry in enumerate(entries):
+        # Accept both {"index": i, "<label_name>": label} objects and bare labels
+        if isinstance(entry, dict):
+            index = entry.get("index")
+            label = entry.get(label_name, entry.get("label"))
+            try:
+                index = int(index) - 1
+            except (TypeError, ValueError):
+                continue
+        else:
+            index = position
+            label = entry
+
+        if not isinstance(label, str) or not 0 <= index < count:
+            continue
+
+        label = label.strip().lower()
+        if label in valid_labels and index not in labels:
+            labels[index] = label
+
+    return labels
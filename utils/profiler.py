@@ -0,0 +1,211 @@
+import contextvars
+import functools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from config import config
+
+# Whether the current analysis was sampled for profiling (None = undecided)
+_sampled: contextvars.ContextVar = contextvars.ContextVar("profile_sampled", default=None)
+
+class PipelineProfiler:
+    """
+    Opt-in profiler for graph nodes and client calls
+
+    Each span records wall time and thread CPU time, so wall minus CPU is time
+    spent waiting (network, locks, sleeping). With stack capture on, a
+    background thread samples the Python stacks of threads that are inside a
+    node span but not inside a client call, i.e. only the CPU-bound parts,
+    and aggregates them as collapsed stacks for flamegraph tools.
+
+    Only a sample_rate fraction of top-level spans (e.g. analyses) is
+    profiled, so it can stay enabled on a share of production traffic.
+    """
+
+    def __init__(self):
+        self.enabled = config.PROFILE_ENABLED
+        self.sample_rate = config.PROFILE_SAMPLE_RATE
+        self.capture_stacks = config.PROFILE_STACKS
+        self.sampling_interval = config.PROFILE_SAMPLING_INTERVAL_MS / 1000.0
+
+        self._lock = threading.Lock()
+        self._spans: Dict[str, Dict[str, float]] = {}
+        self._stacks: Counter = Counter()
+        # thread id -> stack of (span name, kind) currently open on that thread
+        self._open_spans: Dict[int, List[tuple]] = {}
+        self._sampler: Optional[threading.Thread] = None
+        self._stop_sampler = threading.Event()
+
+    def enable(self, sample_rate: Optional[float] = None, capture_stacks: Optional[bool] = None):
+        """Turn profiling on at runtime (e.g. from a CLI flag)"""
+        self.enabled = True
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if capture_stacks is not None:
+            self.capture_stacks = capture_stacks
+
+    def _ensure_sampler(self):
+        if self._sampler is None or not self._sampler.is_alive():
+            self._stop_sampler.clear()
+            self._sampler = threading.Thread(target=self._sample_loop, name="profile-sampler", daemon=True)
+            self._sampler.start()
+
+    def _sample_loop(self):
+        while not self._stop_sampler.wait(self.sampling_interval):
+            with self._lock:
+                targets = {
+                    thread_id: spans[-1][0]
+                    for thread_id, spans in self._open_spans.items()
+                    if spans and spans[-1][1] == "node"
+                }
+            if not targets:
+                continue
+
+            frames = sys._current_frames()
+            samples = []
+            for thread_id, span_name in targets.items():
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(span_name)
+                samples.append(";".join(reversed(stack)))
+
+            with self._lock:
+                self._stacks.update(samples)
+
+    @contextmanager
+    def span(self, name: str, kind: str = "node"):
+        """
+        Time a block as a named span
+
+        Args:
+            name: Span name (node or client call)
+            kind: "node" for pipeline work, "client" for upstream I/O calls
+        """
+        sampled = _sampled.get()
+        token = None
+        if sampled is None:
+            # Outermost span decides whether this unit of work is profiled
+            sampled = self.enabled and random.random() < self.sample_rate
+            token = _sampled.set(sampled)
+
+        if not sampled:
+            try:
+                yield
+            finally:
+                if token is not None:
+                    _sampled.reset(token)
+            return
+
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._open_spans.setdefault(thread_id, []).append((name, kind))
+        if self.capture_stacks:
+            self._ensure_sampler()
+
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            with self._lock:
+                spans = self._open_spans.get(thread_id, [])
+                if spans:
+                    spans.pop()
+                if not spans:
+                    self._open_spans.pop(thread_id, None)
+                stats = self._spans.setdefault(name, {"kind": kind, "calls": 0, "wall": 0.0, "cpu": 0.0})
+                stats["calls"] += 1
+                stats["wall"] += wall
+                stats["cpu"] += cpu
+            if token is not None:
+                _sampled.reset(token)
+
+    def wrap(self, name: str, fn, kind: str = "node"):
+        """Return fn wrapped in a span"""
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return fn(*args, **kwargs)
+            with self.span(name, kind):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def profiled(self, name: str, kind: str = "node"):
+        """Decorator form of wrap()"""
+        return lambda fn: self.wrap(name, fn, kind)
+
+    def span_table(self) -> List[Dict[str, Any]]:
+        """Per-span totals with CPU vs wait split, slowest first"""
+        with self._lock:
+            spans = {name: dict(stats) for name, stats in self._spans.items()}
+        rows = []
+        for name, stats in spans.items():
+            wait = max(stats["wall"] - stats["cpu"], 0.0)
+            rows.append({
+                "span": name,
+                "kind": stats["kind"],
+                "calls": stats["calls"],
+                "wall_seconds": stats["wall"],
+                "cpu_seconds": stats["cpu"],
+                "wait_seconds": wait,
+                "cpu_share": stats["cpu"] / stats["wall"] if stats["wall"] else 0.0,
+                "mean_wall_ms": stats["wall"] / stats["calls"] * 1000,
+            })
+        return sorted(rows, key=lambda row: -row["wall_seconds"])
+
+    def collapsed_stacks(self) -> List[str]:
+        """Sampled stacks in collapsed format ("a;b;c count")"""
+        with self._lock:
+            return [f"{stack} {count}" for stack, count in self._stacks.most_common()]
+
+    def write_report(self, output_dir: Optional[str] = None) -> Dict[str, str]:
+        """
+        Write the span table and collapsed stacks to disk
+
+        Returns:
+            Paths of the written files
+        """
+        output_dir = output_dir or os.path.join(config.DATA_DIR, "profiles")
+        os.makedirs(output_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        table_path = os.path.join(output_dir, f"profile_{stamp}.txt")
+        with open(table_path, "w") as f:
+            f.write(f"{'span':<28}{'kind':<8}{'calls':>7}{'wall s':>10}{'cpu s':>10}{'wait s':>10}{'cpu %':>8}\n")
+            for row in self.span_table():
+                f.write(
+                    f"{row['span']:<28}{row['kind']:<8}{row['calls']:>7}{row['wall_seconds']:>10.3f}"
+                    f"{row['cpu_seconds']:>10.3f}{row['wait_seconds']:>10.3f}{row['cpu_share']:>8.1%}\n"
+                )
+
+        paths = {"table": table_path}
+        stacks = self.collapsed_stacks()
+        if stacks:
+            stacks_path = os.path.join(output_dir, f"profile_{stamp}.collapsed")
+            with open(stacks_path, "w") as f:
+                f.write("\n".join(stacks) + "\n")
+            paths["collapsed_stacks"] = stacks_path
+
+        print(f"Profile written to: {', '.join(paths.values())}")
+        return paths
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._stacks.clear()
+
+# Global profiler shared by the graph, clients and UI
+profiler = PipelineProfiler()
@@ -0,0 +1,93 @@
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, Optional
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys"""
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        # Standard sizing: m = -n ln(p) / (ln 2)^2, k = (m / n) ln 2
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key: str):
+        # Double hashing from one digest gives k independent-enough positions
+        digest = hashlib.sha256(key.encode()).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+class SeenStore:
+    """
+    Persistent set of already-analyzed article link hashes
+
+    An in-memory Bloom filter answers the common "never seen" case without
+    touching disk; positives are confirmed against an exact SQLite table.
+    """
+
+    def __init__(self, db_path: str, capacity: int = 100000):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen ("
+            "link_hash TEXT PRIMARY KEY, topic TEXT, first_seen REAL)"
+        )
+        self._conn.commit()
+
+        # Rebuild the filter from the exact store
+        count = self._conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+        self.bloom = BloomFilter(capacity=max(capacity, count * 2))
+        for (link_hash,) in self._conn.execute("SELECT link_hash FROM seen"):
+            self.bloom.add(link_hash)
+
+    def __contains__(self, link_hash: str) -> bool:
+        if link_hash not in self.bloom:
+            return False
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM seen WHERE link_hash = ?", (link_hash,)
+            ).fetchone()
+        return row is not None
+
+    def add(self, link_hash: str, topic: Optional[str] = None):
+        """Mark a link hash as seen"""
+        self.add_many([link_hash], topic)
+
+    def add_many(self, link_hashes: Iterable[str], topic: Optional[str] = None):
+        """Mark several link hashes as seen in a single transaction"""
+        now = time.time()
+        rows = [(link_hash, topic, now) for link_hash in link_hashes]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO seen (link_hash, topic, first_seen) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+        for link_hash, _, _ in rows:
+            self.bloom.add(link_hash)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
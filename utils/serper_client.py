@@ -1,20 +1,70 @@
 import requests
 import os
-from typing import List, Dict, Any, Optional
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import urlparse
 from dotenv import load_dotenv
+from config import config
+from utils.concurrency import CircuitOpenError, circuit_breakers
+from utils.profiler import profiler
 
 # Load environment variables
 load_dotenv()
 
+# Serper "tbs" values for the named time windows
+TIME_WINDOWS = {
+    "hour": "qdr:h",
+    "day": "qdr:d",
+    "week": "qdr:w",
+    "month": "qdr:m",
+    "year": "qdr:y",
+}
+
 class SerperClient:
     """Client for Google Serper API to fetch financial news"""
     
     def __init__(self):
         self.api_key = os.getenv("SERPER_API_KEY")
-        self.base_url = "https://google.serper.dev/news"
+        self.base_url = config.SERPER_API_URL
+        self.timeout = config.SERPER_TIMEOUT_SECONDS
         
         if not self.api_key:
             raise ValueError("SERPER_API_KEY environment variable is required")
+        
+        # Reuse connections across searches from the UI, watcher and jobs
+        self.session = requests.Session()
+        self.breaker = circuit_breakers.get("serper")
+    
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "X-API-KEY": self.api_key,
+            "Content-Type": "application/json"
+        }
+    
+    @staticmethod
+    def _parse_article(article: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Normalize one Serper result; None if it has no meaningful content"""
+        parsed_article = {
+            "headline": article.get("title", ""),
+            "content": article.get("snippet", ""),
+            "published_at": article.get("date", ""),
+            "link": article.get("link", ""),
+            "source": article.get("source", "")
+        }
+        if parsed_article["headline"] and parsed_article["content"]:
+            return parsed_article
+        return None
+    
+    @profiler.profiled("serper", kind="client")
+    def _fetch_page(self, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """POST one search request and return the raw "news" results; raises CircuitOpenError while Serper is down"""
+        with self.breaker.guard() as call:
+            response = self.session.post(self.base_url, headers=self._headers(), json=payload, timeout=self.timeout)
+            if 400 <= response.status_code < 500 and response.status_code != 429:
+                # A rejected request (bad query, bad key) says nothing about Serper's health
+                call["outcome"] = "ignored"
+            response.raise_for_status()
+            return response.json().get("news", [])
     
     def fetch_financial_news(self, query: str, num_results: int = 10) -> List[Dict[str, Any]]:
         """
@@ -27,46 +77,117 @@ class SerperClient:
         Returns:
             List of news articles with headline, content, and published_at
         """
-        headers = {
-            "X-API-KEY": self.api_key,
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "q": query,
             "num": num_results
         }
         
         try:
-            response = requests.post(self.base_url, headers=headers, json=payload)
-            response.raise_for_status()
+            articles = self._fetch_page(payload)
             
-            data = response.json()
-            articles = data.get("news", [])
-            
-            # Parse and format articles
-            parsed_articles = []
-            for article in articles:
-                parsed_article = {
-                    "headline": article.get("title", ""),
-                    "content": article.get("snippet", ""),
-                    "published_at": article.get("date", ""),
-                    "link": article.get("link", ""),
-                    "source": article.get("source", "")
-                }
-                
-                # Only include articles with meaningful content
-                if parsed_article["headline"] and parsed_article["content"]:
-                    parsed_articles.append(parsed_article)
-            
-            return parsed_articles
+            # Only include articles with meaningful content
+            return [parsed for parsed in map(self._parse_article, articles) if parsed]
             
+        except CircuitOpenError as e:
+            print(f"Skipping news search: {str(e)}")
+            return []
         except requests.exceptions.RequestException as e:
             print(f"Error fetching news: {str(e)}")
             return []
         except Exception as e:
             print(f"Unexpected error: {str(e)}")
             return []
+    
+    def iter_financial_news(
+        self,
+        query: str,
+        page_size: int = 10,
+        limit: Optional[int] = None,
+        max_pages: Optional[int] = None,
+        time_window: Optional[Union[str, Tuple[date, date]]] = None,
+        sources: Optional[Iterable[str]] = None,
+        stop_when: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily page through news results for a query
+        
+        Pages are requested one at a time and their articles yielded as soon
+        as each page arrives, so callers can start analyzing before retrieval
+        finishes and stop paging simply by not asking for more.
+        
+        Args:
+            query: Search query for financial news
+            page_size: Results requested per page
+            limit: Stop after yielding this many articles
+            max_pages: Stop after this many pages (default: config.SERPER_MAX_PAGES)
+            time_window: "hour", "day", "week", "month" or "year", or a
+                (start, end) pair of dates for a custom range
+            sources: Keep only articles whose source name or link domain
+                contains one of these (case-insensitive)
+            stop_when: Called with each article that passed the filters;
+                iteration ends, without yielding it, once this returns True
+                
+        Yields:
+            Parsed articles with headline, content, published_at, link and source
+        """
+        payload: Dict[str, Any] = {"q": query, "num": page_size}
+        if time_window is not None:
+            payload["tbs"] = self._time_window_filter(time_window)
+        sources = [source.lower() for source in sources or []]
+        max_pages = max_pages or config.SERPER_MAX_PAGES
+        
+        # Later pages can repeat results from earlier ones; results without a
+        # link are told apart by their headline
+        seen = set()
+        yielded = 0
+        for page in range(1, max_pages + 1):
+            if limit is not None and yielded >= limit:
+                return
+            try:
+                articles = self._fetch_page({**payload, "page": page})
+            except (requests.exceptions.RequestException, ValueError, CircuitOpenError) as e:
+                print(f"Error fetching news page {page}: {str(e)}")
+                return
+            
+            new_results = 0
+            for article in articles:
+                parsed_article = self._parse_article(article)
+                if parsed_article is None:
+                    continue
+                key = parsed_article["link"] or parsed_article["headline"]
+                if key in seen:
+                    continue
+                seen.add(key)
+                new_results += 1
+                
+                if sources and not self._matches_source(parsed_article, sources):
+                    continue
+                if stop_when is not None and stop_when(parsed_article):
+                    return
+                yield parsed_article
+                yielded += 1
+                if limit is not None and yielded >= limit:
+                    return
+            
+            # A short or all-repeated page means the results are exhausted
+            if len(articles) < page_size or not new_results:
+                return
+    
+    @staticmethod
+    def _time_window_filter(time_window: Union[str, Tuple[date, date]]) -> str:
+        """Serper "tbs" value for a named window or a (start, end) date range"""
+        if isinstance(time_window, str):
+            if time_window not in TIME_WINDOWS:
+                raise ValueError(f"Unknown time window {time_window!r}; expected one of {sorted(TIME_WINDOWS)}")
+            return TIME_WINDOWS[time_window]
+        start, end = time_window
+        return f"cdr:1,cd_min:{start:%m/%d/%Y},cd_max:{end:%m/%d/%Y}"
+    
+    @staticmethod
+    def _matches_source(article: Dict[str, Any], sources: List[str]) -> bool:
+        source = article["source"].lower()
+        domain = urlparse(article["link"]).netloc.lower()
+        return any(wanted in source or wanted in domain for wanted in sources)
 
 # Global client instance - lazy initialization
 _serper_client: Optional[SerperClient] = None
@@ -95,3 +216,21 @@ def fetch_financial_news(query: str, num_results: int = 10) -> List[Dict[str, An
     except ValueError as e:
         print(f"Configuration error: {str(e)}")
         return []
+
+def iter_financial_news(query: str, **kwargs) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily page through financial news articles
+    
+    Args:
+        query: Search query for financial news
+        **kwargs: Paging, filter and stop options of SerperClient.iter_financial_news
+        
+    Yields:
+        News articles as each page arrives
+    """
+    try:
+        client = _get_client()
+    except ValueError as e:
+        print(f"Configuration error: {str(e)}")
+        return
+    yield from client.iter_financial_news(query, **kwargs)
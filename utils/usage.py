@@ -0,0 +1,190 @@
+import contextvars
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from config import config
+from utils.metrics import metrics
+
+# Who a Gemini call is made for: agent, article, topic and user (session) labels
+_attribution: contextvars.ContextVar = contextvars.ContextVar("usage_attribution", default={})
+
+ATTRIBUTION_KEYS = ("agent", "article", "topic", "user")
+
+class BudgetExceededError(Exception):
+    """Raised when new work is refused because a token budget is used up"""
+
+@contextmanager
+def usage_scope(**labels):
+    """
+    Attribute Gemini calls made inside the block
+
+    Scopes nest: inner labels are added to (or override) the outer ones.
+    Keys are any of ATTRIBUTION_KEYS; None values are ignored.
+    """
+    merged = {**_attribution.get(), **{key: value for key, value in labels.items() if value is not None}}
+    token = _attribution.set(merged)
+    try:
+        yield merged
+    finally:
+        _attribution.reset(token)
+
+def current_attribution() -> Dict[str, str]:
+    return dict(_attribution.get())
+
+def current_user() -> Optional[str]:
+    return _attribution.get().get("user")
+
+class RollingCounter:
+    """Sum of values over a trailing window, kept in fixed-width time buckets"""
+
+    def __init__(self, window_seconds: float, buckets: int = 60):
+        self.window_seconds = window_seconds
+        self.bucket_seconds = window_seconds / buckets
+        self._buckets: Dict[int, float] = {}
+
+    def add(self, value: float, now: float):
+        bucket = int(now // self.bucket_seconds)
+        self._buckets[bucket] = self._buckets.get(bucket, 0.0) + value
+
+    def total(self, now: float) -> float:
+        oldest = int((now - self.window_seconds) // self.bucket_seconds)
+        for bucket in [bucket for bucket in self._buckets if bucket <= oldest]:
+            del self._buckets[bucket]
+        return sum(self._buckets.values())
+
+class UsageLedger:
+    """
+    Token and cost accounting for every Gemini call, with rolling budgets
+
+    Each call's usage metadata is recorded against the labels of the
+    enclosing usage_scope, totalled per agent, model, topic, user and
+    article, and counted against three rolling budgets: tokens per minute
+    and per day across the process, and tokens per user per day.
+
+    `status(user)` is "ok", "cheap" once any budget passes
+    config.TOKEN_BUDGET_SOFT_RATIO (the pipeline then uses cheaper modes),
+    or "exhausted" (new work is refused).
+    """
+
+    def __init__(self, max_articles: int = 1000):
+        self._lock = threading.Lock()
+        self.max_articles = max_articles
+        self._clear()
+
+    def _clear(self):
+        self._minute = RollingCounter(60)
+        self._day = RollingCounter(86400, buckets=288)
+        self._user_day: Dict[str, RollingCounter] = {}
+        self._totals: Dict[str, Dict[str, Dict[str, float]]] = {
+            key: defaultdict(lambda: defaultdict(float)) for key in ("agent", "model", "topic", "user", "article")
+        }
+
+    def budgets(self) -> Dict[str, int]:
+        return {
+            "per_minute": config.TOKEN_BUDGET_PER_MINUTE,
+            "per_day": config.TOKEN_BUDGET_PER_DAY,
+            "per_user_per_day": config.TOKEN_BUDGET_PER_USER_PER_DAY,
+        }
+
+    def record(self, model: str, prompt_tokens: int, output_tokens: int, cached_tokens: int = 0):
+        """Account one call's tokens to the current attribution"""
+        labels = current_attribution()
+        total_tokens = prompt_tokens + output_tokens
+        price = config.MODEL_PRICES.get(model, config.MODEL_PRICES.get("default", {}))
+        cost = (
+            (prompt_tokens - cached_tokens) * price.get("input", 0.0)
+            + cached_tokens * price.get("cached_input", price.get("input", 0.0))
+            + output_tokens * price.get("output", 0.0)
+        ) / 1_000_000
+        now = time.time()
+        labels["model"] = model
+
+        with self._lock:
+            self._minute.add(total_tokens, now)
+            self._day.add(total_tokens, now)
+            user = labels.get("user")
+            if user is not None:
+                self._user_day.setdefault(user, RollingCounter(86400, buckets=288)).add(total_tokens, now)
+            for key, totals in self._totals.items():
+                if key not in labels:
+                    continue
+                entry = totals[labels[key]]
+                entry["calls"] += 1
+                entry["prompt_tokens"] += prompt_tokens
+                entry["output_tokens"] += output_tokens
+                entry["cached_tokens"] += cached_tokens
+                entry["cost_usd"] += cost
+            articles = self._totals["article"]
+            while len(articles) > self.max_articles:
+                # Per-article totals are only kept for recent articles
+                del articles[next(iter(articles))]
+
+        agent = labels.get("agent", "other")
+        metrics.increment("llm_tokens", prompt_tokens, model=model, agent=agent, kind="prompt")
+        metrics.increment("llm_tokens", output_tokens, model=model, agent=agent, kind="output")
+        if cached_tokens:
+            metrics.increment("llm_tokens", cached_tokens, model=model, agent=agent, kind="cached")
+            # Discount on the cached tokens against the full input rate (cache storage is counted separately)
+            discount = price.get("input", 0.0) - price.get("cached_input", price.get("input", 0.0))
+            metrics.increment("llm_cache_savings_usd", cached_tokens * discount / 1_000_000, model=model, agent=agent)
+        metrics.increment("llm_cost_usd", cost, model=model, agent=agent)
+        metrics.observe("llm_tokens_per_call", total_tokens, agent=agent)
+
+    def usage(self, user: Optional[str] = None) -> Dict[str, float]:
+        """Tokens used in the current budget windows"""
+        now = time.time()
+        with self._lock:
+            usage = {"per_minute": self._minute.total(now), "per_day": self._day.total(now)}
+            counter = self._user_day.get(user) if user is not None else None
+            usage["per_user_per_day"] = counter.total(now) if counter is not None else 0.0
+        return usage
+
+    def status(self, user: Optional[str] = None) -> str:
+        """Budget state for new work on behalf of user: ok, cheap or exhausted"""
+        usage = self.usage(user)
+        worst = max(
+            (usage[name] / limit for name, limit in self.budgets().items() if limit > 0),
+            default=0.0,
+        )
+        if worst >= 1.0:
+            return "exhausted"
+        if worst >= config.TOKEN_BUDGET_SOFT_RATIO:
+            return "cheap"
+        return "ok"
+
+    def check(self, user: Optional[str] = None):
+        """
+        Refuse new work once a budget is used up
+
+        Raises:
+            BudgetExceededError: Naming the exhausted budget
+        """
+        usage = self.usage(user)
+        for name, limit in self.budgets().items():
+            if limit > 0 and usage[name] >= limit:
+                window = "minute" if name == "per_minute" else "day"
+                scope = f" for user {user}" if name == "per_user_per_day" else ""
+                metrics.increment("budget_refusals", budget=name)
+                raise BudgetExceededError(
+                    f"Token budget {name}{scope} exhausted ({usage[name]:.0f}/{limit} tokens in the last "
+                    f"{window}); new analyses are refused until usage rolls off"
+                )
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals per agent, model, topic, user and article, plus budget usage"""
+        with self._lock:
+            totals = {
+                key: {label: dict(entry) for label, entry in groups.items()}
+                for key, groups in self._totals.items()
+            }
+        return {"totals": totals, "budgets": self.budgets(), "usage": self.usage()}
+
+    def reset(self):
+        with self._lock:
+            self._clear()
+
+# Global ledger shared by every Gemini client
+usage_ledger = UsageLedger()